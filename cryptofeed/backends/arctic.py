@@ -5,17 +5,25 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 
 Book backends are intentionally left out here - Arctic cannot handle high throughput
-data like book data. Arctic is best used for writing large datasets in batches.
+data like book data. Arctic is best used for writing large datasets in batches, so updates
+are accumulated and appended as one DataFrame per batch, from a worker thread.
 '''
+import asyncio
+import logging
+
 import arctic
 import pandas as pd
+from pymongo.errors import ConnectionFailure
 
-from cryptofeed.backends.backend import BackendCallback
+from cryptofeed.backends.backend import BackendCallback, BackendQueue
 from cryptofeed.defines import BALANCES, CANDLES, FILLS, FUNDING, OPEN_INTEREST, ORDER_INFO, TICKER, TRADES, LIQUIDATIONS, TRANSACTIONS
 
 
-class ArcticCallback:
-    def __init__(self, library, host='127.0.0.1', key=None, none_to=None, numeric_type=float, quota=0, ssl=False, **kwargs):
+LOG = logging.getLogger('feedhandler')
+
+
+class ArcticCallback(BackendQueue):
+    def __init__(self, library, host='127.0.0.1', key=None, none_to=None, numeric_type=float, quota=0, ssl=False, batch_size=10000, batch_interval=1.0, retries=5, retry_wait=1.0, **kwargs):
         """
         library: str
             arctic library. Will be created if does not exist.
@@ -30,6 +38,13 @@ class ArcticCallback:
             if library needs to be created you can specify the
             lib_type in the kwargs. Default is VersionStore, but you can
             set to chunkstore with lib_type=arctic.CHUNK_STORE
+        batch_size: int
+            maximum number of rows appended at once. Rows are appended once batch_size
+            are queued, or batch_interval seconds after the previous append
+        retries: int
+            number of times an append is retried after losing the connection to MongoDB, waiting retry_wait
+            seconds (doubling on each attempt) in between. Batches that still fail, or fail for another reason
+            (e.g. a schema mismatch), are dropped (logged, and counted in queue_stats)
         """
         con = arctic.Arctic(host, ssl=ssl)
         if library not in con.list_libraries():
@@ -40,13 +55,43 @@ class ArcticCallback:
         self.key = key if key else self.default_key
         self.numeric_type = numeric_type
         self.none_to = none_to
-
-    async def write(self, data):
-        df = pd.DataFrame({key: [value] for key, value in data.items()})
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.retries = retries
+        self.retry_wait = retry_wait
+        self.running = True
+
+    async def writer(self):
+        async for updates in self.read_batches(self.batch_size, self.batch_interval):
+            await self.append_batch(updates)
+
+    async def append_batch(self, updates: list):
+        loop = asyncio.get_running_loop()
+        columns = {key: [data[key] for data in updates] for key in updates[0]}
+        wait = self.retry_wait
+        for attempt in range(self.retries + 1):
+            try:
+                # Mongo writes are blocking, appends run one at a time (preserving their order) off the event loop
+                await loop.run_in_executor(None, self._append, columns)
+                return
+            except ConnectionFailure as e:
+                if attempt == self.retries:
+                    LOG.error("%s: dropping %d rows, append to %s failed after %d retries: %s", self.__class__.__name__, len(updates), self.key, self.retries, e)
+                    break
+                LOG.warning("%s: append to %s failed (%s), retrying in %.1f seconds", self.__class__.__name__, self.key, e, wait)
+                await asyncio.sleep(wait)
+                wait *= 2
+            except Exception as e:
+                LOG.error("%s: dropping %d rows, append to %s failed: %s", self.__class__.__name__, len(updates), self.key, e, exc_info=True)
+                break
+        self.queue_dropped += len(updates)
+
+    def _append(self, columns: dict):
+        df = pd.DataFrame(columns)
         df['date'] = pd.to_datetime(df.timestamp, unit='s')
         df['receipt_timestamp'] = pd.to_datetime(df.receipt_timestamp, unit='s')
         df.set_index(['date'], inplace=True)
-        if 'type' in df and df.type.isna().any():
+        if 'type' in df and df.type.isna().all():
             df.drop(columns=['type'], inplace=True)
         df.drop(columns=['timestamp'], inplace=True)
         self.lib.append(self.key, df, upsert=True)
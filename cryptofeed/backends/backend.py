@@ -6,35 +6,201 @@ associated with this software.
 '''
 import asyncio
 from asyncio.queues import Queue
+from collections import OrderedDict, deque
 from multiprocessing import Pipe, Process
 from contextlib import asynccontextmanager
+import os
+import time
+
+from yapic import json
+
+from cryptofeed.backends.spill import SpillLog
+from cryptofeed.util.perf import BACKEND_QUEUE_DWELL, latency
 
 
 SHUTDOWN_SENTINEL = 'STOP'
 
+# Queue overflow policies
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+CONFLATE = 'conflate'
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, CONFLATE)
+
+
+class ConflatingQueue(Queue):
+    """
+    Queue that holds at most one pending update per (exchange, symbol). Writing an update
+    for a key that is already pending replaces the pending update, keeping its position.
+    """
+    def _init(self, maxsize):
+        self._queue = deque()
+        self._pending = {}
+        self._queued = True
+
+    @staticmethod
+    def key(item):
+        if isinstance(item, dict):
+            return item.get('exchange'), item.get('symbol')
+        # never conflated (e.g. the shutdown sentinel)
+        return object()
+
+    def _put(self, item):
+        key = self.key(item)
+        # another writer can queue the same key while this one waits for room
+        self._queued = key not in self._pending
+        if self._queued:
+            self._queue.append(key)
+        self._pending[key] = item
+
+    async def put(self, item) -> bool:
+        """
+        Wait for room and queue the update, returns False if it replaced an update with the same key
+        queued in the meantime
+        """
+        await super().put(item)
+        if not self._queued:
+            # put counts every item as unfinished
+            self.task_done()
+        return self._queued
+
+    def _get(self):
+        return self._pending.pop(self._queue.popleft())
+
+    def replace(self, item) -> bool:
+        """
+        Replace the pending update with the same key, returns False if there is no pending update for the key
+        """
+        key = self.key(item)
+        if key not in self._pending:
+            return False
+        self._pending[key] = item
+        return True
+
 
 class BackendQueue:
-    def start(self, loop: asyncio.AbstractEventLoop, multiprocess=False):
+    """
+    The queue between a callback and its writer can be bounded with the backend_queue settings in the
+    config (max_size and overflow), or per backend by setting the queue_max_size and queue_overflow
+    attributes before the feed is started. When the queue is full the overflow policy decides what happens:
+
+    BLOCK: the write waits until there is room (backpressure on the feed)
+    DROP_OLDEST: the oldest queued update is discarded
+    DROP_NEWEST: the new update is discarded
+    CONFLATE: a pending update for the same exchange and symbol is replaced by the new one, so at most one
+              update per exchange/symbol is queued. New exchange/symbols wait for room. Only suitable for
+              data where the latest value supersedes previous ones (tickers, book snapshots).
+
+    Bounds do not apply in multiprocess mode. In multiprocess mode updates are sent to the writer process in
+    batches: updates written during the same event loop iteration are pickled and sent together (up to
+    queue_batch_size per send), and the writer process reads every batch that is waiting in the pipe at once.
+
+    Updates can also spill to disk (see SpillLog) while the writer falls behind, e.g. during a sink outage,
+    with the spill settings in the backend_queue config or the queue_spill_* attributes. Once queue_spill_depth
+    updates are queued, or the oldest has been queued for queue_spill_dwell seconds, new updates are appended
+    to a log under queue_spill_path instead, until the writer has read the log back. Spilled updates are read
+    in order after the queued ones, and updates left in the log when the process exits are read when the
+    backend is next started. When the log reaches queue_spill_max_bytes the newest updates are dropped, or
+    the oldest with the DROP_OLDEST policy. Spilling does not apply in multiprocess mode or with CONFLATE.
+    """
+    queue_max_size = None
+    queue_overflow = None
+    queue_batch_size = 1000
+    queue_spill_path = None
+    queue_spill_depth = None
+    queue_spill_dwell = None
+    queue_spill_max_bytes = None
+
+    def start(self, loop: asyncio.AbstractEventLoop, multiprocess=False, max_size=0, overflow=BLOCK, spill=None):
         if hasattr(self, 'started') and self.started:
             # prevent a backend callback from starting more than 1 writer and creating more than 1 queue
             return
         self.multiprocess = multiprocess
+        self.queue_max_size = max_size if self.queue_max_size is None else self.queue_max_size
+        self.queue_overflow = overflow if self.queue_overflow is None else self.queue_overflow
+        if self.queue_overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f'Invalid queue overflow policy {self.queue_overflow}, must be one of {OVERFLOW_POLICIES}')
+        self.queue_dropped = 0
+        self.queue_conflated = 0
+        self.spill = None
+        self._spill_stop = False
+        spill = spill or {}
+        self.queue_spill_path = spill.get('path') if self.queue_spill_path is None else self.queue_spill_path
+        if self.queue_spill_path and not self.multiprocess and self.queue_overflow != CONFLATE:
+            self.queue_spill_depth = spill.get('depth', 10000) if self.queue_spill_depth is None else self.queue_spill_depth
+            if self.queue_max_size:
+                # spill before the overflow policy applies
+                self.queue_spill_depth = min(self.queue_spill_depth, self.queue_max_size)
+            # the reader only waits on an empty queue when nothing has spilled, so the first update always queues
+            self.queue_spill_depth = max(self.queue_spill_depth, 1)
+            self.queue_spill_dwell = spill.get('dwell', 5.0) if self.queue_spill_dwell is None else self.queue_spill_dwell
+            self.queue_spill_max_bytes = spill.get('max_bytes', 1 << 30) if self.queue_spill_max_bytes is None else self.queue_spill_max_bytes
+            self.spill = SpillLog(os.path.join(self.queue_spill_path, self.spill_name), max_bytes=self.queue_spill_max_bytes,
+                                  batch_size=self.queue_batch_size, drop_oldest=self.queue_overflow == DROP_OLDEST)
         if self.multiprocess:
+            self._batch = []
+            self._flush_handle = None
             self.queue = Pipe(duplex=False)
             self.worker = Process(target=BackendQueue.worker, args=(self.writer,), daemon=True)
             self.worker.start()
         else:
-            self.queue = Queue()
+            if self.queue_overflow == CONFLATE:
+                self.queue = ConflatingQueue(self.queue_max_size)
+            else:
+                self.queue = Queue(self.queue_max_size)
+            # time each queued update was queued, in queue order, for the latency instrumentation
+            self._queued_at = deque()
             self.worker = loop.create_task(self.writer())
         self.started = True
 
+    @property
+    def spill_name(self) -> str:
+        """
+        directory, under queue_spill_path, the backend spills to. Backends of the same class and key
+        must be given different queue_spill_paths
+        """
+        key = getattr(self, 'key', None)
+        return f'{self.__class__.__name__}-{key}' if key else self.__class__.__name__
+
+    @property
+    def queue_depth(self) -> int:
+        if not getattr(self, 'started', False) or self.multiprocess:
+            return 0
+        return self.queue.qsize()
+
+    def queue_stats(self) -> dict:
+        stats = {'depth': self.queue_depth, 'max_size': self.queue_max_size, 'overflow': self.queue_overflow, 'dropped': self.queue_dropped, 'conflated': self.queue_conflated}
+        if getattr(self, 'spill', None) is not None:
+            stats['spilled'] = len(self.spill)
+            stats['spill_bytes'] = self.spill.bytes
+            stats['dropped'] += self.spill.dropped
+        return stats
+
+    def _spilling(self) -> bool:
+        # once updates have spilled, everything after them goes to the log too, so updates stay in order
+        return len(self.spill) > 0 or self.queue.qsize() >= self.queue_spill_depth or (len(self._queued_at) > 0 and time.monotonic() - self._queued_at[0] >= self.queue_spill_dwell)
+
+    def _flush(self):
+        self._flush_handle = None
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self.queue[1].send(batch)
+
     async def stop(self):
         if self.multiprocess:
+            if self._flush_handle:
+                self._flush_handle.cancel()
+            self._flush()
             self.queue[1].send(SHUTDOWN_SENTINEL)
             self.worker.join()
+            self.running = False
+        elif self.worker.done():
+            self.running = False
         else:
+            # the sentinel must not be dropped, so always wait for room. The writer stops (running is
+            # cleared by read_queue) once it reaches the sentinel, after writing the updates queued before it
             await self.queue.put(SHUTDOWN_SENTINEL)
-        self.running = False
+            self._queued_at.append(time.monotonic())
 
     @staticmethod
     def worker(writer):
@@ -49,24 +215,127 @@ class BackendQueue:
 
     async def write(self, data):
         if self.multiprocess:
-            self.queue[1].send(data)
+            self._batch.append(data)
+            if len(self._batch) >= self.queue_batch_size:
+                if self._flush_handle:
+                    self._flush_handle.cancel()
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+        elif self.spill is not None and self._spilling():
+            self.spill.append(data)
+        elif self.queue_overflow == CONFLATE:
+            if self.queue.replace(data):
+                # the replaced update keeps its place in the queue, and its queue time
+                self.queue_conflated += 1
+            elif await self.queue.put(data):
+                self._queued_at.append(time.monotonic())
+            else:
+                # an update for the same key was queued while this one waited for room
+                self.queue_conflated += 1
+        elif self.queue.full():
+            if self.queue_overflow == DROP_NEWEST:
+                self.queue_dropped += 1
+            elif self.queue_overflow == DROP_OLDEST:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self._queued_at.popleft()
+                self.queue_dropped += 1
+                self.queue.put_nowait(data)
+                self._queued_at.append(time.monotonic())
+            else:
+                await self.queue.put(data)
+                self._queued_at.append(time.monotonic())
+        else:
+            self.queue.put_nowait(data)
+            self._queued_at.append(time.monotonic())
+
+    def _reached_sentinel(self):
+        if self.spill is None:
+            self.running = False
+        elif self.spill:
+            # updates that spilled before the backend was stopped are read first
+            self._spill_stop = True
         else:
-            await self.queue.put(data)
+            self.running = False
+            self.spill.close()
+
+    def _dequeued(self, update):
+        queued_at = self._queued_at.popleft()
+        if latency.enabled and isinstance(update, dict):
+            # labelled with the data channel the backend writes, and the backend (in place of a connection)
+            latency.record(BACKEND_QUEUE_DWELL, update.get('exchange'), getattr(self, 'default_key', ''), self.__class__.__name__, time.monotonic() - queued_at)
+
+    async def read_batch(self, timeout: float) -> list:
+        """
+        Updates from read_queue, or an empty list if none arrive within timeout seconds. Lets writers
+        that batch by time flush a partial batch while the feed is quiet.
+        """
+        async def read():
+            async with self.read_queue() as updates:
+                return list(updates)
+
+        if self.multiprocess:
+            # the writer process reads the pipe with blocking calls, which a wait_for timeout can't interrupt
+            if not self.queue[0].poll(max(timeout, 0)):
+                return []
+            return await read()
+        try:
+            return await asyncio.wait_for(read(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            return []
+
+    async def read_batches(self, batch_size: int, batch_interval: float):
+        """
+        Yields lists of at most batch_size updates. A batch is yielded once batch_size updates have been read,
+        or batch_interval seconds after the previous one if any updates are waiting. Remaining updates are
+        yielded once the backend is stopped.
+        """
+        loop = asyncio.get_running_loop()
+        batch = []
+        deadline = loop.time() + batch_interval
+
+        while self.running:
+            # wake up at the deadline even if nothing arrives so partial batches are not held indefinitely
+            batch.extend(await self.read_batch(deadline - loop.time()))
+            while len(batch) >= batch_size or (batch and loop.time() >= deadline):
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
+            if loop.time() >= deadline:
+                deadline = loop.time() + batch_interval
+
+        while batch:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
 
     @asynccontextmanager
     async def read_queue(self) -> list:
         if self.multiprocess:
-            msg = self.queue[0].recv()
-            if msg == SHUTDOWN_SENTINEL:
+            conn = self.queue[0]
+            ret = []
+            msg = conn.recv()
+            while True:
+                if msg == SHUTDOWN_SENTINEL:
+                    self.running = False
+                    break
+                ret.extend(msg)
+                if len(ret) >= self.queue_batch_size or not conn.poll():
+                    break
+                msg = conn.recv()
+            yield ret
+        elif self.spill and self.queue.qsize() == 0:
+            ret = self.spill.read(self.queue_batch_size)
+            if self._spill_stop and not self.spill:
                 self.running = False
-                yield []
-            else:
-                yield [msg]
+                self.spill.close()
+            yield ret
         else:
             current_depth = self.queue.qsize()
             if current_depth == 0:
                 update = await self.queue.get()
+                self._dequeued(update)
                 if update == SHUTDOWN_SENTINEL:
+                    self._reached_sentinel()
                     yield []
                 else:
                     yield [update]
@@ -76,9 +345,10 @@ class BackendQueue:
                 count = 0
                 while current_depth > count:
                     update = await self.queue.get()
+                    self._dequeued(update)
                     count += 1
                     if update == SHUTDOWN_SENTINEL:
-                        self.running = False
+                        self._reached_sentinel()
                         break
                     ret.append(update)
 
@@ -88,18 +358,94 @@ class BackendQueue:
                     self.queue.task_done()
 
 
+class SerializationCache:
+    """
+    Shares serializations of a data object between the backends it is written to. A feed passes each
+    data object to its callbacks in turn, so every backend after the first with the same numeric_type
+    and none_to gets the dict the first one created, rather than serializing the object again. The
+    JSON encoding of a dict that is shared this way is also only computed once (see dumps and dumpb),
+    for up to size dicts.
+
+    Dicts from the cache are shared, so backends must not modify them.
+    """
+    def __init__(self, size=4096):
+        self.size = size
+        # the data object most recently serialized, and its serializations. The reference keeps the object
+        # alive, so its id can not be reused by another object while it is cached
+        self.last = None
+        self.dicts = {}
+        # id(dict) -> [dict, str, bytes] for dicts shared by more than one backend
+        self.encoded = OrderedDict()
+
+    def to_dict(self, obj, receipt_timestamp: float, numeric_type, none_to) -> dict:
+        if obj is not self.last:
+            self.last = obj
+            self.dicts.clear()
+
+        key = (numeric_type, none_to, receipt_timestamp)
+        data = self.dicts.get(key)
+        if data is None:
+            data = obj.to_dict(numeric_type=numeric_type, none_to=none_to)
+            if not obj.timestamp:
+                data['timestamp'] = receipt_timestamp
+            data['receipt_timestamp'] = receipt_timestamp
+            self.dicts[key] = data
+        elif id(data) not in self.encoded:
+            self.encoded[id(data)] = [data, None, None]
+            if len(self.encoded) > self.size:
+                self.encoded.popitem(last=False)
+        return data
+
+    def dumps(self, data: dict) -> str:
+        entry = self.encoded.get(id(data))
+        if entry is None or entry[0] is not data:
+            return json.dumps(data)
+        if entry[1] is None:
+            entry[1] = json.dumps(data)
+        return entry[1]
+
+    def dumpb(self, data: dict) -> bytes:
+        entry = self.encoded.get(id(data))
+        if entry is None or entry[0] is not data:
+            return json.dumpb(data)
+        if entry[2] is None:
+            entry[2] = json.dumpb(data)
+        return entry[2]
+
+
+serialization_cache = SerializationCache()
+# JSON encoding of an update, shared with any other backend the update was written to
+dumps = serialization_cache.dumps
+dumpb = serialization_cache.dumpb
+
+
 class BackendCallback:
+    # write updates encoded by the data type (see encode) rather than as dicts
+    native_encoding = False
+
+    def encode(self, dtype, receipt_timestamp: float):
+        return dtype.to_json_bytes(numeric_type=self.numeric_type, none_to=self.none_to, receipt_timestamp=receipt_timestamp)
+
     async def __call__(self, dtype, receipt_timestamp: float):
-        data = dtype.to_dict(numeric_type=self.numeric_type, none_to=self.none_to)
-        if not dtype.timestamp:
-            data['timestamp'] = receipt_timestamp
-        data['receipt_timestamp'] = receipt_timestamp
-        await self.write(data)
+        if self.native_encoding:
+            await self.write(self.encode(dtype, receipt_timestamp))
+        else:
+            await self.write(serialization_cache.to_dict(dtype, receipt_timestamp, self.numeric_type, self.none_to))
 
 
 class BackendBookCallback:
+    # maximum number of levels per side written in snapshots, 0 writes the entire book
+    snapshot_depth = 0
+    native_encoding = False
+
+    def encode(self, book, receipt_timestamp: float, delta=False, depth=0):
+        return book.to_json_bytes(delta=delta, numeric_type=self.numeric_type, none_to=self.none_to, depth=depth, receipt_timestamp=receipt_timestamp)
+
     async def _write_snapshot(self, book, receipt_timestamp: float):
-        data = book.to_dict(numeric_type=self.numeric_type, none_to=self.none_to)
+        if self.native_encoding:
+            await self.write(self.encode(book, receipt_timestamp, depth=self.snapshot_depth))
+            return
+        data = book.to_dict(numeric_type=self.numeric_type, none_to=self.none_to, depth=self.snapshot_depth)
         del data['delta']
         if not book.timestamp:
             data['timestamp'] = receipt_timestamp
@@ -110,14 +456,18 @@ class BackendBookCallback:
         if self.snapshots_only:
             await self._write_snapshot(book, receipt_timestamp)
         else:
-            data = book.to_dict(delta=book.delta is not None, numeric_type=self.numeric_type, none_to=self.none_to)
-            if not book.timestamp:
-                data['timestamp'] = receipt_timestamp
-            data['receipt_timestamp'] = receipt_timestamp
-
-            if book.delta is None:
-                del data['delta']
+            # updates only serialize the delta, full books (and their cached serialization) are only used for snapshots
+            if self.native_encoding:
+                data = self.encode(book, receipt_timestamp, delta=book.delta is not None, depth=self.snapshot_depth)
             else:
+                data = book.to_dict(delta=book.delta is not None, numeric_type=self.numeric_type, none_to=self.none_to, depth=self.snapshot_depth)
+                if not book.timestamp:
+                    data['timestamp'] = receipt_timestamp
+                data['receipt_timestamp'] = receipt_timestamp
+                if book.delta is None:
+                    del data['delta']
+
+            if book.delta is not None:
                 self.snapshot_count[book.symbol] += 1
             await self.write(data)
             if self.snapshot_interval <= self.snapshot_count[book.symbol] and book.delta:
@@ -4,7 +4,9 @@ Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+import asyncio
 from collections import defaultdict
+import logging
 import os
 import io
 from typing import Optional
@@ -15,19 +17,22 @@ from typing import AnyStr
 import aiohttp
 import google.api_core.exceptions
 from google.cloud import pubsub_v1
-from yapic import json
 
 # Use gcloud.aio.pubsub for asyncio
 # https://github.com/talkiq/gcloud-aio
 from gcloud.aio.pubsub import PublisherClient, PubsubMessage
 
-from cryptofeed.backends.backend import BackendBookCallback, BackendCallback
+from cryptofeed.backends.backend import BackendBookCallback, BackendCallback, BackendQueue, dumpb
 
 
-class GCPPubSubCallback:
+LOG = logging.getLogger('feedhandler')
+
+
+class GCPPubSubCallback(BackendQueue):
     def __init__(self, topic: Optional[str] = None, key: Optional[str] = None,
                  service_file: Optional[Union[str, IO[AnyStr]]] = None,
-                 ordering_key: Optional[Union[str, io.IOBase]] = None, numeric_type=float, none_to=None):
+                 ordering_key: Optional[Union[str, io.IOBase]] = None, numeric_type=float, none_to=None,
+                 batch_size: int = 1000, batch_interval: float = 0.01, batch_bytes: int = 7_000_000, retries: int = 5, retry_wait: float = 1.0):
         '''
         Backend using Google Cloud Platform Pub/Sub. Use requires an account with Google Cloud Platform.
         Free tier allows 10GB messages per month.
@@ -53,6 +58,16 @@ class GCPPubSubCallback:
             if messages have the same ordering key and you publish the messages
             to the same region, subscribers can receive the messages in order
             https://cloud.google.com/pubsub/docs/publisher#using_ordering_keys
+        batch_size: int
+            Maximum number of messages per publish request (Pub/Sub accepts at most 1000). Messages are
+            published once batch_size messages are queued, or batch_interval seconds after the previous request
+        batch_bytes: int
+            Maximum size, in bytes, of the messages in a publish request. Pub/Sub rejects requests over 10MB, and
+            the messages are base64 encoded in the request. Larger batches (e.g. of book snapshots) are split
+        retries: int
+            Number of times a publish that failed with a server error, 429 or timeout is retried, waiting
+            retry_wait seconds (doubling on each attempt) in between. The messages are dropped (logged, and
+            counted in queue_stats) once the retries are exhausted, or straight away if they are rejected
         '''
         self.key = key or self.default_key
         self.ordering_key = ordering_key
@@ -63,6 +78,12 @@ class GCPPubSubCallback:
         self.service_file = service_file
         self.session = None
         self.client = None
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.batch_bytes = batch_bytes
+        self.retries = retries
+        self.retry_wait = retry_wait
+        self.running = True
 
     def get_topic(self):
         publisher = pubsub_v1.PublisherClient()
@@ -88,15 +109,47 @@ class GCPPubSubCallback:
             )
         return self.client
 
-    async def write(self, data: dict):
+    async def writer(self):
         '''
-        Publish message. For filtering, "feed" and "symbol" are added as attributes.
+        Publish messages in batches. For filtering, "feed" and "symbol" are added as attributes.
         https://cloud.google.com/pubsub/docs/filtering
         '''
         client = await self.get_client()
-        payload = json.dumps(data).encode()
-        message = PubsubMessage(payload, feed=data['exchange'], symbol=data['symbol'])
-        await client.publish(self.topic_path, [message])
+
+        async for updates in self.read_batches(self.batch_size, self.batch_interval):
+            messages = []
+            size = 0
+            for data in updates:
+                body = dumpb(data)
+                if messages and size + len(body) > self.batch_bytes:
+                    await self.publish(client, messages)
+                    messages = []
+                    size = 0
+                messages.append(PubsubMessage(body, feed=data['exchange'], symbol=data['symbol']))
+                size += len(body)
+            await self.publish(client, messages)
+
+        await self.session.close()
+
+    async def publish(self, client, messages: list):
+        wait = self.retry_wait
+        for attempt in range(self.retries + 1):
+            try:
+                await client.publish(self.topic_path, messages)
+                return
+            except aiohttp.ClientResponseError as e:
+                error = e
+                if e.status < 500 and e.status != 429:
+                    # the messages were rejected, sending them again will not help
+                    break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt < self.retries:
+                LOG.warning("%s: publish to %s failed (%s), retrying in %.1f seconds", self.__class__.__name__, self.topic_path, error, wait)
+                await asyncio.sleep(wait)
+                wait *= 2
+        LOG.error("%s: dropping %d messages, publish to %s failed: %s", self.__class__.__name__, len(messages), self.topic_path, error)
+        self.queue_dropped += len(messages)
 
 
 class TradeGCPPubSub(GCPPubSubCallback, BackendCallback):
@@ -110,9 +163,10 @@ class FundingGCPPubSub(GCPPubSubCallback, BackendCallback):
 class BookGCPPubSub(GCPPubSubCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
@@ -4,9 +4,12 @@ Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+import asyncio
 from collections import defaultdict
+import gzip
 import logging
 
+import aiohttp
 from yapic import json
 
 from cryptofeed.backends.backend import BackendBookCallback, BackendCallback
@@ -17,7 +20,7 @@ LOG = logging.getLogger('feedhandler')
 
 
 class InfluxCallback(HTTPCallback):
-    def __init__(self, addr: str, org: str, bucket: str, token: str, key=None, **kwargs):
+    def __init__(self, addr: str, org: str, bucket: str, token: str, key=None, batch_size=5000, batch_interval=1.0, concurrency=4, compress=True, native_encoding=False, retries=5, retry_wait=1.0, **kwargs):
         """
         Parent class for InfluxDB callbacks
 
@@ -52,10 +55,33 @@ class InfluxCallback(HTTPCallback):
           Token string for authentication
         key:
           key to use when writing data, will be a combination of key-datatype
+        batch_size: int
+          Maximum number of points (lines) written per request. Points are batched by size and time (batch_interval, seconds),
+          a batch is sent when either limit is reached
+        concurrency: int
+          Maximum number of write requests in flight, over a single connection pool
+        compress: bool
+          gzip request bodies
+        native_encoding: bool
+          encode updates straight to line protocol (to_line_protocol), skipping the intermediate dict. String
+          fields and tags are escaped, so book levels are written as valid line protocol
+        retries: int
+          Number of times a failed write is retried, waiting retry_wait seconds (doubling on each attempt) in
+          between. Writes InfluxDB rejects (4xx responses other than 429) are not retried. The points are dropped
+          (logged, and counted in queue_stats) once the retries are exhausted
         """
         super().__init__(addr, **kwargs)
         self.addr = f"{addr}/api/v2/write?org={org}&bucket={bucket}&precision=us"
         self.headers = {"Authorization": f"Token {token}"}
+        if compress:
+            self.headers["Content-Encoding"] = "gzip"
+        self.compress = compress
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.concurrency = concurrency
+        self.native_encoding = native_encoding
+        self.retries = retries
+        self.retry_wait = retry_wait
 
         self.session = None
         self.key = key if key else self.default_key
@@ -74,23 +100,59 @@ class InfluxCallback(HTTPCallback):
                 ret.append(f'{key}={value}')
         return ','.join(ret)
 
+    def line(self, update: dict) -> str:
+        timestamp = update["timestamp"]
+        timestamp_str = f',timestamp={timestamp}' if timestamp is not None else ''
+
+        if 'interval' in update:
+            trades = f',trades={update["trades"]},' if update['trades'] else ','
+            return f'{self.key}-{update["exchange"]},symbol={update["symbol"]},interval={update["interval"]} start={update["start"]},stop={update["stop"]}{trades}open={update["open"]},close={update["close"]},high={update["high"]},low={update["low"]},volume={update["volume"]}{timestamp_str},receipt_timestamp={update["receipt_timestamp"]} {int(update["receipt_timestamp"] * 1000000)}'
+        return f'{self.key}-{update["exchange"]},symbol={update["symbol"]} {self.format(update)}{timestamp_str},receipt_timestamp={update["receipt_timestamp"]} {int(update["receipt_timestamp"] * 1000000)}'
+
+    def encode(self, dtype, receipt_timestamp: float, **kwargs) -> bytes:
+        return dtype.to_line_protocol(f'{self.key}-{dtype.exchange}', numeric_type=self.numeric_type, receipt_timestamp=receipt_timestamp, **kwargs)
+
     async def writer(self):
-        while self.running:
-            async with self.read_queue() as updates:
-                for update in updates:
-                    d = self.format(update)
-                    timestamp = update["timestamp"]
-                    timestamp_str = f',timestamp={timestamp}' if timestamp is not None else ''
-
-                    if 'interval' in update:
-                        trades = f',trades={update["trades"]},' if update['trades'] else ','
-                        update = f'{self.key}-{update["exchange"]},symbol={update["symbol"]},interval={update["interval"]} start={update["start"]},stop={update["stop"]}{trades}open={update["open"]},close={update["close"]},high={update["high"]},low={update["low"]},volume={update["volume"]}{timestamp_str},receipt_timestamp={update["receipt_timestamp"]} {int(update["receipt_timestamp"] * 1000000)}'
-                    else:
-                        update = f'{self.key}-{update["exchange"]},symbol={update["symbol"]} {d}{timestamp_str},receipt_timestamp={update["receipt_timestamp"]} {int(update["receipt_timestamp"] * 1000000)}'
-
-                    await self.http_write(update, headers=self.headers)
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency))
+        writes = set()
+        loop = asyncio.get_running_loop()
+
+        async for updates in self.read_batches(self.batch_size, self.batch_interval):
+            if len(writes) >= self.concurrency:
+                # every request slot is busy, wait here so the backend queue applies backpressure
+                await asyncio.wait(writes, return_when=asyncio.FIRST_COMPLETED)
+            task = loop.create_task(self.write_batch([update if isinstance(update, bytes) else self.line(update).encode() for update in updates]))
+            writes.add(task)
+            task.add_done_callback(writes.discard)
+
+        if writes:
+            await asyncio.wait(writes)
         await self.session.close()
 
+    async def write_batch(self, lines: list):
+        body = b'\n'.join(lines)
+        if self.compress:
+            # fastest level, line protocol compresses well even so and the writer shares the event loop with the feeds
+            body = gzip.compress(body, compresslevel=1)
+        wait = self.retry_wait
+        for attempt in range(self.retries + 1):
+            try:
+                await self.http_write(body, headers=self.headers)
+                return
+            except aiohttp.ClientResponseError as e:
+                error = e
+                if e.status < 500 and e.status != 429:
+                    # the points were rejected, sending them again will not help
+                    break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt < self.retries:
+                LOG.warning("%s: write to %s failed (%s), retrying in %.1f seconds", self.__class__.__name__, self.addr, error, wait)
+                await asyncio.sleep(wait)
+                wait *= 2
+        LOG.error("%s: dropping %d points, write to %s failed: %s", self.__class__.__name__, len(lines), self.addr, error)
+        self.queue_dropped += len(lines)
+
 
 class TradeInflux(InfluxCallback, BackendCallback):
     default_key = 'trades'
@@ -106,9 +168,10 @@ class FundingInflux(InfluxCallback, BackendCallback):
 class BookInflux(InfluxCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
@@ -11,15 +11,15 @@ from typing import Optional, ByteString
 
 from aiokafka import AIOKafkaProducer
 from aiokafka.errors import RequestTimedOutError, KafkaConnectionError, NodeNotReadyError
-from yapic import json
+from aiokafka.partitioner import DefaultPartitioner
 
-from cryptofeed.backends.backend import BackendBookCallback, BackendCallback, BackendQueue
+from cryptofeed.backends.backend import BackendBookCallback, BackendCallback, BackendQueue, dumpb
 
 LOG = logging.getLogger('feedhandler')
 
 
 class KafkaCallback(BackendQueue):
-    def __init__(self, key=None, numeric_type=float, none_to=None, **kwargs):
+    def __init__(self, key=None, numeric_type=float, none_to=None, window=1000, send_batches=False, **kwargs):
         """
         You can pass configuration options to AIOKafkaProducer as keyword arguments.
         (either individual kwargs, an unpacked dictionary `**config_dict`, or both)
@@ -37,8 +37,24 @@ class KafkaCallback(BackendQueue):
             'value_serializer': your_serialization_function}
 
         (Passing the event loop is already handled)
+
+        window: int
+            Maximum number of messages sent but not yet acknowledged by the broker. Sends are pipelined up to
+            this limit rather than waiting for each acknowledgement. Delivery failures are logged (and counted in
+            delivery_failures) when the acknowledgement arrives.
+        send_batches: bool
+            Group the messages read from the queue by topic and partition and send each group with
+            create_batch/send_batch, instead of sending messages individually. The partition is taken from
+            partition(), or from the producer's partitioner when partition() returns None.
         """
         self.producer_config = kwargs
+        self.window = window
+        self.send_batches = send_batches
+        self.in_flight = set()
+        self.in_flight_messages = 0
+        self.delivered = 0
+        self.delivery_failures = 0
+        self._partitions = {}
         self.producer = None
         self.key: str = key or self.default_key
         self.numeric_type = numeric_type
@@ -48,7 +64,7 @@ class KafkaCallback(BackendQueue):
 
     def _default_serializer(self, to_bytes: dict | str) -> ByteString:
         if isinstance(to_bytes, dict):
-            return json.dumpb(to_bytes)
+            return dumpb(to_bytes)
         elif isinstance(to_bytes, str):
             return to_bytes.encode()
         else:
@@ -85,25 +101,96 @@ class KafkaCallback(BackendQueue):
     def partition(self, data: dict) -> Optional[int]:
         return None
 
+    def _delivery_error(self, e: Exception, messages: int):
+        self.delivery_failures += messages
+        if isinstance(e, RequestTimedOutError):
+            LOG.error(f'{self.__class__.__name__}: No response received from server within {self.producer._request_timeout_ms} ms. {messages} message(s) may not have been delivered')
+        elif isinstance(e, NodeNotReadyError):
+            LOG.error(f'{self.__class__.__name__}: Node not ready, {messages} message(s) not delivered')
+        else:
+            LOG.error(f'{self.__class__.__name__}: Delivery of {messages} message(s) failed:{chr(10)}{e}')
+
+    def _delivered(self, future: asyncio.Future, messages: int):
+        self.in_flight.discard(future)
+        self.in_flight_messages -= messages
+        if future.cancelled():
+            self.delivery_failures += messages
+        elif future.exception():
+            self._delivery_error(future.exception(), messages)
+        else:
+            self.delivered += messages
+
+    async def _track(self, future: asyncio.Future, messages: int):
+        self.in_flight.add(future)
+        self.in_flight_messages += messages
+        future.add_done_callback(lambda f: self._delivered(f, messages))
+        while self.in_flight_messages >= self.window and self.in_flight:
+            await asyncio.wait(self.in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+    async def _partition_for(self, topic: str, key: bytes) -> int:
+        # every message has the same key, so the partitioner's choice only depends on the topic
+        if topic not in self._partitions:
+            partitions = sorted(await self.producer.partitions_for(topic))
+            partitioner = self.producer_config.get('partitioner', DefaultPartitioner())
+            self._partitions[topic] = partitioner(key, partitions, partitions)
+        return self._partitions[topic]
+
+    async def _send(self, updates: list, key, serialize):
+        for update in updates:
+            try:
+                future = await self.producer.send(self.topic(update), serialize(update), key, self.partition(update))
+            except Exception as e:
+                self._delivery_error(e, 1)
+                continue
+            await self._track(future, 1)
+
+    async def _send_batches(self, updates: list, key: bytes, serialize):
+        groups = defaultdict(list)
+        for update in updates:
+            topic = self.topic(update)
+            partition = self.partition(update)
+            if partition is None:
+                partition = await self._partition_for(topic, key)
+            groups[(topic, partition)].append(serialize(update))
+
+        for (topic, partition), values in groups.items():
+            batch = self.producer.create_batch()
+            for value in values:
+                if batch.append(key=key, value=value, timestamp=None) is None:
+                    # batch is full
+                    await self._send_batch(batch, topic, partition)
+                    batch = self.producer.create_batch()
+                    batch.append(key=key, value=value, timestamp=None)
+            await self._send_batch(batch, topic, partition)
+
+    async def _send_batch(self, batch, topic: str, partition: int):
+        messages = batch.record_count()
+        try:
+            future = await self.producer.send_batch(batch, topic, partition=partition)
+        except Exception as e:
+            self._delivery_error(e, messages)
+            return
+        await self._track(future, messages)
+
     async def writer(self):
         await self._connect()
+        # Check for user-provided serializers, otherwise use default. The key does not change so is only serialized once
+        if self.send_batches:
+            # batches bypass the producer's serializers
+            serialize = self.producer_config.get('value_serializer', self._default_serializer)
+            key = self.producer_config.get('key_serializer', self._default_serializer)(self.key)
+        else:
+            serialize = (lambda update: update) if self.producer_config.get('value_serializer') else self._default_serializer
+            key = self.key if self.producer_config.get('key_serializer') else self._default_serializer(self.key)
+
         while self.running:
             async with self.read_queue() as updates:
-                for index in range(len(updates)):
-                    topic = self.topic(updates[index])
-                    # Check for user-provided serializers, otherwise use default
-                    value = updates[index] if self.producer_config.get('value_serializer') else self._default_serializer(updates[index])
-                    key = self.key if self.producer_config.get('key_serializer') else self._default_serializer(self.key)
-                    partition = self.partition(updates[index])
-                    try:
-                        send_future = await self.producer.send(topic, value, key, partition)
-                        await send_future
-                    except RequestTimedOutError:
-                        LOG.error(f'{self.__class__.__name__}: No response received from server within {self.producer._request_timeout_ms} ms. Messages may not have been delivered')
-                    except NodeNotReadyError:
-                        LOG.error(f'{self.__class__.__name__}: Node not ready')
-                    except Exception as e:
-                        LOG.info(f'{self.__class__.__name__}: Encountered an error:{chr(10)}{e}')
+                if self.send_batches:
+                    await self._send_batches(updates, key, serialize)
+                else:
+                    await self._send(updates, key, serialize)
+        if self.in_flight:
+            await asyncio.wait(self.in_flight)
         LOG.info(f"{self.__class__.__name__}: sending last messages and closing connection '{self.producer.client._client_id}'")
         await self.producer.stop()
 
@@ -119,9 +206,10 @@ class FundingKafka(KafkaCallback, BackendCallback):
 class BookKafka(KafkaCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
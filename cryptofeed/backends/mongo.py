@@ -29,6 +29,8 @@ class MongoCallback(BackendQueue):
         while self.running:
             async with self.read_queue() as updates:
                 for index in range(len(updates)):
+                    # updates may be shared with other backends (and insert_many adds _id), so are copied rather than modified
+                    updates[index] = dict(updates[index])
                     updates[index]['timestamp'] = dt.fromtimestamp(updates[index]['timestamp'], tz=timezone.utc) if updates[index]['timestamp'] else None
                     updates[index]['receipt_timestamp'] = dt.fromtimestamp(updates[index]['receipt_timestamp'], tz=timezone.utc) if updates[index]['receipt_timestamp'] else None
 
@@ -49,9 +51,10 @@ class FundingMongo(MongoCallback, BackendCallback):
 class BookMongo(MongoCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
@@ -0,0 +1,236 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Parquet backends write updates to local, compressed Parquet files, partitioned (hive style)
+by exchange, date (of the update's timestamp, UTC) and symbol:
+
+    <path>/<key>/exchange=<exchange>/date=<YYYY-MM-DD>/symbol=<symbol>/<key>-<time opened>.parquet
+
+Updates are converted to Arrow record batches on a background thread and appended to the
+open file of their partition as a row group. Files are rolled over once they hold rows_per_file
+rows, have been open for roll_interval seconds, or the date changes. Files that are still being
+written are hidden (prefixed with a '.') and renamed when closed, so readers only see complete files.
+
+read_parquet reads the files (memory mapped) back into an Arrow table.
+'''
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from cryptofeed.backends.backend import BackendBookCallback, BackendCallback, BackendQueue
+from cryptofeed.defines import ASK, BID, CANDLES, FUNDING, TICKER, TRADES
+
+
+LOG = logging.getLogger('feedhandler')
+
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+
+def read_parquet(path: str, key: str, exchange: str = None, symbols: list = None, start: str = None, end: str = None, columns: list = None) -> pa.Table:
+    """
+    Read the files written by a Parquet backend. Files are memory mapped, and only the partitions
+    matching the filters are read.
+
+    path: str
+        path the backend was configured with
+    key: str
+        data type (the backend's key), e.g. trades
+    exchange: str
+        only read this exchange
+    symbols: list
+        only read these symbols
+    start: str
+        first date (YYYY-MM-DD, inclusive) to read
+    end: str
+        last date (YYYY-MM-DD, inclusive) to read
+    columns: list
+        columns to read, defaults to all (including the exchange, date and symbol partition columns)
+    """
+    filters = []
+    if exchange:
+        filters.append(('exchange', '=', exchange))
+    if symbols:
+        filters.append(('symbol', 'in', list(symbols)))
+    if start:
+        filters.append(('date', '>=', str(start)))
+    if end:
+        filters.append(('date', '<=', str(end)))
+    partitioning = ds.partitioning(pa.schema([('exchange', pa.string()), ('date', pa.string()), ('symbol', pa.string())]), flavor='hive')
+    return pq.read_table(os.path.join(path, key), columns=columns, filters=filters or None, partitioning=partitioning, memory_map=True)
+
+
+class _File:
+    __slots__ = ('date', 'path', 'tmp', 'writer', 'rows', 'opened')
+
+    def __init__(self, date: str, path: str, schema: pa.Schema, compression: str):
+        self.date = date
+        self.path = path
+        self.tmp = os.path.join(os.path.dirname(path), '.' + os.path.basename(path))
+        self.writer = pq.ParquetWriter(self.tmp, schema, compression=compression)
+        self.rows = 0
+        self.opened = time.time()
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.tmp, self.path)
+
+
+class ParquetCallback(BackendQueue):
+    # (column, arrow type) written for each update, in addition to timestamp and receipt_timestamp
+    fields = ()
+
+    def __init__(self, path='.', key=None, none_to=None, compression='zstd', batch_size=10000, batch_interval=1.0, rows_per_file=1000000, roll_interval=3600, **kwargs):
+        """
+        path: str
+            directory files are written under
+        key: str
+            setting key lets you override the directory (under path) the data type is written to.
+            The defaults are related to the data being stored, i.e. trades, funding, etc
+        compression: str
+            Parquet compression codec (zstd, snappy, gzip, lz4, brotli or none)
+        batch_size: int
+            maximum number of updates converted and written (as one row group per file) at once. Updates
+            are written once batch_size are queued, or batch_interval seconds after the previous write
+        rows_per_file: int
+            number of rows after which a file is closed and a new one started
+        roll_interval: float
+            seconds after which a file is closed and a new one started
+        """
+        self.path = path
+        self.key = key if key else self.default_key
+        self.numeric_type = float
+        self.none_to = none_to
+        self.compression = compression
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.rows_per_file = rows_per_file
+        self.roll_interval = roll_interval
+        self.schema = pa.schema(list(self.fields) + [('timestamp', TIMESTAMP), ('receipt_timestamp', TIMESTAMP)])
+        self.files = {}
+        self._dates = {}
+        self.running = True
+
+    async def writer(self):
+        # created here, rather than in __init__, as the writer may run in another process
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{self.__class__.__name__}-flush')
+        loop = asyncio.get_running_loop()
+
+        async for updates in self.read_batches(self.batch_size, self.batch_interval):
+            try:
+                await loop.run_in_executor(executor, self.write_batch, updates)
+            except (OSError, pa.ArrowException) as e:
+                LOG.error("%s: failed to write %d updates to %s: %s", self.__class__.__name__, len(updates), self.path, e)
+
+        await loop.run_in_executor(executor, self.close)
+        executor.shutdown()
+
+    def rows(self, data: dict):
+        """
+        rows (dicts with the schema's columns) to write for an update
+        """
+        yield data
+
+    def _date(self, timestamp: float) -> str:
+        day = int(timestamp // 86400)
+        if day not in self._dates:
+            self._dates[day] = time.strftime('%Y-%m-%d', time.gmtime(day * 86400))
+        return self._dates[day]
+
+    def write_batch(self, updates: list):
+        partitions = defaultdict(list)
+        for data in updates:
+            partitions[(data['exchange'], data['symbol'], self._date(data['timestamp']))].extend(self.rows(data))
+
+        for (exchange, symbol, date), rows in partitions.items():
+            columns = {}
+            for name, dtype in zip(self.schema.names, self.schema.types):
+                if dtype == TIMESTAMP:
+                    columns[name] = [int(row[name] * 1000000) if row[name] is not None else None for row in rows]
+                elif dtype == pa.string():
+                    columns[name] = [str(row[name]) if row[name] is not None else None for row in rows]
+                else:
+                    columns[name] = [row[name] for row in rows]
+            self._file(exchange, symbol, date).writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=self.schema))
+            self.files[(exchange, symbol)].rows += len(rows)
+
+        now = time.time()
+        for partition, f in list(self.files.items()):
+            if f.rows >= self.rows_per_file or now - f.opened >= self.roll_interval:
+                f.close()
+                del self.files[partition]
+
+    def _file(self, exchange: str, symbol: str, date: str) -> _File:
+        f = self.files.get((exchange, symbol))
+        if f is not None and f.date != date:
+            f.close()
+            f = None
+        if f is None:
+            directory = os.path.join(self.path, self.key, f'exchange={exchange}', f'date={date}', f'symbol={symbol}')
+            os.makedirs(directory, exist_ok=True)
+            f = self.files[(exchange, symbol)] = _File(date, os.path.join(directory, f'{self.key}-{time.time_ns()}.parquet'), self.schema, self.compression)
+        return f
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+
+class TradeParquet(ParquetCallback, BackendCallback):
+    default_key = TRADES
+    fields = (('side', pa.string()), ('amount', pa.float64()), ('price', pa.float64()), ('id', pa.string()), ('type', pa.string()))
+
+
+class TickerParquet(ParquetCallback, BackendCallback):
+    default_key = TICKER
+    fields = (('bid', pa.float64()), ('ask', pa.float64()))
+
+
+class FundingParquet(ParquetCallback, BackendCallback):
+    default_key = FUNDING
+    fields = (('mark_price', pa.float64()), ('rate', pa.float64()), ('next_funding_time', TIMESTAMP), ('predicted_rate', pa.float64()))
+
+
+class CandlesParquet(ParquetCallback, BackendCallback):
+    default_key = CANDLES
+    fields = (('start', TIMESTAMP), ('stop', TIMESTAMP), ('interval', pa.string()), ('trades', pa.int64()), ('open', pa.float64()), ('close', pa.float64()),
+              ('high', pa.float64()), ('low', pa.float64()), ('volume', pa.float64()), ('closed', pa.bool_()))
+
+
+class BookParquet(ParquetCallback, BackendBookCallback):
+    """
+    One row per price level: deltas (delta=True) have a row per changed level (size 0 is a removed level),
+    snapshots (delta=False) a row per level of the book.
+    """
+    default_key = 'book'
+    fields = (('delta', pa.bool_()), ('side', pa.string()), ('price', pa.float64()), ('size', pa.float64()))
+
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
+        self.snapshots_only = snapshots_only
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
+        self.snapshot_count = defaultdict(int)
+        super().__init__(*args, **kwargs)
+
+    def rows(self, data: dict):
+        timestamp = data['timestamp']
+        receipt = data['receipt_timestamp']
+        if 'delta' in data:
+            for side in (BID, ASK):
+                for price, size in data['delta'][side]:
+                    yield {'delta': True, 'side': side, 'price': price, 'size': size, 'timestamp': timestamp, 'receipt_timestamp': receipt}
+        else:
+            for side in (BID, ASK):
+                for price, size in data['book'][side].items():
+                    yield {'delta': False, 'side': side, 'price': price, 'size': size, 'timestamp': timestamp, 'receipt_timestamp': receipt}
@@ -4,8 +4,10 @@ Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+import asyncio
 from collections import defaultdict
 from datetime import datetime as dt
+import logging
 from typing import Tuple
 
 import asyncpg
@@ -15,8 +17,15 @@ from cryptofeed.backends.backend import BackendBookCallback, BackendCallback, Ba
 from cryptofeed.defines import CANDLES, FUNDING, OPEN_INTEREST, TICKER, TRADES, LIQUIDATIONS, INDEX
 
 
+LOG = logging.getLogger('feedhandler')
+
+# errors after which a COPY is retried on a new connection
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError, asyncpg.CannotConnectNowError)
+
+
 class PostgresCallback(BackendQueue):
-    def __init__(self, host='127.0.0.1', user=None, pw=None, db=None, port=None, table=None, custom_columns: dict = None, none_to=None, numeric_type=float, **kwargs):
+    def __init__(self, host='127.0.0.1', user=None, pw=None, db=None, port=None, table=None, custom_columns: dict = None, none_to=None, numeric_type=float,
+                 copy=False, pool_size=4, batch_size=5000, batch_interval=0.5, retries=5, retry_wait=1.0, **kwargs):
         """
         host: str
             Database host address
@@ -32,6 +41,17 @@ class PostgresCallback(BackendQueue):
             A dictionary which maps Cryptofeed's data type fields to Postgres's table column names, e.g. {'symbol': 'instrument', 'price': 'price', 'amount': 'size'}
             Can be a subset of Cryptofeed's available fields (see the cdefs listed under each data type in types.pyx). Can be listed any order.
             Note: to store BOOK data in a JSONB column, include a 'data' field, e.g. {'symbol': 'symbol', 'data': 'json_data'}
+        copy: bool
+            Write with COPY (asyncpg copy_records_to_table) instead of INSERT statements. Rows are sent as typed
+            records over a connection pool, and are batched by size (batch_size) and time (batch_interval, seconds).
+            Without custom_columns the first column of the table (the serial id in the sample tables) is left to its
+            default, as it is with INSERT.
+        pool_size: int
+            Maximum number of connections (and so concurrent COPYs) in copy mode
+        retries: int
+            Number of times a COPY is retried after losing the connection, waiting retry_wait seconds (doubling
+            on each attempt) in between. The batch is dropped (logged, and counted in queue_stats) once the retries
+            are exhausted, or straight away on other errors. Batches with duplicate rows are inserted again without them.
         """
         self.conn = None
         self.table = table if table else self.default_table
@@ -46,6 +66,14 @@ class PostgresCallback(BackendQueue):
         # Parse INSERT statement with user-specified column names
         # Performed at init to avoid repeated list joins
         self.insert_statement = f"INSERT INTO {self.table} ({','.join([v for v in self.custom_columns.values()])}) VALUES " if custom_columns else None
+        self.copy = copy
+        self.pool = None
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.retries = retries
+        self.retry_wait = retry_wait
+        self.copy_columns = list(custom_columns.values()) if custom_columns else None
         self.running = True
 
     async def _connect(self):
@@ -79,15 +107,37 @@ class PostgresCallback(BackendQueue):
         sql_string = ','.join(str(s) if isinstance(s, float) or s == 'NULL' else "'" + str(s) + "'" for s in sequence_gen)
         return f"({sql_string})"
 
+    def record(self, data: Tuple) -> tuple:
+        feed, symbol, timestamp, receipt_timestamp, data = data
+        return (timestamp, receipt_timestamp, feed, symbol, json.dumps(data))
+
+    def _custom_record(self, data: Tuple) -> tuple:
+        d = {
+            **data[4],
+            **{
+                'exchange': data[0],
+                'symbol': data[1],
+                'timestamp': data[2],
+                'receipt': data[3],
+            }
+        }
+        return tuple(d[field] for field in self.custom_columns.keys())
+
+    @staticmethod
+    def _row(data: dict) -> Tuple:
+        ts = dt.utcfromtimestamp(data['timestamp']) if data['timestamp'] else None
+        rts = dt.utcfromtimestamp(data['receipt_timestamp'])
+        return (data['exchange'], data['symbol'], ts, rts, data)
+
     async def writer(self):
+        if self.copy:
+            await self._copy_writer()
+            return
+
         while self.running:
             async with self.read_queue() as updates:
                 if len(updates) > 0:
-                    batch = []
-                    for data in updates:
-                        ts = dt.utcfromtimestamp(data['timestamp']) if data['timestamp'] else None
-                        rts = dt.utcfromtimestamp(data['receipt_timestamp'])
-                        batch.append((data['exchange'], data['symbol'], ts, rts, data))
+                    batch = [self._row(data) for data in updates]
                     await self.write_batch(batch)
 
     async def write_batch(self, updates: list):
@@ -105,6 +155,69 @@ class PostgresCallback(BackendQueue):
                 # when restarting a subscription, some exchanges will re-publish a few messages
                 pass
 
+    async def _connect_pool(self):
+        self.pool = await asyncpg.create_pool(user=self.user, password=self.pw, database=self.db, host=self.host, port=self.port, min_size=1, max_size=self.pool_size)
+        if self.copy_columns is None:
+            # same layout as the INSERT statements: every column but the first, in table order
+            async with self.pool.acquire() as conn:
+                columns = await conn.fetch("SELECT attname FROM pg_attribute WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped ORDER BY attnum", self.table)
+            self.copy_columns = [c['attname'] for c in columns[1:]]
+
+    async def _copy_writer(self):
+        while self.pool is None:
+            try:
+                await self._connect_pool()
+            except CONNECTION_ERRORS as e:
+                LOG.warning("%s: unable to connect to Postgres (%s), retrying in %.1f seconds", self.__class__.__name__, e, self.retry_wait)
+                await asyncio.sleep(self.retry_wait)
+
+        copies = set()
+        loop = asyncio.get_running_loop()
+
+        async for updates in self.read_batches(self.batch_size, self.batch_interval):
+            if len(copies) >= self.pool_size:
+                # every connection is busy, wait here so the backend queue applies backpressure
+                await asyncio.wait(copies, return_when=asyncio.FIRST_COMPLETED)
+            task = loop.create_task(self.copy_batch([self.record(self._row(data)) for data in updates]))
+            copies.add(task)
+            task.add_done_callback(copies.discard)
+
+        if copies:
+            await asyncio.wait(copies)
+        await self.pool.close()
+
+    async def copy_batch(self, rows: list):
+        wait = self.retry_wait
+        attempt = 0
+        skip_duplicates = False
+        while True:
+            try:
+                async with self.pool.acquire() as conn:
+                    if skip_duplicates:
+                        await conn.executemany(f"INSERT INTO {self.table} ({','.join(self.copy_columns)}) VALUES ({','.join(f'${i + 1}' for i in range(len(self.copy_columns)))}) ON CONFLICT DO NOTHING", rows)
+                    else:
+                        await conn.copy_records_to_table(self.table, records=rows, columns=self.copy_columns)
+                return
+            except asyncpg.UniqueViolationError:
+                # when restarting a subscription, some exchanges will re-publish a few messages. A COPY is
+                # atomic, so the batch is inserted again skipping the duplicates rather than dropped
+                LOG.warning("%s: duplicate rows in COPY to %s, inserting the %d rows without them", self.__class__.__name__, self.table, len(rows))
+                skip_duplicates = True
+            except CONNECTION_ERRORS as e:
+                if attempt == self.retries:
+                    LOG.error("%s: dropping %d rows, COPY to %s failed after %d retries: %s", self.__class__.__name__, len(rows), self.table, self.retries, e)
+                    self.queue_dropped += len(rows)
+                    return
+                LOG.warning("%s: COPY to %s failed (%s), retrying in %.1f seconds", self.__class__.__name__, self.table, e, wait)
+                await asyncio.sleep(wait)
+                wait *= 2
+                attempt += 1
+            except Exception:
+                # e.g. a row that does not match the table's types or columns, retrying would fail the same way
+                LOG.error("%s: dropping %d rows, COPY to %s failed", self.__class__.__name__, len(rows), self.table, exc_info=True)
+                self.queue_dropped += len(rows)
+                return
+
 
 class TradePostgres(PostgresCallback, BackendCallback):
     default_table = TRADES
@@ -118,20 +231,38 @@ class TradePostgres(PostgresCallback, BackendCallback):
             otype = f"'{data['type']}'" if data['type'] else 'NULL'
             return f"(DEFAULT,'{timestamp}','{receipt}','{exchange}','{symbol}','{data['side']}',{data['amount']},{data['price']},{id},{otype})"
 
+    def record(self, data: Tuple) -> tuple:
+        if self.custom_columns:
+            return self._custom_record(data)
+        exchange, symbol, timestamp, receipt, data = data
+        return (timestamp, receipt, exchange, symbol, data['side'], data['amount'], data['price'], data['id'], data['type'])
+
 
 class FundingPostgres(PostgresCallback, BackendCallback):
     default_table = FUNDING
 
     def format(self, data: Tuple):
         if self.custom_columns:
-            if data[4]['next_funding_time']:
-                data[4]['next_funding_time'] = dt.utcfromtimestamp(data[4]['next_funding_time'])
-            return self._custom_format(data)
+            return self._custom_format(self._funding_time(data))
         else:
             exchange, symbol, timestamp, receipt, data = data
             ts = dt.utcfromtimestamp(data['next_funding_time']) if data['next_funding_time'] else 'NULL'
             return f"(DEFAULT,'{timestamp}','{receipt}','{exchange}','{symbol}',{data['mark_price'] if data['mark_price'] else 'NULL'},{data['rate']},'{ts}',{data['predicted_rate']})"
 
+    @staticmethod
+    def _funding_time(data: Tuple) -> Tuple:
+        # updates may be shared with other backends, so are copied rather than modified
+        if data[4]['next_funding_time']:
+            return data[:4] + ({**data[4], 'next_funding_time': dt.utcfromtimestamp(data[4]['next_funding_time'])},)
+        return data
+
+    def record(self, data: Tuple) -> tuple:
+        data = self._funding_time(data)
+        if self.custom_columns:
+            return self._custom_record(data)
+        exchange, symbol, timestamp, receipt, data = data
+        return (timestamp, receipt, exchange, symbol, data['mark_price'], data['rate'], data['next_funding_time'], data['predicted_rate'])
+
 
 class TickerPostgres(PostgresCallback, BackendCallback):
     default_table = TICKER
@@ -143,6 +274,12 @@ class TickerPostgres(PostgresCallback, BackendCallback):
             exchange, symbol, timestamp, receipt, data = data
             return f"(DEFAULT,'{timestamp}','{receipt}','{exchange}','{symbol}',{data['bid']},{data['ask']})"
 
+    def record(self, data: Tuple) -> tuple:
+        if self.custom_columns:
+            return self._custom_record(data)
+        exchange, symbol, timestamp, receipt, data = data
+        return (timestamp, receipt, exchange, symbol, data['bid'], data['ask'])
+
 
 class OpenInterestPostgres(PostgresCallback, BackendCallback):
     default_table = OPEN_INTEREST
@@ -154,6 +291,12 @@ class OpenInterestPostgres(PostgresCallback, BackendCallback):
             exchange, symbol, timestamp, receipt, data = data
             return f"(DEFAULT,'{timestamp}','{receipt}','{exchange}','{symbol}',{data['open_interest']})"
 
+    def record(self, data: Tuple) -> tuple:
+        if self.custom_columns:
+            return self._custom_record(data)
+        exchange, symbol, timestamp, receipt, data = data
+        return (timestamp, receipt, exchange, symbol, data['open_interest'])
+
 
 class IndexPostgres(PostgresCallback, BackendCallback):
     default_table = INDEX
@@ -165,6 +308,12 @@ class IndexPostgres(PostgresCallback, BackendCallback):
             exchange, symbol, timestamp, receipt, data = data
             return f"(DEFAULT,'{timestamp}','{receipt}','{exchange}','{symbol}',{data['price']})"
 
+    def record(self, data: Tuple) -> tuple:
+        if self.custom_columns:
+            return self._custom_record(data)
+        exchange, symbol, timestamp, receipt, data = data
+        return (timestamp, receipt, exchange, symbol, data['price'])
+
 
 class LiquidationsPostgres(PostgresCallback, BackendCallback):
     default_table = LIQUIDATIONS
@@ -176,13 +325,20 @@ class LiquidationsPostgres(PostgresCallback, BackendCallback):
             exchange, symbol, timestamp, receipt, data = data
             return f"(DEFAULT,'{timestamp}','{receipt}','{exchange}','{symbol}','{data['side']}',{data['quantity']},{data['price']},'{data['id']}','{data['status']}')"
 
+    def record(self, data: Tuple) -> tuple:
+        if self.custom_columns:
+            return self._custom_record(data)
+        exchange, symbol, timestamp, receipt, data = data
+        return (timestamp, receipt, exchange, symbol, data['side'], data['quantity'], data['price'], data['id'], data['status'])
+
 
 class BookPostgres(PostgresCallback, BackendBookCallback):
     default_table = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
@@ -206,18 +362,36 @@ class BookPostgres(PostgresCallback, BackendBookCallback):
 
             return f"(DEFAULT,'{timestamp}','{receipt_timestamp}','{feed}','{symbol}','{json.dumps(data)}')"
 
+    def record(self, data: Tuple) -> tuple:
+        book = json.dumps({'snapshot': data[4]['book']} if 'book' in data[4] else {'delta': data[4]['delta']})
+        if self.custom_columns:
+            data[4]['data'] = book
+            return self._custom_record(data)
+        feed, symbol, timestamp, receipt_timestamp, _ = data
+        return (timestamp, receipt_timestamp, feed, symbol, book)
+
 
 class CandlesPostgres(PostgresCallback, BackendCallback):
     default_table = CANDLES
 
     def format(self, data: Tuple):
         if self.custom_columns:
-            data[4]['start'] = dt.utcfromtimestamp(data[4]['start'])
-            data[4]['stop'] = dt.utcfromtimestamp(data[4]['stop'])
-            return self._custom_format(data)
+            return self._custom_format(self._interval_times(data))
         else:
             exchange, symbol, timestamp, receipt, data = data
 
             open_ts = dt.utcfromtimestamp(data['start'])
             close_ts = dt.utcfromtimestamp(data['stop'])
             return f"(DEFAULT,'{timestamp}','{receipt}','{exchange}','{symbol}','{open_ts}','{close_ts}','{data['interval']}',{data['trades'] if data['trades'] is not None else 'NULL'},{data['open']},{data['close']},{data['high']},{data['low']},{data['volume']},{data['closed'] if data['closed'] else 'NULL'})"
+
+    @staticmethod
+    def _interval_times(data: Tuple) -> Tuple:
+        # updates may be shared with other backends, so are copied rather than modified
+        return data[:4] + ({**data[4], 'start': dt.utcfromtimestamp(data[4]['start']), 'stop': dt.utcfromtimestamp(data[4]['stop'])},)
+
+    def record(self, data: Tuple) -> tuple:
+        data = self._interval_times(data)
+        if self.custom_columns:
+            return self._custom_record(data)
+        exchange, symbol, timestamp, receipt, data = data
+        return (timestamp, receipt, exchange, symbol, data['start'], data['stop'], data['interval'], data['trades'], data['open'], data['close'], data['high'], data['low'], data['volume'], data['closed'])
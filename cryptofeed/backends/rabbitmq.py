@@ -6,15 +6,19 @@ associated with this software.
 '''
 import asyncio
 from collections import defaultdict
+import logging
 
 import aio_pika
-from yapic import json
 
-from cryptofeed.backends.backend import BackendBookCallback, BackendCallback
+from cryptofeed.backends.backend import BackendBookCallback, BackendCallback, BackendQueue, dumpb
 
 
-class RabbitCallback:
-    def __init__(self, host='localhost', none_to=None, numeric_type=float, queue_name='cryptofeed', exchange_mode=False, exchange_name='amq.topic', exchange_type='topic', routing_key='cryptofeed', **kwargs):
+LOG = logging.getLogger('feedhandler')
+
+
+class RabbitCallback(BackendQueue):
+    def __init__(self, host='localhost', none_to=None, numeric_type=float, queue_name='cryptofeed', exchange_mode=False, exchange_name='amq.topic', exchange_type='topic', routing_key='cryptofeed',
+                 window=1000, batch_interval=0.01, retries=5, retry_wait=1.0, **kwargs):
         """
         Parameters
         ----------
@@ -30,7 +34,15 @@ class RabbitCallback:
             String values must be one of 'fanout', 'direct', 'topic', 'headers', 'x-delayed-message', 'x-consistent-hash'
         routing_key: str
             definable amqp routing key
+        window: int
+            Maximum number of messages published before waiting for the broker's confirms. Messages are
+            published once window messages are queued, or batch_interval seconds after the previous window
+        retries: int
+            Number of times the messages the broker did not confirm are published again, waiting retry_wait
+            seconds (doubling on each attempt) in between. The connection reconnects on its own, so this covers
+            channel and connection drops. Messages still unconfirmed are dropped (logged, and counted in queue_stats)
         """
+        self.connection = None
         self.conn = None
         self.host = host
         self.numeric_type = numeric_type
@@ -40,35 +52,49 @@ class RabbitCallback:
         self.exchange_name = exchange_name
         self.exchange_type = exchange_type
         self.routing_key = routing_key
+        self.window = window
+        self.batch_interval = batch_interval
+        self.retries = retries
+        self.retry_wait = retry_wait
+        self.running = True
 
     async def connect(self):
         if not self.conn:
+            self.connection = await aio_pika.connect_robust(f"amqp://{self.host}", loop=asyncio.get_running_loop())
+            channel = await self.connection.channel(publisher_confirms=True)
             if self.exchange_mode:
-                connection = await aio_pika.connect_robust(f"amqp://{self.host}", loop=asyncio.get_running_loop())
-                self.conn = await connection.channel()
-                self.conn = await self.conn.declare_exchange(self.exchange_name, self.exchange_type, durable=True, auto_delete=False)
+                self.conn = await channel.declare_exchange(self.exchange_name, self.exchange_type, durable=True, auto_delete=False)
             else:
-                connection = await aio_pika.connect_robust(f"amqp://{self.host}", loop=asyncio.get_running_loop())
-                self.conn = await connection.channel()
-                await self.conn.declare_queue(self.queue_name, auto_delete=False, durable=True)
+                await channel.declare_queue(self.queue_name, auto_delete=False, durable=True)
+                self.conn = channel.default_exchange
 
-    async def write(self, data: dict):
+    async def writer(self):
         await self.connect()
 
-        if self.exchange_mode:
-            await self.conn.publish(
-                aio_pika.Message(
-                    body=json.dumps(data).encode()
-                ),
-                routing_key=self.routing_key
-            )
-        else:
-            await self.conn.default_exchange.publish(
-                aio_pika.Message(
-                    body=json.dumps(data).encode()
-                ),
-                routing_key=self.routing_key
-            )
+        async for updates in self.read_batches(self.window, self.batch_interval):
+            await self.publish(updates)
+
+        await self.connection.close()
+
+    async def publish(self, updates: list):
+        """
+        Publish every message in the window without waiting, then wait for all of their confirms. The
+        messages that were not confirmed are published again
+        """
+        bodies = [dumpb(data) for data in updates]
+        wait = self.retry_wait
+        for attempt in range(self.retries + 1):
+            results = await asyncio.gather(*[self.conn.publish(aio_pika.Message(body=body), routing_key=self.routing_key) for body in bodies], return_exceptions=True)
+            failed = [r for r in results if isinstance(r, Exception)]
+            if not failed:
+                return
+            bodies = [body for body, result in zip(bodies, results) if isinstance(result, Exception)]
+            if attempt < self.retries:
+                LOG.warning("%s: %d of %d messages were not confirmed by the broker (%s), retrying in %.1f seconds", self.__class__.__name__, len(failed), len(results), failed[0], wait)
+                await asyncio.sleep(wait)
+                wait *= 2
+        LOG.error("%s: dropping %d messages, they were not confirmed by the broker: %s", self.__class__.__name__, len(failed), failed[0])
+        self.queue_dropped += len(failed)
 
 
 class TradeRabbit(RabbitCallback, BackendCallback):
@@ -80,9 +106,10 @@ class FundingRabbit(RabbitCallback, BackendCallback):
 
 
 class BookRabbit(RabbitCallback, BackendBookCallback):
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
@@ -9,7 +9,7 @@ from collections import defaultdict
 from redis import asyncio as aioredis
 from yapic import json
 
-from cryptofeed.backends.backend import BackendBookCallback, BackendCallback, BackendQueue
+from cryptofeed.backends.backend import BackendBookCallback, BackendCallback, BackendQueue, dumps
 
 
 class RedisCallback(BackendQueue):
@@ -49,7 +49,7 @@ class RedisZSetCallback(RedisCallback):
             async with self.read_queue() as updates:
                 async with conn.pipeline(transaction=False) as pipe:
                     for update in updates:
-                        pipe = pipe.zadd(f"{self.key}-{update['exchange']}-{update['symbol']}", {json.dumps(update): update[self.score_key]}, nx=True)
+                        pipe = pipe.zadd(f"{self.key}-{update['exchange']}-{update['symbol']}", {dumps(update): update[self.score_key]}, nx=True)
                     await pipe.execute()
 
         await conn.close()
@@ -64,12 +64,13 @@ class RedisStreamCallback(RedisCallback):
             async with self.read_queue() as updates:
                 async with conn.pipeline(transaction=False) as pipe:
                     for update in updates:
+                        # updates may be shared with other backends, so are copied rather than modified
                         if 'delta' in update:
-                            update['delta'] = json.dumps(update['delta'])
+                            update = {**update, 'delta': json.dumps(update['delta'])}
                         elif 'book' in update:
-                            update['book'] = json.dumps(update['book'])
+                            update = {**update, 'book': json.dumps(update['book'])}
                         elif 'closed' in update:
-                            update['closed'] = str(update['closed'])
+                            update = {**update, 'closed': str(update['closed'])}
 
                         pipe = pipe.xadd(f"{self.key}-{update['exchange']}-{update['symbol']}", update)
                     await pipe.execute()
@@ -87,7 +88,7 @@ class RedisKeyCallback(RedisCallback):
             async with self.read_queue() as updates:
                 update = list(updates)[-1]
                 if update:
-                    await conn.set(f"{self.key}-{update['exchange']}-{update['symbol']}", json.dumps(update))
+                    await conn.set(f"{self.key}-{update['exchange']}-{update['symbol']}", dumps(update))
 
         await conn.close()
         await conn.connection_pool.disconnect()
@@ -112,9 +113,10 @@ class FundingStream(RedisStreamCallback, BackendCallback):
 class BookRedis(RedisZSetCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, score_key='receipt_timestamp', **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, score_key='receipt_timestamp', **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, score_key=score_key, **kwargs)
 
@@ -122,9 +124,10 @@ class BookRedis(RedisZSetCallback, BackendBookCallback):
 class BookStream(RedisStreamCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
@@ -132,9 +135,10 @@ class BookStream(RedisStreamCallback, BackendBookCallback):
 class BookSnapshotRedisKey(RedisKeyCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshot_interval=1000, score_key='receipt_timestamp', **kwargs):
+    def __init__(self, *args, snapshot_interval=1000, snapshot_depth=0, score_key='receipt_timestamp', **kwargs):
         kwargs['snapshots_only'] = True
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, score_key=score_key, **kwargs)
 
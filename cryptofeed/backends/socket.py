@@ -40,7 +40,7 @@ class UDPProtocol:
 
 
 class SocketCallback(BackendQueue):
-    def __init__(self, addr: str, port=None, none_to=None, numeric_type=float, key=None, mtu=1400, **kwargs):
+    def __init__(self, addr: str, port=None, none_to=None, numeric_type=float, key=None, mtu=1400, native_encoding=False, **kwargs):
         """
         Common parent class for all socket callbacks
 
@@ -57,6 +57,8 @@ class SocketCallback(BackendQueue):
           port for connection. Should not be specified for UDS connections
         mtu: int
           MTU for UDP message size. Should be slightly less than actual MTU for overhead
+        native_encoding: bool
+          encode updates straight to JSON bytes (to_json_bytes), skipping the intermediate dict
         """
         self.conn_type = addr[:6]
         if self.conn_type not in {'tcp://', 'uds://', 'udp://'}:
@@ -69,15 +71,22 @@ class SocketCallback(BackendQueue):
         self.numeric_type = numeric_type
         self.none_to = none_to
         self.key = key if key else self.default_key
+        self.native_encoding = native_encoding
         self.running = True
 
+    def encode(self, dtype, receipt_timestamp: float, **kwargs) -> bytes:
+        return b'{"type":' + json.dumps(self.key).encode() + b',"data":' + super().encode(dtype, receipt_timestamp, **kwargs) + b'}'
+
     async def writer(self):
         while self.running:
             await self.connect()
             async with self.read_queue() as updates:
                 for update in updates:
-                    data = {'type': self.key, 'data': update}
-                    data = json.dumps(data)
+                    if isinstance(update, bytes):
+                        data = update
+                        update = update.decode()
+                    else:
+                        data = json.dumps({'type': self.key, 'data': update}).encode()
                     if self.conn_type == 'udp://':
                         if len(update) > self.mtu:
                             chunks = wrap(update, self.mtu)
@@ -85,9 +94,9 @@ class SocketCallback(BackendQueue):
                                 msg = json.dumps({'type': 'chunked', 'chunks': len(chunks), 'data': chunk}).encode()
                                 self.conn.sendto(msg)
                         else:
-                            self.conn.sendto(data.encode())
+                            self.conn.sendto(data)
                     else:
-                        self.conn.write(data.encode())
+                        self.conn.write(data)
 
     async def connect(self):
         if not self.conn:
@@ -112,9 +121,10 @@ class FundingSocket(SocketCallback, BackendCallback):
 class BookSocket(SocketCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
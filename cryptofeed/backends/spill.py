@@ -0,0 +1,218 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Disk spill-over for backend queues (see BackendQueue). Updates are appended to segment files in a
+directory, as frames of pickled batches:
+
+    <payload length: uint32><number of updates: uint32><crc32 of payload: uint32><payload>
+
+Segments are read back in order and deleted once they have been read. Segments left behind by a
+previous run are read before any new updates, a frame that was only partially written when the
+process exited is discarded.
+'''
+import asyncio
+from collections import deque
+import logging
+import os
+import pickle
+import struct
+import zlib
+
+
+LOG = logging.getLogger('feedhandler')
+
+HEADER = struct.Struct('<III')
+SUFFIX = '.seg'
+
+
+class _Segment:
+    __slots__ = ('path', 'size', 'records')
+
+    def __init__(self, path: str, size=0, records=0):
+        self.path = path
+        self.size = size
+        # updates in the segment that have not been read
+        self.records = records
+
+
+class SpillLog:
+    def __init__(self, path: str, max_bytes=1 << 30, segment_bytes=64 << 20, batch_size=1000, drop_oldest=False):
+        """
+        path: str
+            directory the segments are written to. Only one log may use a directory at a time
+        max_bytes: int
+            disk budget. Once the segments would exceed it the newest updates are dropped, or, with drop_oldest,
+            the oldest segments are deleted to make room
+        segment_bytes: int
+            size after which a new segment is started. Segments are only deleted once fully read, so this
+            bounds the disk space held by updates that have already been read
+        batch_size: int
+            maximum number of updates per frame. Updates appended during an event loop iteration are written
+            together, as a single frame up to batch_size updates
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+
+        self.segments = deque()
+        self.bytes = 0
+        self.records = 0
+        self._sequence = 0
+        self._buffer = []
+        self._flush_handle = None
+        self._writer = None
+        self._reader = None
+        self._head = deque()
+
+        os.makedirs(path, exist_ok=True)
+        self._recover()
+
+    def __len__(self) -> int:
+        return self.records + len(self._buffer) + len(self._head)
+
+    def _recover(self):
+        for name in sorted(name for name in os.listdir(self.path) if name.endswith(SUFFIX)):
+            segment = _Segment(os.path.join(self.path, name))
+            with open(segment.path, 'rb') as fp:
+                while True:
+                    header = fp.read(HEADER.size)
+                    if len(header) < HEADER.size:
+                        break
+                    length, records, crc = HEADER.unpack(header)
+                    payload = fp.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        break
+                    segment.size += HEADER.size + length
+                    segment.records += records
+                complete = len(header) == 0
+
+            if not complete:
+                LOG.warning('SpillLog: discarding incomplete frame at the end of %s', segment.path)
+                os.truncate(segment.path, segment.size)
+            self._sequence = int(name[:-len(SUFFIX)]) + 1
+            if segment.records:
+                self.segments.append(segment)
+                self.bytes += segment.size
+                self.records += segment.records
+            else:
+                os.remove(segment.path)
+
+        if self.records:
+            LOG.info('SpillLog: recovered %d updates from %s', self.records, self.path)
+
+    def append(self, update):
+        self._buffer.append(update)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self):
+        """
+        write the buffered updates to the current segment
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+        payload = pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL)
+        size = HEADER.size + len(payload)
+        if self.drop_oldest:
+            while self.bytes + size > self.max_bytes and self.segments:
+                self._drop_oldest()
+        if self.bytes + size > self.max_bytes:
+            self.dropped += len(batch)
+            LOG.warning('SpillLog: %s is over its %d byte budget, dropped %d updates', self.path, self.max_bytes, len(batch))
+            return
+
+        if self._writer is None or self.segments[-1].size >= self.segment_bytes:
+            self._open()
+        self._writer.write(HEADER.pack(len(payload), len(batch), zlib.crc32(payload)))
+        self._writer.write(payload)
+        self._writer.flush()
+        segment = self.segments[-1]
+        segment.size += size
+        segment.records += len(batch)
+        self.bytes += size
+        self.records += len(batch)
+
+    def _open(self):
+        if self._writer is not None:
+            self._writer.close()
+        segment = _Segment(os.path.join(self.path, f'{self._sequence:016d}{SUFFIX}'))
+        self._sequence += 1
+        self._writer = open(segment.path, 'wb')
+        self.segments.append(segment)
+
+    def _drop_oldest(self):
+        segment = self.segments[0]
+        self.dropped += segment.records
+        LOG.warning('SpillLog: %s is over its %d byte budget, dropped %d updates', self.path, self.max_bytes, segment.records)
+        self._delete_oldest()
+
+    def _delete_oldest(self):
+        segment = self.segments.popleft()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if not self.segments and self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self.bytes -= segment.size
+        self.records -= segment.records
+        os.remove(segment.path)
+
+    def read(self, count: int) -> list:
+        """
+        up to count updates, oldest first
+        """
+        ret = []
+        while len(ret) < count:
+            if not self._head and not self._read_frame():
+                # nothing on disk, take the updates that have not been written yet
+                take = count - len(ret)
+                ret.extend(self._buffer[:take])
+                self._buffer = self._buffer[take:]
+                break
+            while self._head and len(ret) < count:
+                ret.append(self._head.popleft())
+        return ret
+
+    def _read_frame(self) -> bool:
+        while self.segments:
+            segment = self.segments[0]
+            if self._reader is None:
+                self._reader = open(segment.path, 'rb')
+            if segment.records:
+                header = self._reader.read(HEADER.size)
+                length, records, crc = HEADER.unpack(header)
+                payload = self._reader.read(length)
+                segment.records -= records
+                self.records -= records
+                if zlib.crc32(payload) == crc:
+                    self._head.extend(pickle.loads(payload))
+                    return True
+                # the frames that follow can not be located reliably
+                LOG.error('SpillLog: discarding %d updates from corrupt segment %s', records + segment.records, segment.path)
+                self.dropped += records + segment.records
+                self.records -= segment.records
+                segment.records = 0
+            self._delete_oldest()
+        return False
+
+    def close(self):
+        self.flush()
+        for f in (self._reader, self._writer):
+            if f is not None:
+                f.close()
+        self._reader = self._writer = None
@@ -8,20 +8,31 @@ from collections import defaultdict
 
 import zmq
 import zmq.asyncio
-from yapic import json
 
-from cryptofeed.backends.backend import BackendQueue, BackendBookCallback, BackendCallback
+from cryptofeed.backends.backend import BackendQueue, BackendBookCallback, BackendCallback, dumps
 
 
 class ZMQCallback(BackendQueue):
-    def __init__(self, host='127.0.0.1', port=5555, none_to=None, numeric_type=float, key=None, dynamic_key=True, **kwargs):
+    def __init__(self, host='127.0.0.1', port=5555, none_to=None, numeric_type=float, key=None, dynamic_key=True, native_encoding=False, **kwargs):
+        """
+        native_encoding: bool
+            encode updates straight to JSON bytes (to_json_bytes), skipping the intermediate dict. Floats are
+            written as Python formats them (e.g. 100.0 rather than 100), values are otherwise the same
+        """
         self.url = "tcp://{}:{}".format(host, port)
         self.key = key if key else self.default_key
         self.numeric_type = numeric_type
         self.none_to = none_to
         self.dynamic_key = dynamic_key
+        self.native_encoding = native_encoding
         self.running = True
 
+    def encode(self, dtype, receipt_timestamp: float, **kwargs) -> bytes:
+        data = super().encode(dtype, receipt_timestamp, **kwargs)
+        if self.dynamic_key:
+            return f'{dtype.exchange}-{self.key}-{dtype.symbol} '.encode() + data
+        return f'{self.key} '.encode() + data
+
     async def writer(self):
         ctx = zmq.asyncio.Context.instance()
         con = ctx.socket(zmq.PUB)
@@ -29,10 +40,13 @@ class ZMQCallback(BackendQueue):
         while self.running:
             async with self.read_queue() as updates:
                 for update in updates:
+                    if isinstance(update, bytes):
+                        await con.send(update)
+                        continue
                     if self.dynamic_key:
-                        update = f'{update["exchange"]}-{self.key}-{update["symbol"]} {json.dumps(update)}'
+                        update = f'{update["exchange"]}-{self.key}-{update["symbol"]} {dumps(update)}'
                     else:
-                        update = f'{self.key} {json.dumps(update)}'
+                        update = f'{self.key} {dumps(update)}'
                     await con.send_string(update)
 
 
@@ -51,9 +65,10 @@ class FundingZMQ(ZMQCallback, BackendCallback):
 class BookZMQ(ZMQCallback, BackendBookCallback):
     default_key = 'book'
 
-    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, **kwargs):
+    def __init__(self, *args, snapshots_only=False, snapshot_interval=1000, snapshot_depth=0, **kwargs):
         self.snapshots_only = snapshots_only
         self.snapshot_interval = snapshot_interval
+        self.snapshot_depth = snapshot_depth
         self.snapshot_count = defaultdict(int)
         super().__init__(*args, **kwargs)
 
@@ -13,12 +13,15 @@ from typing import List, Union, AsyncIterable
 from decimal import Decimal
 import atexit
 from dataclasses import dataclass
+import threading
 
 from aiohttp.client_reqrep import ClientResponse
 import requests
+from requests.adapters import HTTPAdapter
 import websockets
 import aiohttp
 from aiohttp.typedefs import StrOrURL
+from yarl import URL
 from yapic import json as json_parser
 
 from cryptofeed.exceptions import ConnectionClosed
@@ -38,7 +41,99 @@ class Connection:
         raise NotImplementedError
 
 
+class HTTPPool:
+    """
+    HTTP connection pools shared by every HTTP connection in the process: one aiohttp session per event loop
+    for the asynchronous connections (HTTPAsyncConn, HTTPPoll, HTTPConcurrentPoll and so the REST mixins), and
+    one requests session per thread for HTTPSync. Connections are kept alive and reused across feeds, limited
+    per host, and DNS lookups are cached.
+
+    The pools are configured with the http_pool settings in the FeedHandler config (see configure).
+    """
+    def __init__(self):
+        self.limit = 256
+        self.limit_per_host = 16
+        self.keepalive_timeout = 30
+        self.dns_ttl = 300
+        self._sessions = {}
+        self._local = threading.local()
+
+    def configure(self, limit=None, limit_per_host=None, keepalive_timeout=None, dns_ttl=None, **kwargs):
+        """
+        Applies to sessions created after the call
+
+        limit: int
+            maximum number of open connections, over all hosts
+        limit_per_host: int
+            maximum number of open connections to a host
+        keepalive_timeout: float
+            seconds an idle connection is kept open
+        dns_ttl: int
+            seconds DNS lookups are cached for (async connections)
+        """
+        self.limit = self.limit if limit is None else limit
+        self.limit_per_host = self.limit_per_host if limit_per_host is None else limit_per_host
+        self.keepalive_timeout = self.keepalive_timeout if keepalive_timeout is None else keepalive_timeout
+        self.dns_ttl = self.dns_ttl if dns_ttl is None else dns_ttl
+
+    def session(self) -> aiohttp.ClientSession:
+        """
+        the session for the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            for closed in [key for key in self._sessions if key.is_closed()]:
+                del self._sessions[closed]
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, keepalive_timeout=self.keepalive_timeout, use_dns_cache=True, ttl_dns_cache=self.dns_ttl)
+            session = self._sessions[loop] = aiohttp.ClientSession(connector=connector)
+        return session
+
+    def sync_session(self) -> requests.Session:
+        """
+        the session for the current thread
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.limit, pool_maxsize=self.limit_per_host)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        return session
+
+    async def prewarm(self, addresses: List[str]):
+        """
+        Open a connection to the host of each address (a HEAD request to its root), so the first requests to
+        it do not wait for the DNS lookup and the TCP and TLS handshakes
+        """
+        session = self.session()
+        timeout = aiohttp.ClientTimeout(total=10)
+
+        async def warm(origin):
+            try:
+                async with session.head(origin, allow_redirects=False, timeout=timeout):
+                    pass
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                LOG.debug('HTTPPool: could not prewarm %s: %s', origin, e)
+
+        await asyncio.gather(*(warm(origin) for origin in {str(URL(address).origin()) for address in addresses}))
+
+    async def close(self):
+        """
+        close the session for the running event loop
+        """
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+http_pool = HTTPPool()
+
+
 class HTTPSync(Connection):
+    # seconds to wait for the server to connect and respond
+    timeout = 60
+
     def process_response(self, r, address, json=False, text=False, uuid=None):
         if self.raw_data_callback:
             self.raw_data_callback.sync_callback(r.text, time.time(), str(uuid), endpoint=address)
@@ -52,12 +147,12 @@ class HTTPSync(Connection):
 
     def read(self, address: str, params=None, headers=None, json=False, text=True, uuid=None):
         LOG.debug("HTTPSync: requesting data from %s", address)
-        r = requests.get(address, headers=headers, params=params)
+        r = http_pool.sync_session().get(address, headers=headers, params=params, timeout=self.timeout)
         return self.process_response(r, address, json=json, text=text, uuid=uuid)
 
     def write(self, address: str, data=None, json=False, text=True, uuid=None):
         LOG.debug("HTTPSync: post to %s", address)
-        r = requests.post(address, data=data)
+        r = http_pool.sync_session().post(address, data=data, timeout=self.timeout)
         return self.process_response(r, address, json=json, text=text, uuid=uuid)
 
 
@@ -137,6 +232,12 @@ class HTTPAsyncConn(AsyncConnection):
     def is_open(self) -> bool:
         return self.conn and not self.conn.closed
 
+    async def close(self):
+        # the session is shared (see HTTPPool), it is closed with the pool
+        if self.is_open:
+            self.conn = None
+            LOG.info('%s: released HTTP session', self.id)
+
     def _handle_error(self, resp: ClientResponse, data: bytes):
         if resp.status != 200:
             LOG.error("%s: Status code %d for URL %s", self.id, resp.status, resp.url)
@@ -148,8 +249,8 @@ class HTTPAsyncConn(AsyncConnection):
         if self.is_open:
             LOG.warning('%s: HTTP session already created', self.id)
         else:
-            LOG.debug('%s: create HTTP session', self.id)
-            self.conn = aiohttp.ClientSession()
+            LOG.debug('%s: use shared HTTP session', self.id)
+            self.conn = http_pool.session()
             self.sent = 0
             self.received = 0
             self.last_message = None
@@ -18,6 +18,7 @@ from websockets.exceptions import InvalidStatusCode
 from cryptofeed.connection import AsyncConnection
 from cryptofeed.exceptions import ExhaustedRetries
 from cryptofeed.defines import HUOBI, HUOBI_DM, HUOBI_SWAP, OKCOIN, OKX
+from cryptofeed.util.perf import CONNECTION
 
 
 LOG = logging.getLogger('feedhandler')
@@ -111,6 +112,8 @@ class ConnectionHandler:
             raise ExhaustedRetries()
 
     async def _handler(self, connection, handler):
+        # latency instrumentation is labelled with the connection the message was received on
+        CONNECTION.set(self.conn.uuid)
         try:
             async for message in connection.read():
                 if not self.running:
@@ -128,6 +128,11 @@ CALL = 'call'
 PUT = 'put'
 FX = 'fx'
 
+# Numeric Modes
+DECIMAL = 'decimal'
+FLOAT = 'float'
+SCALED_INT = 'scaled_int'
+
 
 # HTTP methods
 GET = 'GET'
@@ -5,6 +5,7 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 import logging
 from datetime import datetime as dt, timezone
@@ -31,6 +32,10 @@ class Exchange:
     candle_interval_map = NotImplemented
     http_sync = HTTPSync()
     allow_empty_subscriptions = False
+    # maximum number of symbol endpoints read at once
+    symbol_concurrency = 4
+    # use cached symbol information older than the cache ttl (feeds refresh it once started)
+    stale_symbols_ok = False
 
     def __init__(self, config=None, sandbox=False, subaccount=None, **kwargs):
         self.config = Config(config=config)
@@ -45,6 +50,8 @@ class Exchange:
 
         self.ignore_invalid_instruments = self.config.ignore_invalid_instruments
 
+        if self.config.symbol_cache:
+            Symbols.configure_cache(**self.config.symbol_cache)
         if not Symbols.populated(self.id):
             self.symbol_mapping()
         self.normalized_symbol_mapping, _ = Symbols.get(self.id)
@@ -86,23 +93,36 @@ class Exchange:
         """
         return ep.route('instruments')
 
+    @classmethod
+    def _symbol_data(cls):
+        """
+        the data _parse_symbol_data parses, override if an exchange needs to collect it differently.
+        Exchanges with several symbol endpoints have them read concurrently
+        """
+        addrs = []
+        for ep in cls.rest_endpoints:
+            addr = cls._symbol_endpoint_prepare(ep)
+            addrs.extend(addr if isinstance(addr, list) else [addr])
+
+        def read(addr):
+            LOG.debug("%s: reading symbol information from %s", cls.id, addr)
+            return cls.http_sync.read(addr, json=True, uuid=cls.id)
+
+        if len(addrs) == 1:
+            return read(addrs[0])
+        with ThreadPoolExecutor(max_workers=min(len(addrs), cls.symbol_concurrency)) as executor:
+            return list(executor.map(read, addrs))
+
     @classmethod
     def symbol_mapping(cls, refresh=False) -> Dict:
-        if Symbols.populated(cls.id) and not refresh:
-            return Symbols.get(cls.id)[0]
+        if not refresh:
+            if Symbols.populated(cls.id):
+                return Symbols.get(cls.id)[0]
+            if Symbols.load_cached(cls.id, stale=cls.stale_symbols_ok):
+                LOG.info("%s: using cached symbol information", cls.id)
+                return Symbols.get(cls.id)[0]
         try:
-            data = []
-            for ep in cls.rest_endpoints:
-                addr = cls._symbol_endpoint_prepare(ep)
-                if isinstance(addr, list):
-                    for ep in addr:
-                        LOG.debug("%s: reading symbol information from %s", cls.id, ep)
-                        data.append(cls.http_sync.read(ep, json=True, uuid=cls.id))
-                else:
-                    LOG.debug("%s: reading symbol information from %s", cls.id, addr)
-                    data.append(cls.http_sync.read(addr, json=True, uuid=cls.id))
-
-            syms, info = cls._parse_symbol_data(data if len(data) > 1 else data[0])
+            syms, info = cls._parse_symbol_data(cls._symbol_data())
             Symbols.set(cls.id, syms, info)
             return syms
         except Exception as e:
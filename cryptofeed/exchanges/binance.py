@@ -8,15 +8,15 @@ import logging
 from asyncio import create_task, sleep
 from collections import defaultdict
 from decimal import Decimal
-import requests
+from functools import partial
 import time
 from typing import Dict, Union, Tuple
 from urllib.parse import urlencode
 
 from yapic import json
 
-from cryptofeed.connection import AsyncConnection, HTTPPoll, HTTPConcurrentPoll, RestEndpoint, Routes, WebsocketEndpoint
-from cryptofeed.defines import ASK, BALANCES, BID, BINANCE, BUY, CANDLES, FUNDING, FUTURES, L2_BOOK, LIMIT, LIQUIDATIONS, MARKET, OPEN_INTEREST, ORDER_INFO, PERPETUAL, SELL, SPOT, TICKER, TRADES, FILLED, UNFILLED
+from cryptofeed.connection import AsyncConnection, HTTPPoll, HTTPConcurrentPoll, RestEndpoint, Routes, WebsocketEndpoint, http_pool
+from cryptofeed.defines import ASK, BALANCES, BID, BINANCE, BUY, CANDLES, DECIMAL, FLOAT, FUNDING, FUTURES, L2_BOOK, LIMIT, LIQUIDATIONS, MARKET, OPEN_INTEREST, ORDER_INFO, PERPETUAL, SCALED_INT, SELL, SPOT, TICKER, TRADES, FILLED, UNFILLED
 from cryptofeed.feed import Feed
 from cryptofeed.symbols import Symbol
 from cryptofeed.exchanges.mixins.binance_rest import BinanceRestMixin
@@ -45,6 +45,10 @@ class Binance(Feed, BinanceRestMixin):
         ORDER_INFO: ORDER_INFO
     }
     request_limit = 20
+    # REQUEST_WEIGHT limit of 6000 per minute, and the weight of a depth request by its limit
+    request_weight_limit = 6000 / 60
+    depth_weights = ((100, 5), (500, 25), (1000, 50), (5000, 250))
+    numeric_modes = (DECIMAL, FLOAT, SCALED_INT)
 
     @classmethod
     def timestamp_normalize(cls, ts: float) -> float:
@@ -148,18 +152,22 @@ class Binance(Feed, BinanceRestMixin):
         self._l2_book = {}
         self.last_update_id = {}
 
+    def _reset_symbol(self, std_pair: str):
+        self._l2_book.pop(std_pair, None)
+        self.last_update_id.pop(std_pair, None)
+
     async def _refresh_token(self):
         while True:
             await sleep(30 * 60)
             if self._auth_token is None:
                 raise ValueError('There is no token to refresh')
             payload = {'listenKey': self._auth_token}
-            r = requests.put(f'{self.rest_endpoints[0].route("authentication", sandbox=self.sandbox)}?{urlencode(payload)}', headers={'X-MBX-APIKEY': self.key_id})
+            r = http_pool.sync_session().put(f'{self.rest_endpoints[0].route("authentication", sandbox=self.sandbox)}?{urlencode(payload)}', headers={'X-MBX-APIKEY': self.key_id})
             r.raise_for_status()
 
     def _generate_token(self) -> str:
         url = self.rest_endpoints[0].route('authentication', sandbox=self.sandbox)
-        r = requests.post(url, headers={'X-MBX-APIKEY': self.key_id})
+        r = http_pool.sync_session().post(url, headers={'X-MBX-APIKEY': self.key_id})
         r.raise_for_status()
         response = r.json()
         if 'listenKey' in response:
@@ -184,11 +192,12 @@ class Binance(Feed, BinanceRestMixin):
             "M": true         // Ignore
         }
         """
+        symbol = self.exchange_symbol_to_std_symbol(msg['s'])
         t = Trade(self.id,
-                  self.exchange_symbol_to_std_symbol(msg['s']),
+                  symbol,
                   SELL if msg['m'] else BUY,
-                  Decimal(msg['q']),
-                  Decimal(msg['p']),
+                  self.numeric_type(msg['q']),
+                  self.price_type(symbol)(msg['p']),
                   self.timestamp_normalize(msg['T']),
                   id=str(msg['a']),
                   raw=msg)
@@ -206,8 +215,9 @@ class Binance(Feed, BinanceRestMixin):
         }
         """
         pair = self.exchange_symbol_to_std_symbol(msg['s'])
-        bid = Decimal(msg['b'])
-        ask = Decimal(msg['a'])
+        price_type = self.price_type(pair)
+        bid = price_type(msg['b'])
+        ask = price_type(msg['a'])
 
         # Binance does not have a timestamp in this update, but the two futures APIs do
         if 'E' in msg:
@@ -242,8 +252,8 @@ class Binance(Feed, BinanceRestMixin):
         liq = Liquidation(self.id,
                           pair,
                           SELL if msg['o']['S'] == 'SELL' else BUY,
-                          Decimal(msg['o']['q']),
-                          Decimal(msg['o']['p']),
+                          self.numeric_type(msg['o']['q']),
+                          self.price_type(pair)(msg['o']['p']),
                           None,
                           FILLED if msg['o']['X'] == 'FILLED' else UNFILLED,
                           self.timestamp_normalize(msg['E']),
@@ -267,28 +277,40 @@ class Binance(Feed, BinanceRestMixin):
             self.last_update_id[std_pair] = msg['u']
             return False
         else:
-            self._reset()
-            LOG.warning("%s: Missing book update detected, resetting book", self.id)
+            self._reset_symbol(std_pair)
+            LOG.warning("%s: Missing book update detected for %s, resynchronizing book", self.id, std_pair)
             return True
 
-    async def _snapshot(self, pair: str) -> None:
+    def _snapshot_depth(self) -> int:
         max_depth = self.max_depth if self.max_depth else 1000
         if max_depth not in self.valid_depths:
             for d in self.valid_depths:
                 if d > max_depth:
                     max_depth = d
                     break
+        return max_depth
 
-        resp = await self.http_conn.read(self.rest_endpoints[0].route('l2book', self.sandbox).format(pair, max_depth))
-        resp = json.loads(resp, parse_float=Decimal)
+    def snapshot_weight(self) -> int:
+        depth = self._snapshot_depth()
+        for limit, weight in self.depth_weights:
+            if depth <= limit:
+                return weight
+        return self.depth_weights[-1][1]
+
+    async def _snapshot(self, pair: str) -> None:
+        resp = await self.http_conn.read(self.rest_endpoints[0].route('l2book', self.sandbox).format(pair, self._snapshot_depth()))
+        resp = json.loads(resp, parse_float=self.numeric_type)
         timestamp = self.timestamp_normalize(resp['E']) if 'E' in resp else None
 
         std_pair = self.exchange_symbol_to_std_symbol(pair)
+        price_type = self.price_type(std_pair, book=True)
+        size_type = self.numeric_type
+        tick_size = self.tick_size(std_pair) if self.numeric_mode == SCALED_INT else None
         self.last_update_id[std_pair] = resp['lastUpdateId']
-        self._l2_book[std_pair] = OrderBook(self.id, std_pair, max_depth=self.max_depth, bids={Decimal(u[0]): Decimal(u[1]) for u in resp['bids']}, asks={Decimal(u[0]): Decimal(u[1]) for u in resp['asks']})
+        self._l2_book[std_pair] = OrderBook(self.id, std_pair, max_depth=self.max_depth, bids={price_type(u[0]): size_type(u[1]) for u in resp['bids']}, asks={price_type(u[0]): size_type(u[1]) for u in resp['asks']}, tick_size=tick_size, array_book=tick_size is not None)
         await self.book_callback(L2_BOOK, self._l2_book[std_pair], time.time(), timestamp=timestamp, raw=resp, sequence_number=self.last_update_id[std_pair])
 
-    async def _book(self, msg: dict, pair: str, timestamp: float):
+    async def _book(self, msg: dict, pair: str, timestamp: float, replayed=False):
         """
         {
             "e": "depthUpdate", // Event type
@@ -313,19 +335,26 @@ class Binance(Feed, BinanceRestMixin):
         exchange_pair = pair
         pair = self.exchange_symbol_to_std_symbol(pair)
 
-        if pair not in self._l2_book:
-            await self._snapshot(exchange_pair)
+        if pair not in self._l2_book or (not replayed and self.snapshot_scheduler.pending(pair)):
+            # buffer the update until the snapshot has been fetched, without holding up the other symbols
+            self.snapshot_scheduler.request(pair, partial(self._snapshot, exchange_pair), partial(self._book, replayed=True), msg, exchange_pair, timestamp, replayed=replayed)
+            return
 
         skip_update = self._check_update_id(pair, msg)
         if skip_update:
+            if pair not in self._l2_book:
+                # gap detected, only this symbol is resynchronized. The update is buffered and replayed against the new snapshot
+                self.snapshot_scheduler.request(pair, partial(self._snapshot, exchange_pair), partial(self._book, replayed=True), msg, exchange_pair, timestamp, replayed=replayed)
             return
 
         delta = {BID: [], ASK: []}
+        price_type = self.price_type(pair, book=True)
+        size_type = self.numeric_type
 
         for s, side in (('b', BID), ('a', ASK)):
             for update in msg[s]:
-                price = Decimal(update[0])
-                amount = Decimal(update[1])
+                price = price_type(update[0])
+                amount = size_type(update[1])
                 delta[side].append((price, amount))
 
                 if amount == 0:
@@ -360,17 +389,18 @@ class Binance(Feed, BinanceRestMixin):
         }
         """
         next_time = self.timestamp_normalize(msg['T']) if msg['T'] > 0 else None
-        rate = Decimal(msg['r']) if msg['r'] else None
+        rate = self.numeric_type(msg['r']) if msg['r'] else None
         if next_time is None:
             rate = None
 
+        symbol = self.exchange_symbol_to_std_symbol(msg['s'])
         f = Funding(self.id,
-                    self.exchange_symbol_to_std_symbol(msg['s']),
-                    Decimal(msg['p']),
+                    symbol,
+                    self.price_type(symbol)(msg['p']),
                     rate,
                     next_time,
                     self.timestamp_normalize(msg['E']),
-                    predicted_rate=Decimal(msg['P']) if 'P' in msg and msg['P'] is not None else None,
+                    predicted_rate=self.numeric_type(msg['P']) if 'P' in msg and msg['P'] is not None else None,
                     raw=msg)
         await self.callback(FUNDING, f, timestamp)
 
@@ -403,17 +433,19 @@ class Binance(Feed, BinanceRestMixin):
         """
         if self.candle_closed_only and not msg['k']['x']:
             return
+        symbol = self.exchange_symbol_to_std_symbol(msg['s'])
+        price_type = self.price_type(symbol)
         c = Candle(self.id,
-                   self.exchange_symbol_to_std_symbol(msg['s']),
+                   symbol,
                    msg['k']['t'] / 1000,
                    msg['k']['T'] / 1000,
                    msg['k']['i'],
                    msg['k']['n'],
-                   Decimal(msg['k']['o']),
-                   Decimal(msg['k']['c']),
-                   Decimal(msg['k']['h']),
-                   Decimal(msg['k']['l']),
-                   Decimal(msg['k']['v']),
+                   price_type(msg['k']['o']),
+                   price_type(msg['k']['c']),
+                   price_type(msg['k']['h']),
+                   price_type(msg['k']['l']),
+                   self.numeric_type(msg['k']['v']),
                    msg['k']['x'],
                    self.timestamp_normalize(msg['E']),
                    raw=msg)
@@ -496,7 +528,7 @@ class Binance(Feed, BinanceRestMixin):
         await self.callback(ORDER_INFO, oi, timestamp)
 
     async def message_handler(self, msg: str, conn, timestamp: float):
-        msg = json.loads(msg, parse_float=Decimal)
+        msg = json.loads(msg, parse_float=self.numeric_type)
 
         # Handle account updates from User Data Stream
         if self.requires_authentication:
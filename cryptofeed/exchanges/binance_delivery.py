@@ -27,6 +27,8 @@ class BinanceDelivery(Binance, BinanceDeliveryRestMixin):
     rest_endpoints = [RestEndpoint('https://dapi.binance.com', routes=Routes('/dapi/v1/exchangeInfo', l2book='/dapi/v1/depth?symbol={}&limit={}', authentication='/dapi/v1/listenKey'), sandbox='https://testnet.binancefuture.com')]
 
     valid_depths = [5, 10, 20, 50, 100, 500, 1000]
+    request_weight_limit = 2400 / 60
+    depth_weights = ((50, 2), (100, 5), (500, 10), (1000, 20))
     valid_depth_intervals = {'100ms', '250ms', '500ms'}
     websocket_channels = {
         **Binance.websocket_channels,
@@ -46,8 +48,8 @@ class BinanceDelivery(Binance, BinanceDeliveryRestMixin):
             self.last_update_id[pair] = msg['u']
             return False
         else:
-            self._reset()
-            LOG.warning("%s: Missing book update detected, resetting book", self.id)
+            self._reset_symbol(pair)
+            LOG.warning("%s: Missing book update detected for %s, resynchronizing book", self.id, pair)
             return True
 
     async def _account_update(self, msg: dict, timestamp: float):
@@ -190,7 +192,7 @@ class BinanceDelivery(Binance, BinanceDeliveryRestMixin):
         await self.callback(ORDER_INFO, oi, timestamp)
 
     async def message_handler(self, msg: str, conn, timestamp: float):
-        msg = json.loads(msg, parse_float=Decimal)
+        msg = json.loads(msg, parse_float=self.numeric_type)
 
         # Handle account updates from User Data Stream
         if self.requires_authentication:
@@ -19,3 +19,5 @@ class BinanceUS(Binance, BinanceUSRestMixin):
     id = BINANCE_US
     websocket_endpoints = [WebsocketEndpoint('wss://stream.binance.us:9443')]
     rest_endpoints = [RestEndpoint('https://api.binance.us', routes=Routes('/api/v3/exchangeInfo', l2book='/api/v3/depth?symbol={}&limit={}'))]
+    request_weight_limit = 1200 / 60
+    depth_weights = ((100, 1), (500, 5), (1000, 10), (5000, 50))
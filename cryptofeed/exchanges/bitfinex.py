@@ -115,7 +115,6 @@ class Bitfinex(Feed, BitfinexRestMixin):
                         LOG.warning('%s: No %s for symbol %s => Cryptofeed will subscribe to the wrong channel', self.id, chan, pair)
 
         self.handlers = {}  # maps a channel id (int) to a function
-        self.order_map = defaultdict(dict)
         self.seq_no = defaultdict(int)
 
     def __reset(self, conn: AsyncConnection):
@@ -136,9 +135,6 @@ class Bitfinex(Feed, BitfinexRestMixin):
                 if std_pair in self._l3_book:
                     del self._l3_book[std_pair]
 
-                if std_pair in self.order_map:
-                    del self.order_map[std_pair]
-
     async def _ticker(self, pair: str, msg: list, timestamp: float):
         if msg[1] == 'hb':
             return  # ignore heartbeats
@@ -253,25 +249,12 @@ class Bitfinex(Feed, BitfinexRestMixin):
                 LOG.warning('%s: Unexpected book L3 msg %s', self.id, msg)
             return
 
-        def add_to_book(side, price, order_id, amount):
-            if price in self._l3_book[pair].book[side]:
-                self._l3_book[pair].book[side][price][order_id] = amount
-            else:
-                self._l3_book[pair].book[side][price] = {order_id: amount}
-
-        def remove_from_book(side, order_id):
-            price = self.order_map[pair][side][order_id]['price']
-            del self._l3_book[pair].book[side][price][order_id]
-            if len(self._l3_book[pair].book[side][price]) == 0:
-                del self._l3_book[pair].book[side][price]
-
         delta = {BID: [], ASK: []}
 
         if isinstance(msg[1][0], list):
             # snapshot so clear orders
-            self.order_map[pair][BID] = {}
-            self.order_map[pair][ASK] = {}
-            self._l3_book[pair] = OrderBook(self.id, pair, max_depth=self.max_depth)
+            self._l3_book[pair] = OrderBook(self.id, pair, max_depth=self.max_depth, l3_book=True)
+            book = self._l3_book[pair].book
 
             for update in msg[1]:
                 order_id, price, amount = update
@@ -284,10 +267,12 @@ class Bitfinex(Feed, BitfinexRestMixin):
                     side = ASK
                     amount = - amount
 
-                self.order_map[pair][side][order_id] = {'price': price, 'amount': amount}
-                add_to_book(side, price, order_id, amount)
+                if order_id in book:
+                    book.remove(order_id)
+                book.add(side, order_id, price, amount)
         else:
             # book update
+            book = self._l3_book[pair].book
             order_id, price, amount = msg[1]
             price = Decimal(price)
             amount = Decimal(amount)
@@ -299,21 +284,23 @@ class Bitfinex(Feed, BitfinexRestMixin):
                 amount = abs(amount)
 
             if price == 0:
-                price = self.order_map[pair][side][order_id]['price']
-                remove_from_book(side, order_id)
-                del self.order_map[pair][side][order_id]
+                _, price, _ = book.remove(order_id)
                 delta[side].append((order_id, price, 0))
             else:
-                if order_id in self.order_map[pair][side]:
-                    del_price = self.order_map[pair][side][order_id]['price']
+                existing = book.get(order_id)
+                if existing is not None:
+                    del_side, del_price, _ = existing
                     delta[side].append((order_id, del_price, 0))
-                    # remove existing order before adding new one
                     delta[side].append((order_id, price, amount))
-                    remove_from_book(side, order_id)
+                    if del_side == side and del_price == price:
+                        # same level, the order keeps its place in the queue
+                        book.update(order_id, amount)
+                    else:
+                        book.remove(order_id)
+                        book.add(side, order_id, price, amount)
                 else:
                     delta[side].append((order_id, price, amount))
-                add_to_book(side, price, order_id, amount)
-                self.order_map[pair][side][order_id] = {'price': price, 'amount': amount}
+                    book.add(side, order_id, price, amount)
 
         await self.book_callback(L3_BOOK, self._l3_book[pair], timestamp, raw=msg, delta=delta, sequence_number=msg[-1])
 
@@ -48,6 +48,7 @@ class Bitget(Feed):
         POSITIONS: 'positions'
     }
     request_limit = 20
+    checksum_depth = 25
 
     @classmethod
     def timestamp_normalize(cls, ts: int) -> float:
@@ -233,7 +234,7 @@ class Bitget(Feed):
             asks = {Decimal(price): Decimal(amount) for price, amount in data['asks']}
             self._l2_book[symbol] = OrderBook(self.id, symbol, max_depth=self.max_depth, bids=bids, asks=asks, checksum_format=self.id)
 
-            if self.checksum_validation and self._l2_book[symbol].book.checksum() != (data['checksum'] & 0xFFFFFFFF):
+            if self.checksum_validation and not self.book_checksum.valid(self._l2_book[symbol], data['checksum'] & 0xFFFFFFFF):
                 raise BadChecksum
             await self.book_callback(L2_BOOK, self._l2_book[symbol], timestamp, checksum=data['checksum'], timestamp=self.timestamp_normalize(int(data['ts'])), raw=msg)
 
@@ -268,7 +269,7 @@ class Bitget(Feed):
                     else:
                         self._l2_book[symbol].book[side][price] = size
 
-            if self.checksum_validation and self._l2_book[symbol].book.checksum() != (data['checksum'] & 0xFFFFFFFF):
+            if self.checksum_validation and not self.book_checksum.valid(self._l2_book[symbol], data['checksum'] & 0xFFFFFFFF, delta):
                 raise BadChecksum
             await self.book_callback(L2_BOOK, self._l2_book[symbol], timestamp, delta=delta, checksum=data['checksum'], timestamp=self.timestamp_normalize(int(data['ts'])), raw=msg)
 
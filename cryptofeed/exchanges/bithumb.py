@@ -12,7 +12,7 @@ from datetime import timedelta
 
 from yapic import json
 
-from cryptofeed.symbols import Symbol, Symbols
+from cryptofeed.symbols import Symbol
 from cryptofeed.connection import AsyncConnection, RestEndpoint, Routes, WebsocketEndpoint
 from cryptofeed.defines import BUY, BITHUMB, SELL, TRADES
 from cryptofeed.feed import Feed
@@ -45,30 +45,21 @@ class Bithumb(Feed):
     def timestamp_normalize(cls, ts: dt) -> float:
         return (ts - timedelta(hours=9)).timestamp()
 
-    # Override symbol_mapping class method, because this bithumb is a very special case.
+    # Override _symbol_data class method, because this bithumb is a very special case.
     # There is no actual page in the API for reference info.
     # Need to query the ticker endpoint by quote currency for that info
     # To qeury the ticker endpoint, you need to know which quote currency you want. So far, seems like the exhcnage
     # only offers KRW and BTC as quote currencies.
     @classmethod
-    def symbol_mapping(cls, refresh=False) -> Dict:
-        if Symbols.populated(cls.id) and not refresh:
-            return Symbols.get(cls.id)[0]
-        try:
-            data = {}
-            for ep in cls.rest_endpoints[0].route('instruments'):
-                ret = cls.http_sync.read(ep, json=True, uuid=cls.id)
-                if 'BTC' in ep:
-                    data['BTC'] = ret
-                else:
-                    data['KRW'] = ret
-
-            syms, info = cls._parse_symbol_data(data)
-            Symbols.set(cls.id, syms, info)
-            return syms
-        except Exception as e:
-            LOG.error("%s: Failed to parse symbol information: %s", cls.id, str(e), exc_info=True)
-            raise
+    def _symbol_data(cls) -> dict:
+        data = {}
+        for ep in cls.rest_endpoints[0].route('instruments'):
+            ret = cls.http_sync.read(ep, json=True, uuid=cls.id)
+            if 'BTC' in ep:
+                data['BTC'] = ret
+            else:
+                data['KRW'] = ret
+        return data
 
     @classmethod
     def _parse_symbol_data(cls, data: dict) -> Tuple[Dict, Dict]:
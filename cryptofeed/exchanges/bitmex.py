@@ -365,7 +365,6 @@ class Bitmex(Feed, BitmexRestMixin):
         the Full bitmex book
         Docs, https://www.bitmex.com/app/wsAPI
         """
-        # PERF perf_start(self.id, 'book_msg')
 
         if not msg['data']:
             # see https://github.com/bmoscon/cryptofeed/issues/688
@@ -429,8 +428,6 @@ class Bitmex(Feed, BitmexRestMixin):
         else:
             LOG.warning("%s: Unexpected l2 Book message %s", self.id, msg)
             return
-        # PERF perf_end(self.id, 'book_msg')
-        # PERF perf_log(self.id, 'book_msg')
 
         self._l2_book[pair].timestamp = self.timestamp_normalize(msg["data"][0]["timestamp"]) \
             if "data" in msg and isinstance(msg["data"], list) and msg["data"] and "timestamp" in msg["data"][0] \
@@ -93,7 +93,8 @@ class Blockchain(Feed):
 
         if msg['event'] == 'snapshot':
             # Reset the book
-            self._l3_book[pair] = OrderBook(self.id, pair, max_depth=self.max_depth)
+            self._l3_book[pair] = OrderBook(self.id, pair, max_depth=self.max_depth, l3_book=True)
+        book = self._l3_book[pair].book
 
         for side in (BID, ASK):
             for update in msg[side + 's']:
@@ -101,16 +102,16 @@ class Blockchain(Feed):
                 qty = update['qty']
                 order_id = update['id']
 
+                existing = book.get(order_id)
                 if qty <= 0:
-                    del self._l3_book[pair].book[side][price][order_id]
+                    book.remove(order_id)
+                elif existing is not None and existing[0] == side and existing[1] == price:
+                    # same level, the order keeps its place in the queue
+                    book.update(order_id, qty)
                 else:
-                    if price in self._l3_book[pair].book[side]:
-                        self._l3_book[pair].book[side][price][order_id] = qty
-                    else:
-                        self._l3_book[pair].book[side][price] = {order_id: qty}
-
-                if len(self._l3_book[pair].book[side][price]) == 0:
-                    del self._l3_book[pair].book[side][price]
+                    if existing is not None:
+                        book.remove(order_id)
+                    book.add(side, order_id, price, qty)
 
                 delta[side].append((order_id, price, qty))
 
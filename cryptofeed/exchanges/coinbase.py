@@ -10,6 +10,7 @@ import hmac
 import logging
 import time
 from decimal import Decimal
+from functools import partial
 from typing import Dict, Tuple
 from collections import defaultdict
 
@@ -59,7 +60,6 @@ class Coinbase(Feed, CoinbaseRestMixin):
         self.__reset()
 
     def __reset(self):
-        self.order_map = {}
         self.order_type_map = {}
         self.seq_no = None
         self._l2_book = {}
@@ -142,32 +142,22 @@ class Coinbase(Feed, CoinbaseRestMixin):
         # TODO: not yet updated
         urls = [self.rest_endpoints[0].route('l3book', self.sandbox).format(pair) for pair in pairs]
 
-        results = []
-        for url in urls:
-            ret = await self.http_conn.read(url)
-            results.append(ret)
-            # rate limit - 3 per second
-            await asyncio.sleep(0.3)
+        # fetched concurrently, within the exchange's rate limit
+        results = await asyncio.gather(*[self.snapshot_scheduler.throttle(partial(self.http_conn.read, url)) for url in urls])
 
         timestamp = time.time()
         for res, pair in zip(results, pairs):
             orders = json.loads(res, parse_float=Decimal)
             npair = self.exchange_symbol_to_std_symbol(pair)
-            self._l3_book[npair] = OrderBook(self.id, pair, max_depth=self.max_depth)
+            self._l3_book[npair] = OrderBook(self.id, pair, max_depth=self.max_depth, l3_book=True)
             self.seq_no[npair] = orders['sequence']
+            book = self._l3_book[npair].book
             for side in (BID, ASK):
                 for price, size, order_id in orders[side + 's']:
-                    price = Decimal(price)
-                    size = Decimal(size)
-                    if price in self._l3_book[npair].book[side]:
-                        self._l3_book[npair].book[side][price][order_id] = size
-                    else:
-                        self._l3_book[npair].book[side][price] = {order_id: size}
-                    self.order_map[order_id] = (price, size)
+                    book.add(side, order_id, Decimal(price), Decimal(size))
             await self.book_callback(L3_BOOK, self._l3_book[npair], timestamp, raw=orders)
 
     async def message_handler(self, msg: str, conn: AsyncConnection, timestamp: float):
-        # PERF perf_start(self.id, 'msg')
         msg = json.loads(msg, parse_float=Decimal)
         if 'channel' in msg and 'events' in msg:
             for event in msg['events']:
@@ -202,8 +192,6 @@ class Coinbase(Feed, CoinbaseRestMixin):
                     pass
                 else:
                     LOG.warning("%s: Invalid message type %s", self.id, msg)
-                # PERF perf_end(self.id, 'msg')
-                # PERF perf_log(self.id, 'msg')
 
     async def get_private_parameters(self, chan: str, product_ids_str: list) -> dict:
         timestamp = str(int(time.time()))
@@ -7,6 +7,7 @@ associated with this software.
 from collections import defaultdict
 import logging
 from decimal import Decimal
+from functools import partial
 import time
 from typing import Dict, Tuple
 
@@ -148,7 +149,7 @@ class Gateio(Feed):
 
         return skip_update
 
-    async def _process_l2_book(self, msg: dict, timestamp: float):
+    async def _process_l2_book(self, msg: dict, timestamp: float, replayed=False):
         """
         {
             'time': 1618961347,
@@ -167,8 +168,10 @@ class Gateio(Feed):
         }
         """
         symbol = self.exchange_symbol_to_std_symbol(msg['result']['s'])
-        if symbol not in self._l2_book:
-            await self._snapshot(msg['result']['s'])
+        if symbol not in self._l2_book or (not replayed and self.snapshot_scheduler.pending(symbol)):
+            # buffer the update until the snapshot has been fetched, without holding up the other symbols
+            self.snapshot_scheduler.request(symbol, partial(self._snapshot, msg['result']['s']), partial(self._process_l2_book, replayed=True), msg, timestamp, replayed=replayed)
+            return
 
         skip_update = self._check_update_id(symbol, msg['result'])
         if skip_update:
@@ -8,6 +8,7 @@ associated with this software.
 import logging
 from collections import defaultdict
 from decimal import Decimal
+from functools import partial
 from yapic import json
 import time
 
@@ -173,7 +174,7 @@ class GateioFutures(Gateio):
         # self._l2_book[symbol].book.asks = {Decimal(price): Decimal(amount) for price, amount in data['asks']}
         await self.book_callback(L2_BOOK, self._l2_book[symbol], time.time(), raw=data, sequence_number=data['id'])
 
-    async def _process_l2_book(self, msg: dict, timestamp: float):
+    async def _process_l2_book(self, msg: dict, timestamp: float, replayed=False):
         """
         {
             "time": 1615366381,
@@ -210,8 +211,10 @@ class GateioFutures(Gateio):
         }
         """
         symbol = self.exchange_symbol_to_std_symbol(msg['result']['s'])
-        if symbol not in self._l2_book:
-            await self._snapshot(msg['result']['s'])
+        if symbol not in self._l2_book or (not replayed and self.snapshot_scheduler.pending(symbol)):
+            # buffer the update until the snapshot has been fetched, without holding up the other symbols
+            self.snapshot_scheduler.request(symbol, partial(self._snapshot, msg['result']['s']), partial(self._process_l2_book, replayed=True), msg, timestamp, replayed=replayed)
+            return
 
         skip_update = self._check_update_id(symbol, msg['result'])
         if skip_update:
@@ -40,6 +40,8 @@ class Gemini(Feed, GeminiRestMixin):
     ]
     rest_endpoints = [RestEndpoint('https://api.gemini.com', routes=Routes('/v1/symbols/details/{}', currencies='/v1/symbols', authentication='/v1/order/events'))]
     request_limit = 1
+    # one symbol endpoint per currency, read one at a time to stay within the rate limit
+    symbol_concurrency = 1
 
     @classmethod
     def timestamp_normalize(cls, ts: float) -> float:
@@ -50,7 +50,6 @@ class IndependentReserve(Feed):
 
     def __reset(self):
         self._l3_book = {}
-        self._order_ids = defaultdict(dict)
         self._sequence_no = {}
 
     async def _trade(self, msg: dict, timestamp: float):
@@ -130,18 +129,12 @@ class IndependentReserve(Feed):
                 if instrument not in self._l3_book:
                     await self._snapshot(base, quote)
 
+                book = self._l3_book[instrument].book
                 if msg['Event'] == 'OrderCanceled':
                     uuid = msg['Data']['OrderGuid']
-                    if uuid in self._order_ids[instrument]:
-                        price, side = self._order_ids[instrument][uuid]
-
-                        if price in self._l3_book[instrument].book[side] and uuid in self._l3_book[instrument].book[side][price]:
-                            del self._l3_book[instrument].book[side][price][uuid]
-                            if len(self._l3_book[instrument].book[side][price]) == 0:
-                                del self._l3_book[instrument].book[side][price]
-                            delta[side].append((uuid, price, 0))
-
-                        del self._order_ids[instrument][uuid]
+                    if uuid in book:
+                        side, price, _ = book.remove(uuid)
+                        delta[side].append((uuid, price, 0))
                     else:
                         # during snapshots we might get cancelation messages that have already been removed
                         # from the snapshot, so we don't have anything to process, and we should not call the client callback
@@ -151,29 +144,22 @@ class IndependentReserve(Feed):
                     price = msg['Data']['Price'][quote]
                     size = msg['Data']['Volume']
                     side = BID if msg['Data']['OrderType'].endswith('Bid') else ASK
-                    self._order_ids[instrument][uuid] = (price, side)
 
-                    if price in self._l3_book[instrument].book[side]:
-                        self._l3_book[instrument].book[side][price][uuid] = size
-                    else:
-                        self._l3_book[instrument].book[side][price] = {uuid: size}
+                    if uuid in book:
+                        book.remove(uuid)
+                    book.add(side, uuid, price, size)
                     delta[side].append((uuid, price, size))
 
-                elif msg['event'] == 'OrderChanged':
+                elif msg['Event'] == 'OrderChanged':
                     uuid = msg['Data']['OrderGuid']
                     size = msg['Data']['Volume']
-                    side = BID if msg['Data']['OrderType'].endswith('Bid') else ASK
-                    if uuid in self._order_ids[instrument]:
-                        price, side = self._order_ids[instrument][uuid]
-
+                    if uuid in book:
                         if size == 0:
-                            del self._l3_book[instrument][side][price][uuid]
-                            if len(self._l3_book[instrument][side][price]) == 0:
-                                del self._l3_book[instrument][side][price]
+                            side, price, _ = book.remove(uuid)
                         else:
-                            self._l3_book[instrument][side][price][uuid] = size
-
-                        del self._order_ids[instrument][uuid]
+                            # the order keeps its place in the queue
+                            book.update(uuid, size)
+                            side, price, _ = book.get(uuid)
                         delta[side].append((uuid, price, size))
                     else:
                         continue
@@ -191,19 +177,12 @@ class IndependentReserve(Feed):
         ret = json.loads(ret, parse_float=Decimal)
 
         normalized = self.exchange_symbol_to_std_symbol(f"{base}-{quote}")
-        self._l3_book[normalized] = OrderBook(self.id, normalized, max_depth=self.max_depth)
+        self._l3_book[normalized] = OrderBook(self.id, normalized, max_depth=self.max_depth, l3_book=True)
+        book = self._l3_book[normalized].book
 
         for side, key in [(BID, 'BuyOrders'), (ASK, 'SellOrders')]:
             for order in ret[key]:
-                price = Decimal(order['Price'])
-                size = Decimal(order['Volume'])
-                uuid = order['Guid']
-                self._order_ids[normalized][uuid] = (price, side)
-
-                if price in self._l3_book[normalized].book[side]:
-                    self._l3_book[normalized].book[side][price][uuid] = size
-                else:
-                    self._l3_book[normalized].book[side][price] = {uuid: size}
+                book.add(side, order['Guid'], Decimal(order['Price']), Decimal(order['Volume']))
         await self.book_callback(L3_BOOK, self._l3_book[normalized], timestamp, raw=ret)
 
     async def message_handler(self, msg: str, conn: AsyncConnection, timestamp: float):
@@ -31,6 +31,7 @@ class Kraken(Feed, KrakenRestMixin):
     valid_candle_intervals = {'1m', '5m', '15m', '30m', '1h', '4h', '1d', '1w', '15d'}
     candle_interval_map = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '1h': 60, '4h': 240, '1d': 1440, '1w': 10080, '15d': 21600}
     valid_depths = [10, 25, 100, 500, 1000]
+    checksum_depth = 10
     websocket_channels = {
         L2_BOOK: 'book',
         TRADES: 'trade',
@@ -156,9 +157,14 @@ class Kraken(Feed, KrakenRestMixin):
                                 delta[side].append((price, size))
                                 self._l2_book[pair].book[side][price] = size
 
-            if self.checksum_validation and 'c' in msg[0] and self._l2_book[pair].book.checksum() != int(msg[0]['c']):
-                raise BadChecksum("Checksum validation on orderbook failed")
-            await self.book_callback(L2_BOOK, self._l2_book[pair], timestamp, delta=delta, raw=msg, checksum=int(msg[0]['c']) if 'c' in msg[0] else None)
+            # updates to both sides can arrive as separate ask and bid dicts, with the checksum in the last one
+            checksum = int(msg[-1]['c']) if 'c' in msg[-1] else None
+            if self.checksum_validation:
+                if checksum is None:
+                    self.book_checksum.invalidate(self._l2_book[pair], delta)
+                elif not self.book_checksum.valid(self._l2_book[pair], checksum, delta):
+                    raise BadChecksum("Checksum validation on orderbook failed")
+            await self.book_callback(L2_BOOK, self._l2_book[pair], timestamp, delta=delta, raw=msg, checksum=checksum)
 
     async def _candle(self, msg: list, pair: str, timestamp: float):
         """
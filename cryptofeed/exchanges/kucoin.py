@@ -5,6 +5,7 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
 from decimal import Decimal
+from functools import partial
 import logging
 import time
 from typing import Dict, Tuple
@@ -193,7 +194,7 @@ class KuCoin(Feed):
 
         await self.book_callback(L2_BOOK, self._l2_book[symbol], timestamp, raw=data, sequence_number=int(data['sequence']))
 
-    async def _process_l2_book(self, msg: dict, symbol: str, timestamp: float):
+    async def _process_l2_book(self, msg: dict, symbol: str, timestamp: float, replayed=False):
         """
         {
             'data': {
@@ -212,10 +213,13 @@ class KuCoin(Feed):
         """
         data = msg['data']
         sequence = data['sequenceStart']
-        if symbol not in self._l2_book or sequence > self.seq_no[symbol] + 1:
-            if symbol in self.seq_no and sequence > self.seq_no[symbol] + 1:
+        pending = not replayed and self.snapshot_scheduler.pending(symbol)
+        if pending or symbol not in self._l2_book or sequence > self.seq_no[symbol] + 1:
+            if not pending and symbol in self.seq_no and sequence > self.seq_no[symbol] + 1:
                 LOG.warning("%s: Missing book update detected, resetting book", self.id)
-            await self._snapshot(symbol)
+            # buffer the update until the snapshot has been fetched, without holding up the other symbols
+            self.snapshot_scheduler.request(symbol, partial(self._snapshot, symbol), partial(self._process_l2_book, replayed=True), msg, symbol, timestamp, replayed=replayed)
+            return
 
         data = msg['data']
         if sequence < self.seq_no[symbol]:
@@ -12,10 +12,9 @@ import asyncio
 import base64
 import hmac
 import logging
-import requests
 import time
 
-from cryptofeed.connection import AsyncConnection, RestEndpoint, Routes, WebsocketEndpoint
+from cryptofeed.connection import AsyncConnection, RestEndpoint, Routes, WebsocketEndpoint, http_pool
 from cryptofeed.defines import CALL, CANCELLED, FILL_OR_KILL, FUTURES, IMMEDIATE_OR_CANCEL, MAKER_OR_CANCEL, MARKET, OKX as OKX_str, LIQUIDATIONS, BUY, OPEN, OPTION, PARTIAL, PERPETUAL, PUT, SELL, FILLED, ASK, BID, FUNDING, L2_BOOK, OPEN_INTEREST, TICKER, TRADES, ORDER_INFO, CANDLES, SPOT, UNFILLED, LIMIT
 from cryptofeed.exchanges.mixins.okx_rest import OKXRestMixin
 from cryptofeed.feed import Feed
@@ -47,6 +46,7 @@ class OKX(Feed, OKXRestMixin):
     ]
     rest_endpoints = [RestEndpoint('https://www.okx.com', routes=Routes(['/api/v5/public/instruments?instType=SPOT', '/api/v5/public/instruments?instType=SWAP', '/api/v5/public/instruments?instType=FUTURES', '/api/v5/public/instruments?instType=OPTION&uly=BTC-USD', '/api/v5/public/instruments?instType=OPTION&uly=ETH-USD'], liquidations='/api/v5/public/liquidation-orders?instType={}&limit=100&state={}&uly={}'))]
     request_limit = 20
+    checksum_depth = 25
 
     @classmethod
     def timestamp_normalize(cls, ts: float) -> float:
@@ -280,7 +280,7 @@ class OKX(Feed, OKXRestMixin):
                 asks = {Decimal(price): Decimal(amount) for price, amount, *_ in update['asks']}
                 self._l2_book[pair] = OrderBook(self.id, pair, max_depth=self.max_depth, checksum_format=self.id, bids=bids, asks=asks)
 
-                if self.checksum_validation and self._l2_book[pair].book.checksum() != (update['checksum'] & 0xFFFFFFFF):
+                if self.checksum_validation and not self.book_checksum.valid(self._l2_book[pair], update['checksum'] & 0xFFFFFFFF):
                     raise BadChecksum
                 await self.book_callback(L2_BOOK, self._l2_book[pair], timestamp, timestamp=self.timestamp_normalize(int(update['ts'])), checksum=update['checksum'] & 0xFFFFFFFF, raw=msg)
         else:
@@ -301,7 +301,7 @@ class OKX(Feed, OKXRestMixin):
                         else:
                             delta[s].append((price, amount))
                             self._l2_book[pair].book[s][price] = amount
-                if self.checksum_validation and self._l2_book[pair].book.checksum() != (update['checksum'] & 0xFFFFFFFF):
+                if self.checksum_validation and not self.book_checksum.valid(self._l2_book[pair], update['checksum'] & 0xFFFFFFFF, delta):
                     raise BadChecksum
                 await self.book_callback(L2_BOOK, self._l2_book[pair], timestamp, timestamp=self.timestamp_normalize(int(update['ts'])), raw=msg, delta=delta, checksum=update['checksum'] & 0xFFFFFFFF)
 
@@ -486,7 +486,7 @@ class OKX(Feed, OKXRestMixin):
 
     def _get_server_time(self):
         endpoint = "public/time"
-        response = requests.get(self.api + endpoint)
+        response = http_pool.sync_session().get(self.api + endpoint)
         if response.status_code == 200:
             return response.json()['data'][0]['ts']
         else:
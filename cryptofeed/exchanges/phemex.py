@@ -7,7 +7,7 @@ associated with this software.
 import hmac
 import time
 from collections import defaultdict
-from cryptofeed.symbols import Symbol
+from cryptofeed.symbols import Symbol, Symbols
 import logging
 from decimal import Decimal
 from typing import Dict, Tuple
@@ -26,7 +26,6 @@ class Phemex(Feed):
     id = PHEMEX
     websocket_endpoints = [WebsocketEndpoint('wss://phemex.com/ws', sandbox='wss://testnet.phemex.com/ws', limit=20)]
     rest_endpoints = [RestEndpoint('https://api.phemex.com', routes=Routes('/exchange/public/cfg/v2/products'))]
-    price_scale = {}
     valid_candle_intervals = ('1m', '5m', '15m', '30m', '1h', '4h', '1d', '1M', '1Q', '1Y')
     candle_interval_map = {interval: second for interval, second in zip(valid_candle_intervals, [60, 300, 900, 1800, 3600, 14400, 86400, 604800, 2592000, 7776000, 31104000])}
 
@@ -60,7 +59,7 @@ class Phemex(Feed):
             # the price scale for spot symbols is not reported via the API but it is documented
             # here in the API docs: https://github.com/phemex/phemex-api-docs/blob/master/Public-Spot-API-en.md#spot-currency-and-symbols
             # the default value for spot is 10^8
-            cls.price_scale[s.normalized] = 10 ** entry.get('priceScale', 8)
+            info['price_scale'][s.normalized] = 10 ** entry.get('priceScale', 8)
         return ret, info
 
     def __init__(self, **kwargs):
@@ -68,6 +67,8 @@ class Phemex(Feed):
         # Phemex only allows 5 connections, with 20 subscriptions per connection, check we arent over the limit
         if sum(map(len, self.subscription.values())) > 100:
             raise ValueError(f"{self.id} only allows a maximum of 100 symbol/channel subscriptions")
+        # kept with the rest of the symbol information, so it is also available when that comes from the symbol cache
+        self.price_scale = Symbols.get(self.id)[1]['price_scale']
 
     def __reset(self, conn: AsyncConnection):
         if self.std_channel_to_exchange(L2_BOOK) in conn.subscription:
@@ -6,25 +6,45 @@ associated with this software.
 '''
 import asyncio
 from collections import defaultdict
+from decimal import Decimal
+from functools import partial
 import logging
 from typing import Tuple, Callable, List, Union
 
 from aiohttp.typedefs import StrOrURL
 
+from cryptofeed.backends.backend import BLOCK
 from cryptofeed.callback import Callback
-from cryptofeed.connection import AsyncConnection, HTTPAsyncConn, WSAsyncConn
+from cryptofeed.connection import AsyncConnection, HTTPAsyncConn, WSAsyncConn, http_pool
 from cryptofeed.connection_handler import ConnectionHandler
-from cryptofeed.defines import BALANCES, CANDLES, FUNDING, INDEX, L2_BOOK, L3_BOOK, LIQUIDATIONS, OPEN_INTEREST, ORDER_INFO, POSITIONS, TICKER, TRADES, FILLS
+from cryptofeed.defines import BALANCES, CANDLES, DECIMAL, FUNDING, INDEX, L2_BOOK, L3_BOOK, LIQUIDATIONS, OPEN_INTEREST, ORDER_INFO, POSITIONS, SCALED_INT, TICKER, TRADES, FILLS
 from cryptofeed.exceptions import BidAskOverlapping
 from cryptofeed.exchange import Exchange
+from cryptofeed.symbols import Symbols
 from cryptofeed.types import OrderBook
+from cryptofeed.util.checksum import BookChecksum
+from cryptofeed.util.conflation import BookConflator
+from cryptofeed.util.perf import latency
+from cryptofeed.util.snapshot import SnapshotScheduler
 
 
 LOG = logging.getLogger('feedhandler')
 
 
 class Feed(Exchange):
-    def __init__(self, candle_interval='1m', candle_closed_only=True, timeout=120, timeout_interval=30, retries=10, symbols=None, channels=None, subscription=None, callbacks=None, max_depth=0, checksum_validation=False, cross_check=False, exceptions=None, log_message_on_error=False, delay_start=0, http_proxy: StrOrURL = None, **kwargs):
+    # numeric modes an exchange's parsers support, see numeric_mode below
+    numeric_modes = (DECIMAL,)
+    # maximum number of concurrent order book snapshot requests, see SnapshotScheduler
+    snapshot_concurrency = 8
+    # request weight per second, for exchanges that limit requests by weight. Snapshots are then rate
+    # limited by their weight (snapshot_weight) rather than by request_limit
+    request_weight_limit = NotImplemented
+    # feeds start from stale cached symbols and refresh them in the background (see start)
+    stale_symbols_ok = True
+    # number of levels per side covered by the exchange's book checksums, see BookChecksum
+    checksum_depth = NotImplemented
+
+    def __init__(self, candle_interval='1m', candle_closed_only=True, timeout=120, timeout_interval=30, retries=10, symbols=None, channels=None, subscription=None, callbacks=None, max_depth=0, checksum_validation=False, cross_check=False, exceptions=None, log_message_on_error=False, delay_start=0, http_proxy: StrOrURL = None, numeric_mode=DECIMAL, book_interval=0, book_top_depth=0, **kwargs):
         """
         candle_interval: str
             the candle interval. See the specific exchange to see what intervals they support
@@ -43,8 +63,9 @@ class Feed(Exchange):
             Maximum number of levels per side to return in book updates. 0 is the default, and indicates no trimming of levels should be performed.
         candle_interval: str
             Length of time between a candle's Open and Close. Valid on exchanges with support for candles
-        checksum_validation: bool
-            Toggle checksum validation, when supported by an exchange.
+        checksum_validation: bool, int
+            Toggle checksum validation, when supported by an exchange. An int N validates every Nth update of each symbol
+            (and every snapshot).
         cross_check: bool
             Toggle a check for a crossed book. Should not be needed on exchanges that support
             checksums or provide message sequence numbers.
@@ -59,12 +80,27 @@ class Feed(Exchange):
             on a single exchange, you may encounter 429s. You can use this to stagger the starts.
         http_proxy: str
             URL of proxy server. Passed to HTTPPoll and HTTPAsyncConn. Only used for HTTP GET requests.
+        numeric_mode: str
+            How prices and sizes are represented in the data types and order books. DECIMAL (the default) uses
+            decimal.Decimal, FLOAT uses float and SCALED_INT uses integer order book prices (the number of ticks,
+            using the book's tick_size) and float sizes. The other data types carry no tick size, so in SCALED_INT
+            mode their prices are floats, as they are stored by the backends. Only available on exchanges that list
+            the mode in numeric_modes.
+        book_interval: float
+            Conflate L2 book updates: each symbol's book is passed to the callbacks at most once every book_interval
+            seconds, with the deltas in between merged into one. 0 (the default) passes on every update. See BookConflator
+        book_top_depth: int
+            Track the top book_top_depth levels of each side of L2 books (available as top on the book). Only updates
+            that change them are passed to the callbacks, with the deltas of the updates in between merged in. With
+            book_interval, updates that change them are passed on immediately and the others once the interval expires
         """
         super().__init__(**kwargs)
         self.log_on_error = log_message_on_error
         self.retries = retries
         self.exceptions = exceptions
         self.connection_handlers = []
+        # connections built by FeedHandler.shards, reused by the first start so they aren't created twice
+        self._connections = None
         self.timeout = timeout
         self.timeout_interval = timeout_interval
         self.subscription = defaultdict(set)
@@ -81,6 +117,19 @@ class Feed(Exchange):
         self.candle_interval = candle_interval
         self.candle_closed_only = candle_closed_only
         self._sequence_no = {}
+        # exchanges without a documented limit get a conservative default
+        if self.request_weight_limit is not NotImplemented:
+            self.snapshot_scheduler = SnapshotScheduler(self.id, self.request_weight_limit, concurrency=self.snapshot_concurrency, cost=self.snapshot_weight())
+        else:
+            self.snapshot_scheduler = SnapshotScheduler(self.id, 10 if self.request_limit is NotImplemented else self.request_limit, concurrency=self.snapshot_concurrency)
+        self.book_checksum = BookChecksum(self.checksum_depth, interval=int(checksum_validation)) if checksum_validation and self.checksum_depth is not NotImplemented else None
+        self.book_conflator = BookConflator(self.id, partial(self.callback, L2_BOOK), book_interval or None, depth=book_top_depth) if book_interval or book_top_depth else None
+
+        if numeric_mode not in self.numeric_modes:
+            raise ValueError(f"Numeric mode must be one of {self.numeric_modes} on {self.id}")
+        self.numeric_mode = numeric_mode
+        self.numeric_type = Decimal if numeric_mode == DECIMAL else float
+        self._price_types = {}
 
         if self.valid_candle_intervals != NotImplemented:
             if candle_interval not in self.valid_candle_intervals:
@@ -146,6 +195,38 @@ class Feed(Exchange):
             if not isinstance(callback, list):
                 self.callbacks[key] = [callback]
 
+    def price_type(self, symbol: str, book=False) -> Callable:
+        """
+        Returns the function used to convert prices for the (normalized) symbol in the feed's numeric_mode.
+        Only order book prices (book=True) are scaled to ticks in SCALED_INT mode, other prices are floats
+        """
+        if not book and self.numeric_mode == SCALED_INT:
+            return float
+        try:
+            return self._price_types[symbol]
+        except KeyError:
+            if self.numeric_mode == SCALED_INT:
+                ticks_per_unit = 1 / float(self.tick_size(symbol))
+
+                def price_type(value):
+                    return int(round(float(value) * ticks_per_unit))
+                self._price_types[symbol] = price_type
+            else:
+                self._price_types[symbol] = self.numeric_type
+            return self._price_types[symbol]
+
+    def snapshot_weight(self) -> int:
+        """
+        weight of an order book snapshot request, see request_weight_limit
+        """
+        return 1
+
+    def tick_size(self, symbol: str) -> Decimal:
+        try:
+            return Decimal(str(Symbols.get(self.id)[1]['tick_size'][symbol]))
+        except KeyError:
+            raise ValueError(f'{self.id}: no tick size available for {symbol}')
+
     def _connect_rest(self):
         """
         Child classes should override this method to generate connection objects that
@@ -244,7 +325,10 @@ class Feed(Exchange):
         book.sequence_number = sequence_number
         book.delta = delta
         book.checksum = checksum
-        await self.callback(book_type, book, receipt_timestamp)
+        if self.book_conflator is not None and book_type == L2_BOOK:
+            await self.book_conflator.update(book, receipt_timestamp)
+        else:
+            await self.callback(book_type, book, receipt_timestamp)
 
     def check_bid_ask_overlapping(self, data):
         bid, ask = data.book.bids, data.book.asks
@@ -256,6 +340,8 @@ class Feed(Exchange):
     async def callback(self, data_type, obj, receipt_timestamp):
         for cb in self.callbacks[data_type]:
             await cb(obj, receipt_timestamp)
+        if latency.enabled:
+            latency.record_callback(self.id, data_type, obj, receipt_timestamp)
 
     async def message_handler(self, msg: str, conn: AsyncConnection, timestamp: float):
         raise NotImplementedError
@@ -268,6 +354,11 @@ class Feed(Exchange):
 
     async def shutdown(self):
         LOG.info('%s: feed shutdown starting...', self.id)
+        self.snapshot_scheduler.stop()
+        if self.book_conflator is not None:
+            self.book_conflator.stop()
+            # so the backends are stopped with the book's latest state
+            await self.book_conflator.flush()
         await self.http_conn.close()
 
         for callbacks in self.callbacks.values():
@@ -283,11 +374,32 @@ class Feed(Exchange):
         for c in self.connection_handlers:
             c.running = False
 
-    def start(self, loop: asyncio.AbstractEventLoop):
+    async def _refresh_symbols(self):
+        LOG.info('%s: refreshing cached symbol information', self.id)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, partial(self.symbol_mapping, refresh=True))
+        except Exception:
+            # logged by symbol_mapping, the cached symbols stay in use
+            return
+        self.normalized_symbol_mapping, _ = Symbols.get(self.id)
+        self.exchange_symbol_mapping = {value: key for key, value in self.normalized_symbol_mapping.items()}
+
+    def start(self, loop: asyncio.AbstractEventLoop, connections: List[int] = None):
         """
         Create tasks for exchange interfaces and backends
+
+        connections: list of int
+            indices of the connections (as returned by connect) to start. If None, all connections are started.
         """
-        for conn, sub, handler, auth in self.connect():
+        if Symbols.stale(self.id):
+            loop.create_task(self._refresh_symbols())
+        if self.config.http_pool.prewarm and self.rest_endpoints is not NotImplemented:
+            loop.create_task(http_pool.prewarm([ep.sandbox if self.sandbox and ep.sandbox else ep.address for ep in self.rest_endpoints]))
+
+        planned, self._connections = self._connections, None
+        for index, (conn, sub, handler, auth) in enumerate(planned if planned is not None else self.connect()):
+            if connections is not None and index not in connections:
+                continue
             self.connection_handlers.append(ConnectionHandler(conn, sub, handler, auth, self.retries, timeout=self.timeout, timeout_interval=self.timeout_interval, exceptions=self.exceptions, log_on_error=self.log_on_error, start_delay=self.start_delay))
             self.connection_handlers[-1].start(loop)
 
@@ -296,7 +408,7 @@ class Feed(Exchange):
                 if hasattr(callback, 'start'):
                     LOG.info('%s: starting backend task %s with multiprocessing=%s', self.id, self.backend_name(callback), 'True' if self.config.backend_multiprocessing else 'False')
                     # Backends start tasks to write messages
-                    callback.start(loop, multiprocess=self.config.backend_multiprocessing)
+                    callback.start(loop, multiprocess=self.config.backend_multiprocessing, max_size=self.config.backend_queue.max_size or 0, overflow=self.config.backend_queue.overflow or BLOCK, spill=self.config.backend_queue.spill)
 
     def backend_name(self, callback):
         if hasattr(callback, '__class__'):
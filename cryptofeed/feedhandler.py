@@ -5,12 +5,15 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
 import asyncio
-from cryptofeed.connection import Connection
+from cryptofeed.connection import Connection, http_pool
 import logging
+from multiprocessing import Process
+import os
 import signal
 from signal import SIGABRT, SIGINT, SIGTERM
 import sys
-from typing import List
+import time
+from typing import Dict, List
 
 try:
     # unix / macos only
@@ -27,6 +30,8 @@ from cryptofeed.feed import Feed
 from cryptofeed.log import get_logger
 from cryptofeed.nbbo import NBBO
 from cryptofeed.exchanges import EXCHANGE_MAP
+from cryptofeed.util.perf import latency
+from cryptofeed.util.split import by_weight
 
 
 LOG = logging.getLogger('feedhandler')
@@ -60,6 +65,9 @@ class FeedHandler:
         self.config = Config(config=config)
         self.raw_data_collection = None
         self.running = False
+        # when running as a shard worker, maps feed index -> indices of the connections to start
+        self._shard = None
+        self._unhandled_exception = None
         if raw_data_collection:
             Connection.raw_data_callback = raw_data_collection
             self.raw_data_collection = raw_data_collection
@@ -78,6 +86,12 @@ class FeedHandler:
             except ImportError:
                 LOG.info("FH: uvloop not initialized")
 
+        if self.config.latency_instrumentation:
+            latency.enable()
+
+        if self.config.http_pool:
+            http_pool.configure(**self.config.http_pool)
+
     def add_feed(self, feed, loop=None, **kwargs):
         """
         feed: str or class
@@ -117,7 +131,8 @@ class FeedHandler:
         """
         cb = NBBO(callback, symbols)
         for feed in feeds:
-            self.add_feed(feed(channels=[L2_BOOK], symbols=symbols, callbacks={L2_BOOK: cb}, config=config))
+            # NBBO only uses the best bid and ask, so updates that do not change them are not passed on
+            self.add_feed(feed(channels=[L2_BOOK], symbols=symbols, callbacks={L2_BOOK: cb}, config=config, book_top_depth=1))
 
     def run(self, start_loop: bool = True, install_signal_handlers: bool = True, exception_handler=None):
         """
@@ -139,8 +154,8 @@ class FeedHandler:
         if install_signal_handlers:
             setup_signal_handlers(loop)
 
-        for feed in self.feeds:
-            feed.start(loop)
+        for index, feed in enumerate(self.feeds):
+            feed.start(loop, connections=self._shard[index] if self._shard else None)
 
         if not start_loop:
             return
@@ -153,12 +168,118 @@ class FeedHandler:
             LOG.info('FH: System Exit received - shutting down')
         except Exception as why:
             LOG.exception('FH: Unhandled %r - shutting down', why)
+            self._unhandled_exception = why
         finally:
             self.stop(loop=loop)
             self.close(loop=loop)
 
         LOG.info('FH: leaving run()')
 
+    def shards(self, workers: int) -> List[Dict[int, List[int]]]:
+        """
+        Split the connections of all feeds across (at most) workers shards. Each shard maps a
+        feed index to the indices of that feed's connections (see Feed.connect) it should run.
+        Connections are balanced by the number of channel/symbol pairs they subscribe to. The
+        connections are kept on the feeds, so the shards started from this process reuse them.
+        """
+        units = []
+        weights = []
+        for feed_index, feed in enumerate(self.feeds):
+            feed._connections = feed.connect()
+            for conn_index, (conn, _, _, _) in enumerate(feed._connections):
+                units.append((feed_index, conn_index))
+                weights.append(max(1, sum(len(v) for v in conn.subscription.values())) if getattr(conn, 'subscription', None) else 1)
+
+        ret = []
+        for shard in by_weight(units, weights, workers):
+            assignment = {}
+            for feed_index, conn_index in shard:
+                assignment.setdefault(feed_index, []).append(conn_index)
+            ret.append(assignment)
+        return ret
+
+    def _run_shard(self, shard: Dict[int, List[int]], exception_handler=None):
+        # runs in the worker process. Each worker has its own event loop and
+        # starts (and stops) its own copies of the callbacks and backends
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.feeds = [self.feeds[index] for index in shard]
+        self._shard = {i: connections for i, connections in enumerate(shard.values())}
+        self.run(exception_handler=exception_handler)
+        if self._unhandled_exception is not None:
+            # non zero exit code so the supervisor restarts the shard
+            sys.exit(1)
+
+    def _start_shard(self, shard_id: int, shard: Dict[int, List[int]], exception_handler=None) -> Process:
+        proc = Process(target=self._run_shard, args=(shard, exception_handler), name=f'cryptofeed-shard-{shard_id}', daemon=False)
+        proc.start()
+        LOG.info('FH: started shard %d (pid %d) running %d connection(s) from %d feed(s)', shard_id, proc.pid, sum(map(len, shard.values())), len(shard))
+        return proc
+
+    def run_sharded(self, workers: int = None, restart: bool = True, restart_delay: float = 1.0, max_restarts: int = -1, poll_interval: float = 1.0, exception_handler=None):
+        """
+        Run the feeds across multiple worker processes, each with its own event loop. The connections
+        created by each feed (including the per-connection subscription chunks of exchanges with
+        connection limits) are distributed across the workers. Callbacks and backends run inside the
+        workers. The calling process supervises the workers, and restarts those that exit abnormally.
+
+        workers: int
+            number of worker processes. Defaults to the number of CPUs. Fewer workers are started if
+            there are fewer connections than workers.
+        restart: bool, default True
+            restart workers that crash (exit with a non zero exit code)
+        restart_delay: float
+            time, in seconds, to wait before restarting a crashed worker
+        max_restarts: int
+            number of times a single worker will be restarted. Set to -1 for infinite
+        poll_interval: float
+            time, in seconds, between checks of the workers' health
+        exception_handler: asyncio exception handler function pointer
+            a custom exception handler for asyncio, installed in each worker
+        """
+        workers = workers if workers else os.cpu_count()
+        shards = self.shards(workers)
+        LOG.info('FH: running %d feed(s) across %d shard(s)', len(self.feeds), len(shards))
+
+        def handle_stop_signals(*args):
+            raise SystemExit
+
+        for sig in SIGNALS:
+            signal.signal(sig, handle_stop_signals)
+
+        restarts = [0] * len(shards)
+        procs = {shard_id: self._start_shard(shard_id, shard, exception_handler) for shard_id, shard in enumerate(shards)}
+        # restarted shards build their connections again, so per connection state (e.g. listen keys) is fresh
+        for feed in self.feeds:
+            feed._connections = None
+        try:
+            while procs:
+                time.sleep(poll_interval)
+                for shard_id, proc in list(procs.items()):
+                    if proc.is_alive():
+                        continue
+                    proc.join()
+                    if proc.exitcode == 0:
+                        LOG.info('FH: shard %d exited', shard_id)
+                        del procs[shard_id]
+                    elif restart and (max_restarts == -1 or restarts[shard_id] < max_restarts):
+                        restarts[shard_id] += 1
+                        LOG.error('FH: shard %d crashed with exit code %s - restarting (restart %d)', shard_id, proc.exitcode, restarts[shard_id])
+                        time.sleep(restart_delay)
+                        procs[shard_id] = self._start_shard(shard_id, shards[shard_id], exception_handler)
+                    else:
+                        LOG.error('FH: shard %d crashed with exit code %s', shard_id, proc.exitcode)
+                        del procs[shard_id]
+        except (SystemExit, KeyboardInterrupt):
+            LOG.info('FH: shutdown signal received - stopping shards')
+        finally:
+            for proc in procs.values():
+                if proc.is_alive():
+                    proc.terminate()
+            for proc in procs.values():
+                proc.join()
+
+        LOG.info('FH: leaving run_sharded()')
+
     def _stop(self, loop=None):
         self.running = False
         if not loop:
@@ -189,10 +310,12 @@ class FeedHandler:
     async def stop_async(self, loop=None):
         shutdown_tasks = self._stop(loop=loop)
         await asyncio.gather(*shutdown_tasks)
+        await http_pool.close()
 
     def stop(self, loop=None):
         shutdown_tasks = self._stop(loop=loop)
         loop.run_until_complete(asyncio.gather(*shutdown_tasks))
+        loop.run_until_complete(http_pool.close())
 
     def close(self, loop=None):
         """Stop the asynchronous generators and close the event loop."""
@@ -9,6 +9,10 @@ import atexit
 from collections import defaultdict
 import functools
 import ast
+import mmap
+import os
+import struct
+import time
 
 from yapic import json
 from aiofile import AIOFile
@@ -22,63 +26,56 @@ def bytes_string_to_bytes(string):
     return tree.body[0].value.s
 
 
-def playback(feed: str, filenames: list, callbacks: dict = None, config: str = 'config.yaml'):
-    return asyncio.run(_playback(feed, filenames, callbacks, config))
+def playback(feed: str, filenames: list, callbacks: dict = None, config: str = 'config.yaml', **kwargs):
+    return asyncio.run(_playback(feed, filenames, callbacks, config, **kwargs))
 
 
-async def _playback(feed: str, filenames: list, callbacks: dict, config: str):
-    callback_stats = defaultdict(int)
+def binary_playback(feed: str, filenames: list, callbacks: dict = None, config: str = 'config.yaml', **kwargs):
+    """
+    Playback captures written by BinaryFileCallback. Returns the same statistics as playback,
+    along with the time spent in the message handler loop and the resulting messages/sec.
+    """
+    return asyncio.run(_binary_playback(feed, filenames, callbacks, config, **kwargs))
 
-    class FakeWS:
-        def __init__(self, filenames):
-            self.conn_type = 'wss'
-            self.uuid = "1"
-            self.cache = defaultdict(list)
-
-            for filename in filenames:
-                if 'http' in filename:
-                    with open(filename, 'r', encoding='utf-8') as fp:
-                        for line in fp.readlines():
-                            if line.startswith('http'):
-                                file_url, data = line.split(' -> ')
-                                _, msg = data.split(": ", 1)
-                                self.cache[file_url].append(msg)
-
-        async def write(self, *args, **kwargs):
-            pass
-
-        async def read(self, url, **kwargs):
-            data = self.cache[url].pop(0)
-            if "header:" in data:
-                ret = data.split(" header: ")
-                header = ret[1].strip()
-                return ret[0], json.loads(header)
-            return data
-
-    ws = FakeWS(filenames)
-    symbol_data = []
-    sub = None
-    for f in filenames:
-        if 'ws' not in f and 'http' not in f:
-            exchange = f.rsplit("/", 1)[1]
-            exchange = exchange.split(".", 1)[0]
-            with open(f, 'r', encoding='utf-8') as fp:
-                for line in fp.readlines():
-                    if 'configuration' in line:
-                        sub = json.loads(line.split(": ", 1)[1])
-                        ws.subscription = sub
-                    if line == "\n":
-                        continue
-                    line = line.split(": ", 1)[1]
-                    symbol_data.append(json.loads(line.strip()))
+
+class _PlaybackConnection:
+    """
+    Stands in for both the websocket and the HTTP connections of a feed during playback.
+    Websocket writes are discarded and HTTP reads are served, in order, from the captured responses.
+    """
+    def __init__(self):
+        self.conn_type = 'wss'
+        self.uuid = "1"
+        self.cache = defaultdict(list)
+        self.subscription = None
+
+    async def write(self, *args, **kwargs):
+        pass
+
+    async def read(self, url, **kwargs):
+        data = self.cache[url].pop(0)
+        if "header:" in data:
+            ret = data.split(" header: ")
+            header = ret[1].strip()
+            return ret[0], json.loads(header)
+        return data
+
+
+async def _playback_start(feed: str, ws: _PlaybackConnection, symbol_data: list, callbacks: dict, config: str, **kwargs):
+    """
+    Patch the HTTP connections to read from the capture, then create and subscribe the feed.
+    Returns the feed, the (connection, handler) pairs, the callback statistics and the
+    original HTTP read methods (to be restored with _playback_stop)
+    """
+    callback_stats = defaultdict(int)
+    sub = ws.subscription
 
     def symbol_helper(*args, **kwargs):
         ret = symbol_data.pop(0)
         return ret
 
     from cryptofeed.connection import HTTPAsyncConn, HTTPSync
-    http_async_conn_read = HTTPAsyncConn.read
-    http_sync_read = HTTPSync.read
+    originals = (HTTPAsyncConn.read, HTTPSync.read)
     HTTPAsyncConn.read = ws.read
     HTTPSync.read = symbol_helper
 
@@ -90,7 +87,7 @@ async def _playback(feed: str, filenames: list, callbacks: dict, config: str):
     else:
         for ctype in callbacks.keys():
             callbacks[ctype] = [callbacks[ctype], functools.partial(internal_cb, cb_type=ctype)]
-    feed = EXCHANGE_MAP[feed](candle_closed_only=False, config=config, subscription=sub, callbacks=callbacks)
+    feed = EXCHANGE_MAP[feed](candle_closed_only=False, config=config, subscription=sub, callbacks=callbacks, **kwargs)
 
     exchange_sub = {}
     for chan in ws.subscription:
@@ -99,8 +96,46 @@ async def _playback(feed: str, filenames: list, callbacks: dict, config: str):
         exchange_sub[c] = s
     ws.subscription = exchange_sub
 
+    handlers = []
     for _, sub, handler, auth in feed.connect():
         await sub(ws)
+        handlers.append(handler)
+
+    return feed, handlers, callback_stats, originals
+
+
+async def _playback_stop(feed, originals):
+    from cryptofeed.connection import HTTPAsyncConn, HTTPSync
+    feed.stop()
+    await feed.shutdown()
+    HTTPAsyncConn.read, HTTPSync.read = originals
+
+
+async def _playback(feed: str, filenames: list, callbacks: dict, config: str, **kwargs):
+    ws = _PlaybackConnection()
+    for filename in filenames:
+        if 'http' in filename:
+            with open(filename, 'r', encoding='utf-8') as fp:
+                for line in fp.readlines():
+                    if line.startswith('http'):
+                        file_url, data = line.split(' -> ')
+                        _, msg = data.split(": ", 1)
+                        ws.cache[file_url].append(msg)
+
+    symbol_data = []
+    for f in filenames:
+        if 'ws' not in f and 'http' not in f:
+            with open(f, 'r', encoding='utf-8') as fp:
+                for line in fp.readlines():
+                    if 'configuration' in line:
+                        ws.subscription = json.loads(line.split(": ", 1)[1])
+                    if line == "\n":
+                        continue
+                    line = line.split(": ", 1)[1]
+                    symbol_data.append(json.loads(line.strip()))
+
+    feed, handlers, callback_stats, originals = await _playback_start(feed, ws, symbol_data, callbacks, config, **kwargs)
+    handler = handlers[-1]
 
     counter = 0
     filenames = [filename for filename in filenames if '.ws.' in filename]
@@ -130,16 +165,14 @@ async def _playback(feed: str, filenames: list, callbacks: dict, config: str):
                             message = message.strip()[2:-1]
 
                     await handler(message, ws, timestamp)
+                    if feed.snapshot_scheduler.snapshots:
+                        # snapshots are fetched in the background, apply them before the next message so playback is deterministic
+                        await feed.snapshot_scheduler.drain()
                 except Exception:
                     print("Playback failed on message:", message)
-                    feed.stop()
-                    await feed.shutdown()
+                    await _playback_stop(feed, originals)
                     raise
-    feed.stop()
-    await feed.shutdown()
-
-    HTTPAsyncConn.read = http_async_conn_read
-    HTTPSync.read = http_sync_read
+    await _playback_stop(feed, originals)
     return {'messages_processed': counter, 'callbacks': dict(callback_stats)}
 
 
@@ -214,3 +247,219 @@ class AsyncFileCallback:
         with open(f"{self.path}/{uuid}.{0}", 'a') as fp:
             fp.write(w + "\n")
             fp.flush()
+
+
+# Binary capture format
+#
+# A file starts with BINARY_MAGIC and is followed by a sequence of records. Each record is a
+# fixed width header (see RECORD_HEADER) followed by the connection id, the endpoint and the
+# raw payload, all stored without any escaping:
+#
+#   timestamp: float64 | kind: uint8 | uuid length: uint16 | endpoint length: uint16 | data length: uint32
+#
+# The low bits of kind give the direction of the record (one of the RECORD_* values), and
+# RECORD_BYTES is set when the payload was received as bytes rather than str.
+BINARY_MAGIC = b'CFRAWB01'
+RECORD_HEADER = struct.Struct('<dBHHI')
+
+RECORD_RECV = 0
+RECORD_SEND = 1
+RECORD_CONNECT = 2
+RECORD_HTTP = 3
+RECORD_CONFIG = 4
+RECORD_BYTES = 0x80
+
+
+def encode_record(kind: int, timestamp: float, uuid: str, endpoint: str = None, data=None) -> bytes:
+    uuid = uuid.encode()
+    endpoint = endpoint.encode() if endpoint else b''
+    if data is None:
+        data = b''
+    elif isinstance(data, str):
+        data = data.encode()
+    else:
+        kind |= RECORD_BYTES
+    return RECORD_HEADER.pack(timestamp, kind, len(uuid), len(endpoint), len(data)) + uuid + endpoint + data
+
+
+def read_binary_capture(filename: str):
+    """
+    Memory-map a binary capture and yield (kind, timestamp, uuid, endpoint, data) for each record.
+    data is returned as bytes if it was captured as bytes, otherwise as str.
+    """
+    with open(filename, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+                raise ValueError(f'{filename} is not a binary capture file')
+            size = len(mm)
+            offset = len(BINARY_MAGIC)
+            header_size = RECORD_HEADER.size
+            unpack = RECORD_HEADER.unpack_from
+
+            while offset < size:
+                timestamp, kind, uuid_len, endpoint_len, data_len = unpack(mm, offset)
+                offset += header_size
+                uuid = mm[offset:offset + uuid_len].decode()
+                offset += uuid_len
+                endpoint = mm[offset:offset + endpoint_len].decode() if endpoint_len else None
+                offset += endpoint_len
+                data = mm[offset:offset + data_len]
+                offset += data_len
+                if kind & RECORD_BYTES:
+                    kind &= ~RECORD_BYTES
+                else:
+                    data = data.decode()
+                yield kind, timestamp, uuid, endpoint, data
+
+
+async def _binary_playback(feed: str, filenames: list, callbacks: dict, config: str, **kwargs):
+    ws = _PlaybackConnection()
+    symbol_data = []
+    ws_files = []
+    for filename in filenames:
+        if '.ws.' in filename:
+            ws_files.append(filename)
+            continue
+        for kind, _, uuid, endpoint, data in read_binary_capture(filename):
+            if kind == RECORD_CONFIG:
+                ws.subscription = json.loads(data)
+            elif kind == RECORD_HTTP:
+                if '.http.' in uuid:
+                    ws.cache[endpoint].append(data)
+                else:
+                    symbol_data.append(json.loads(data))
+
+    feed, handlers, callback_stats, originals = await _playback_start(feed, ws, symbol_data, callbacks, config, **kwargs)
+    handler = handlers[-1]
+
+    counter = 0
+    start = time.perf_counter()
+    for filename in ws_files:
+        for kind, timestamp, _, _, message in read_binary_capture(filename):
+            if kind != RECORD_RECV:
+                continue
+            counter += 1
+            try:
+                await handler(message, ws, timestamp)
+                if feed.snapshot_scheduler.snapshots:
+                    await feed.snapshot_scheduler.drain()
+            except Exception:
+                print("Playback failed on message:", message)
+                await _playback_stop(feed, originals)
+                raise
+    elapsed = time.perf_counter() - start
+    await _playback_stop(feed, originals)
+    return {'messages_processed': counter, 'callbacks': dict(callback_stats), 'elapsed': elapsed, 'messages_per_second': counter / elapsed if elapsed else 0.0}
+
+
+class BinaryFileCallback(AsyncFileCallback):
+    """
+    Drop in replacement for AsyncFileCallback that writes the length prefixed binary
+    capture format instead of text lines. Use binary_playback to replay the captures.
+    """
+    def __init__(self, path, length=10000, rotate=1024 * 1024 * 100):
+        super().__init__(path, length=length, rotate=rotate)
+        self.data = defaultdict(bytearray)
+        self.records = defaultdict(int)
+
+    def _filename(self, uuid, count):
+        return f"{self.path}/{uuid}.{count}.bin"
+
+    @staticmethod
+    def _is_new(filename: str) -> bool:
+        return not os.path.exists(filename) or os.path.getsize(filename) == 0
+
+    def _append(self, filename: str, data: bytes):
+        new = self._is_new(filename)
+        with open(filename, 'ab') as fp:
+            if new:
+                fp.write(BINARY_MAGIC)
+            fp.write(data)
+            fp.flush()
+
+    def stop(self):
+        for uuid in list(self.data.keys()):
+            if self.data[uuid]:
+                self._append(self._filename(uuid, self.count[uuid]), self.data[uuid])
+            self.data[uuid] = bytearray()
+            self.records[uuid] = 0
+
+    def write_header(self, uuid, data):
+        self._append(self._filename(uuid, 0), encode_record(RECORD_CONFIG, time.time(), uuid, data=data))
+
+    async def write(self, uuid):
+        p = self._filename(uuid, self.count[uuid])
+        data = self.data[uuid]
+        self.data[uuid] = bytearray()
+        self.records[uuid] = 0
+        if self._is_new(p):
+            data = BINARY_MAGIC + data
+        async with AIOFile(p, mode='ab') as fp:
+            r = await fp.write(bytes(data), offset=self.pointer[uuid])
+            self.pointer[uuid] += r
+            await fp.fsync()
+
+        if self.pointer[uuid] >= self.rotate:
+            self.count[uuid] += 1
+            self.pointer[uuid] = 0
+
+    @staticmethod
+    def _encode(data, timestamp: float, uuid: str, endpoint: str = None, send: str = None, connect: str = None, header: str = None) -> bytes:
+        if endpoint:
+            if header:
+                data = f"{data} header: {json.dumps(header)}"
+            return encode_record(RECORD_HTTP, timestamp, uuid, endpoint=endpoint, data=data)
+        elif send:
+            return encode_record(RECORD_SEND, timestamp, uuid, endpoint=send, data=data)
+        elif connect:
+            return encode_record(RECORD_CONNECT, timestamp, uuid, endpoint=connect)
+        return encode_record(RECORD_RECV, timestamp, uuid, data=data)
+
+    async def __call__(self, data, timestamp: float, uuid: str, endpoint: str = None, send: str = None, connect: str = None, header: str = None):
+        self.data[uuid] += self._encode(data, timestamp, uuid, endpoint=endpoint, send=send, connect=connect, header=header)
+        self.records[uuid] += 1
+
+        if self.records[uuid] >= self.length:
+            await asyncio.create_task(self.write(uuid))
+
+    def sync_callback(self, data, timestamp: float, uuid: str, endpoint: str = None, send: str = None, connect: str = None, header: str = None):
+        self._append(self._filename(uuid, 0), self._encode(data, timestamp, uuid, endpoint=endpoint, send=send, connect=connect, header=header))
+
+
+def convert_capture(filenames: list, path: str):
+    """
+    Convert text captures written by AsyncFileCallback into the binary capture format. Files
+    are written to path with the same names and a .bin suffix.
+    """
+    for filename in filenames:
+        name = os.path.basename(filename)
+        uuid = name.rsplit('.', 1)[0]
+        out = bytearray(BINARY_MAGIC)
+        with open(filename, 'r', encoding='utf-8') as fp:
+            for line in fp:
+                if line == "\n":
+                    continue
+                line = line.rstrip("\n")
+                if line.startswith('configuration: '):
+                    out += encode_record(RECORD_CONFIG, 0.0, uuid, data=line.split(": ", 1)[1])
+                elif ' <-> ' in line and line.startswith('wss'):
+                    endpoint, timestamp = line.rsplit(' <-> ', 1)
+                    out += encode_record(RECORD_CONNECT, float(timestamp), uuid, endpoint=endpoint)
+                elif line.startswith('htt'):
+                    endpoint, data = line.split(' -> ', 1)
+                    timestamp, data = data.split(": ", 1)
+                    out += encode_record(RECORD_HTTP, float(timestamp), uuid, endpoint=endpoint, data=data)
+                elif line.startswith('wss'):
+                    endpoint, data = line.split(' <- ', 1)
+                    timestamp, data = data.split(": ", 1)
+                    out += encode_record(RECORD_SEND, float(timestamp), uuid, endpoint=endpoint, data=data)
+                else:
+                    timestamp, message = line.split(": ", 1)
+                    if message.startswith('b\'') or message.startswith('b"'):
+                        message = bytes_string_to_bytes(message)
+                    out += encode_record(RECORD_RECV, float(timestamp), uuid, data=message)
+
+        with open(os.path.join(path, name + '.bin'), 'wb') as fp:
+            fp.write(out)
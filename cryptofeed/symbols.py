@@ -4,12 +4,29 @@ Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as dt, timezone
-from typing import Dict, Tuple, Union
+import logging
+import os
+import pickle
+import time
+from typing import Dict, Iterable, List, Tuple, Union
 
 from cryptofeed.defines import FUTURES, FX, OPTION, PERPETUAL, SPOT, CALL, PUT, CURRENCY
 
 
+LOG = logging.getLogger('feedhandler')
+
+
+def _version() -> str:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+        return version('cryptofeed')
+    except (ImportError, PackageNotFoundError):
+        return 'unknown'
+
+
 class Symbol:
     symbol_sep = '-'
 
@@ -89,23 +106,142 @@ class Symbol:
         raise ValueError(f"Unsupported symbol type: {self.type}")
 
 
+class SymbolCache:
+    """
+    On disk cache of the symbol mappings, one file per exchange. Entries are only read back by the same
+    cryptofeed version (and cache format) that wrote them.
+    """
+    format_version = 2
+
+    def __init__(self, path: str, ttl: float = 86400):
+        """
+        path: str
+            directory the mappings are stored in
+        ttl: float
+            seconds after which a mapping is stale. Stale mappings are still used by feeds, which refresh
+            them in the background once started, but not by REST only usage
+        """
+        self.path = path
+        self.ttl = ttl
+        self.version = (self.format_version, _version())
+
+    def _file(self, exchange: str) -> str:
+        return os.path.join(self.path, f'{exchange}.symbols')
+
+    def load(self, exchange: str):
+        """
+        (normalized, info, time written), or None if there is no usable entry
+        """
+        try:
+            with open(self._file(exchange), 'rb') as fp:
+                entry = pickle.load(fp)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            LOG.warning('%s: ignoring unreadable symbol cache %s: %s', exchange, self._file(exchange), e)
+            return None
+        if entry.get('version') != self.version:
+            return None
+        return entry['normalized'], entry['info'], entry['time']
+
+    def store(self, exchange: str, normalized: dict, info: dict):
+        entry = {'version': self.version, 'time': time.time(), 'normalized': normalized, 'info': info}
+        tmp = f'{self._file(exchange)}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp, 'wb') as fp:
+                pickle.dump(entry, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._file(exchange))
+        except Exception as e:
+            LOG.warning('%s: unable to write symbol cache %s: %s', exchange, self._file(exchange), e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
 class _Symbols:
     def __init__(self):
         self.data = {}
+        self.cache = None
 
     def clear(self):
         self.data = {}
 
-    def load_all(self):
-        from cryptofeed.exchanges import EXCHANGE_MAP
+    def configure_cache(self, path: str = None, ttl: float = 86400, **kwargs):
+        """
+        Enable (or with no path, disable) the on disk symbol cache, see SymbolCache
+        """
+        if not path:
+            self.cache = None
+        elif self.cache is None or self.cache.path != path or self.cache.ttl != ttl:
+            self.cache = SymbolCache(path, ttl=ttl)
+
+    def load_all(self, exchanges: Iterable = None, refresh=True, timeout: float = 60, max_workers=16) -> List[str]:
+        """
+        Load the symbols of the exchanges (exchange classes, default all) concurrently, see bootstrap
+        """
+        return asyncio.run(self.bootstrap(exchanges, refresh=refresh, timeout=timeout, max_workers=max_workers))
+
+    async def bootstrap(self, exchanges: Iterable = None, refresh=False, timeout: float = 60, max_workers=16) -> List[str]:
+        """
+        Load the symbols of the exchanges (exchange classes, default all) concurrently, so feeds
+        constructed afterwards do not wait for each exchange's REST API in turn. Exchanges that are
+        already loaded, or have a usable cache entry, are skipped unless refresh is set.
+
+        Failed exchanges, and exchanges that did not respond within timeout seconds, are logged and
+        their ids returned. Constructing a feed for one of them will try again.
+        """
+        if exchanges is None:
+            from cryptofeed.exchanges import EXCHANGE_MAP
+            exchanges = EXCHANGE_MAP.values()
 
-        for _, exchange in EXCHANGE_MAP.items():
-            exchange.symbols(refresh=True)
+        loop = asyncio.get_running_loop()
+        # the requests are blocking (see HTTPSync), and made from a thread per exchange
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='symbols')
+
+        async def load(exchange):
+            try:
+                await asyncio.wait_for(loop.run_in_executor(executor, exchange.symbol_mapping, refresh), timeout)
+            except asyncio.TimeoutError:
+                LOG.error('%s: timed out loading symbols', exchange.id)
+                return exchange.id
+            except Exception:
+                # logged by symbol_mapping
+                return exchange.id
+
+        try:
+            failed = await asyncio.gather(*(load(exchange) for exchange in exchanges))
+        finally:
+            executor.shutdown(wait=False)
+        return [exchange for exchange in failed if exchange is not None]
 
     def set(self, exchange: str, normalized: dict, exchange_info: dict):
         self.data[exchange] = {}
         self.data[exchange]['normalized'] = normalized
         self.data[exchange]['info'] = exchange_info
+        self.data[exchange]['time'] = time.time()
+        if self.cache is not None:
+            self.cache.store(exchange, normalized, exchange_info)
+
+    def load_cached(self, exchange: str, stale=False) -> bool:
+        """
+        Load the exchange's mapping from the cache, if enabled. Stale entries are only loaded with stale set
+        """
+        if self.cache is None:
+            return False
+        entry = self.cache.load(exchange)
+        if entry is None:
+            return False
+        normalized, info, written = entry
+        if not stale and time.time() - written > self.cache.ttl:
+            return False
+        self.data[exchange] = {'normalized': normalized, 'info': info, 'time': written}
+        return True
+
+    def stale(self, exchange: str) -> bool:
+        """
+        True if the exchange's mapping was loaded from the cache and is older than its ttl
+        """
+        return self.cache is not None and exchange in self.data and time.time() - self.data[exchange]['time'] > self.cache.ttl
 
     def get(self, exchange: str) -> Tuple[Dict, Dict]:
         return self.data[exchange]['normalized'], self.data[exchange]['info']
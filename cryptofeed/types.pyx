@@ -5,7 +5,10 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
 cimport cython
+from libc.stdlib cimport free, malloc, realloc
+from libc.string cimport memcpy, memmove, strchr, strlen
 from decimal import Decimal
+import sys
 
 from cryptofeed.defines import BID, ASK
 from order_book import OrderBook as _OrderBook
@@ -22,6 +25,9 @@ cdef extern from *:
     cdef bint _COMPILED_WITH_ASSERTIONS
 COMPILED_WITH_ASSERTIONS = _COMPILED_WITH_ASSERTIONS
 
+# Decimal by default, float or int (prices in ticks) when a feed runs with a non-decimal numeric_mode
+NUMERIC_TYPES = (Decimal, float, int)
+
 
 cdef dict convert_none_values(d: dict, s: str):
     for key, value in d.items():
@@ -30,6 +36,372 @@ cdef dict convert_none_values(d: dict, s: str):
     return d
 
 
+cdef extern from "Python.h":
+    const char *PyUnicode_AsUTF8AndSize(object unicode, Py_ssize_t *size) except NULL
+    char *PyOS_double_to_string(double val, char format_code, int precision, int flags, int *ptype) except NULL
+    void PyMem_Free(void *p)
+    int Py_DTSF_ADD_DOT_0
+
+
+@cython.final
+cdef class _Encoder:
+    """
+    Growable buffer the to_json_bytes and to_line_protocol encoders write to, with the numeric
+    formatting options of the encode in progress. A single encoder is reused by every encode
+    (see _acquire).
+
+    numeric_type: callable
+        conversion applied to prices and sizes, as in to_dict. str values are written as strings,
+        floats in their shortest repr and anything else (Decimal, int) as str(value), unquoted
+    numeric_format: str
+        format spec (e.g. '.8f') prices and sizes are formatted with instead, written unquoted
+        unless numeric_type is str
+    """
+    cdef char *data
+    cdef Py_ssize_t size
+    cdef Py_ssize_t capacity
+    cdef bint busy
+    cdef bint first
+    cdef object numeric_type
+    cdef object numeric_format
+    cdef object none_to
+
+    def __cinit__(self):
+        self.capacity = 1024
+        self.data = <char *> malloc(self.capacity)
+        if self.data == NULL:
+            raise MemoryError()
+
+    def __dealloc__(self):
+        free(self.data)
+
+    cdef int reserve(self, Py_ssize_t n) except -1:
+        cdef char *data
+        if self.size + n > self.capacity:
+            while self.size + n > self.capacity:
+                self.capacity *= 2
+            data = <char *> realloc(self.data, self.capacity)
+            if data == NULL:
+                raise MemoryError()
+            self.data = data
+        return 0
+
+    cdef int write(self, const char *s, Py_ssize_t n) except -1:
+        self.reserve(n)
+        memcpy(self.data + self.size, s, n)
+        self.size += n
+        return 0
+
+    cdef inline int text(self, str s) except -1:
+        cdef Py_ssize_t n
+        cdef const char *p = PyUnicode_AsUTF8AndSize(s, &n)
+        return self.write(p, n)
+
+    cdef int escaped(self, str s, const char *special) except -1:
+        """
+        s, with a backslash before any of the special characters
+        """
+        cdef Py_ssize_t n, i, start = 0
+        cdef const char *p = PyUnicode_AsUTF8AndSize(s, &n)
+        for i in range(n):
+            if p[i] != 0 and strchr(special, p[i]) != NULL:
+                self.write(p + start, i - start)
+                self.write(b'\\', 1)
+                start = i
+        return self.write(p + start, n - start)
+
+    cdef int double(self, double value) except -1:
+        cdef char *s = PyOS_double_to_string(value, b'r', 0, Py_DTSF_ADD_DOT_0, NULL)
+        try:
+            self.write(s, strlen(s))
+        finally:
+            PyMem_Free(s)
+        return 0
+
+    cdef bytes finish(self):
+        return self.data[:self.size]
+
+    # JSON
+
+    cdef int begin(self) except -1:
+        self.first = True
+        return self.write(b'{', 1)
+
+    cdef int key(self, str name) except -1:
+        if self.first:
+            self.first = False
+            self.write(b'"', 1)
+        else:
+            self.write(b',"', 2)
+        self.text(name)
+        return self.write(b'":', 2)
+
+    cdef int string(self, str value) except -1:
+        cdef Py_ssize_t n, i, start = 0
+        cdef const char *p
+        cdef unsigned char c
+        if value is None:
+            return self.none()
+        p = PyUnicode_AsUTF8AndSize(value, &n)
+        self.write(b'"', 1)
+        for i in range(n):
+            c = p[i]
+            if c == 34 or c == 92 or c < 32:
+                self.write(p + start, i - start)
+                if c == 34 or c == 92:
+                    self.write(b'\\', 1)
+                    self.write(p + i, 1)
+                else:
+                    self.text(f'\\u{c:04x}')
+                start = i + 1
+        self.write(p + start, n - start)
+        return self.write(b'"', 1)
+
+    cdef int none(self) except -1:
+        if self.none_to:
+            return self.value(self.none_to)
+        return self.write(b'null', 4)
+
+    cdef int number(self, object value) except -1:
+        if value is None:
+            return self.none()
+        if self.numeric_format is not None:
+            if self.numeric_type is str:
+                return self.string(format(value, self.numeric_format))
+            return self.text(format(value, self.numeric_format))
+        if self.numeric_type is not None:
+            value = self.numeric_type(value)
+        if type(value) is float:
+            return self.double(value)
+        if type(value) is str:
+            return self.string(value)
+        return self.text(str(value))
+
+    cdef int value(self, object value) except -1:
+        if value is None:
+            return self.none()
+        if type(value) is str:
+            return self.string(value)
+        if type(value) is bool:
+            return self.write(b'true', 4) if value else self.write(b'false', 5)
+        if type(value) is float:
+            return self.double(value)
+        return self.text(str(value))
+
+    cdef inline int json_string(self, str name, str value) except -1:
+        self.key(name)
+        return self.string(value)
+
+    cdef inline int json_number(self, str name, object value) except -1:
+        self.key(name)
+        return self.number(value)
+
+    cdef inline int json_value(self, str name, object value) except -1:
+        self.key(name)
+        return self.value(value)
+
+    cdef int end(self, object timestamp, object receipt_timestamp) except -1:
+        """
+        timestamp and receipt_timestamp keys, as added by the backends: timestamp is receipt_timestamp
+        if it is not set, receipt_timestamp is only written if given
+        """
+        if receipt_timestamp is not None and not timestamp:
+            timestamp = receipt_timestamp
+        self.key('timestamp')
+        self.value(timestamp)
+        if receipt_timestamp is not None:
+            self.key('receipt_timestamp')
+            self.value(receipt_timestamp)
+        return self.write(b'}', 1)
+
+    cdef str numeric_text(self, object value):
+        if self.numeric_format is not None:
+            return format(value, self.numeric_format)
+        if self.numeric_type is not None:
+            value = self.numeric_type(value)
+        return str(value)
+
+    cdef int book_levels(self, list levels) except -1:
+        """
+        book levels, (price, size) pairs, as {"price": size}. Size is a dict of order id: size in L3 books
+        """
+        cdef bint first = True
+        cdef bint first_order
+        cdef object price, size, order
+        self.write(b'{', 1)
+        for price, size in levels:
+            if not first:
+                self.write(b',', 1)
+            first = False
+            self.string(self.numeric_text(price))
+            self.write(b':', 1)
+            if isinstance(size, dict):
+                first_order = True
+                self.write(b'{', 1)
+                for order, size in (<dict> size).items():
+                    if not first_order:
+                        self.write(b',', 1)
+                    first_order = False
+                    self.string(str(order))
+                    self.write(b':', 1)
+                    self.number(size)
+                self.write(b'}', 1)
+            else:
+                self.number(size)
+        return self.write(b'}', 1)
+
+    cdef int delta_levels(self, list levels) except -1:
+        """
+        delta levels, tuples of (price, size[, order id]), as [[price, size], ...]
+        """
+        cdef bint first = True
+        cdef bint first_value
+        cdef object level, v
+        self.write(b'[', 1)
+        for level in levels:
+            if not first:
+                self.write(b',', 1)
+            first = False
+            first_value = True
+            self.write(b'[', 1)
+            for v in level:
+                if not first_value:
+                    self.write(b',', 1)
+                first_value = False
+                if isinstance(v, NUMERIC_TYPES):
+                    self.number(v)
+                else:
+                    self.value(v)
+            self.write(b']', 1)
+        return self.write(b']', 1)
+
+    cdef int escape_from(self, Py_ssize_t start) except -1:
+        """
+        backslash escape the quotes and backslashes written since start, in place
+        """
+        cdef Py_ssize_t i, j, extra = 0
+        cdef char c
+        for i in range(start, self.size):
+            if self.data[i] == 34 or self.data[i] == 92:
+                extra += 1
+        if not extra:
+            return 0
+        self.reserve(extra)
+        j = self.size + extra - 1
+        i = self.size - 1
+        while i >= start:
+            c = self.data[i]
+            self.data[j] = c
+            j -= 1
+            if c == 34 or c == 92:
+                self.data[j] = 92
+                j -= 1
+            i -= 1
+        self.size += extra
+        return 0
+
+    # InfluxDB line protocol
+
+    cdef int measurement(self, str measurement, str symbol) except -1:
+        self.escaped(measurement, b', ')
+        if symbol is not None:
+            self.tag('symbol', symbol)
+        return 0
+
+    cdef int tag(self, str name, str value) except -1:
+        self.write(b',', 1)
+        self.text(name)
+        self.write(b'=', 1)
+        return self.escaped(value if value is not None else 'None', b', =')
+
+    cdef int field(self, str name) except -1:
+        if self.first:
+            self.first = False
+            self.write(b' ', 1)
+        else:
+            self.write(b',', 1)
+        self.text(name)
+        return self.write(b'=', 1)
+
+    cdef int field_string(self, str value) except -1:
+        self.write(b'"', 1)
+        self.escaped(value if value is not None else 'None', b'"\\')
+        return self.write(b'"', 1)
+
+    cdef int field_number(self, object value) except -1:
+        if value is None:
+            return self.write(b'"None"', 6)
+        if self.numeric_format is not None:
+            if self.numeric_type is str:
+                return self.field_string(format(value, self.numeric_format))
+            return self.text(format(value, self.numeric_format))
+        if self.numeric_type is not None:
+            value = self.numeric_type(value)
+        if type(value) is float:
+            return self.double(value)
+        if type(value) is str:
+            return self.field_string(value)
+        return self.text(str(value))
+
+    cdef int field_value(self, object value) except -1:
+        if value is None or type(value) is str:
+            return self.field_string(value)
+        if type(value) is float:
+            return self.double(value)
+        return self.text(str(value))
+
+    cdef inline int line_string(self, str name, str value) except -1:
+        self.field(name)
+        return self.field_string(value)
+
+    cdef inline int line_number(self, str name, object value) except -1:
+        self.field(name)
+        return self.field_number(value)
+
+    cdef inline int line_value(self, str name, object value) except -1:
+        self.field(name)
+        return self.field_value(value)
+
+    cdef int end_line(self, object timestamp, object receipt_timestamp) except -1:
+        """
+        timestamp and receipt_timestamp fields, and receipt_timestamp (in microseconds) as the point's time
+        """
+        if receipt_timestamp is not None and not timestamp:
+            timestamp = receipt_timestamp
+        if timestamp is not None:
+            self.field('timestamp')
+            self.field_value(timestamp)
+        if receipt_timestamp is not None:
+            self.field('receipt_timestamp')
+            self.field_value(receipt_timestamp)
+            self.write(b' ', 1)
+            self.text(str(int(receipt_timestamp * 1000000)))
+        return 0
+
+
+cdef _Encoder _encoder = _Encoder()
+
+
+cdef _Encoder _acquire(object numeric_type, object numeric_format, object none_to):
+    cdef _Encoder encoder = _encoder
+    if encoder.busy:
+        # an encode is already in progress (the GIL can be released while numeric_type runs)
+        encoder = _Encoder()
+    encoder.busy = True
+    encoder.size = 0
+    encoder.first = True
+    encoder.numeric_type = numeric_type
+    encoder.numeric_format = numeric_format
+    encoder.none_to = none_to
+    return encoder
+
+
+cdef inline void _release(_Encoder encoder):
+    encoder.busy = False
+    encoder.numeric_type = None
+    encoder.none_to = None
+
+
 @cython.freelist(128)
 cdef class Trade:
     cdef readonly str exchange
@@ -43,8 +415,8 @@ cdef class Trade:
     cdef readonly object raw  # can be dict or list
 
     def __init__(self, exchange, symbol, side, amount, price, timestamp, id=None, type=None, raw=None):
-        assert isinstance(price, Decimal)
-        assert isinstance(amount, Decimal)
+        assert isinstance(price, NUMERIC_TYPES)
+        assert isinstance(amount, NUMERIC_TYPES)
 
         self.exchange = exchange
         self.symbol = symbol
@@ -76,6 +448,36 @@ cdef class Trade:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'side': self.side, 'amount': numeric_type(self.amount), 'price': numeric_type(self.price), 'id': self.id, 'type': self.type, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_string('side', self.side)
+            encoder.json_number('amount', self.amount)
+            encoder.json_number('price', self.price)
+            encoder.json_string('id', self.id)
+            encoder.json_string('type', self.type)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_string('side', self.side)
+            encoder.line_number('price', self.price)
+            encoder.line_number('amount', self.amount)
+            encoder.line_string('id', self.id)
+            encoder.line_string('type', self.type)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} side: {self.side} amount: {self.amount} price: {self.price} id: {self.id} type: {self.type} timestamp: {self.timestamp}"
 
@@ -95,8 +497,8 @@ cdef class Ticker:
     cdef readonly object raw
 
     def __init__(self, exchange, symbol, bid, ask, timestamp, raw=None):
-        assert isinstance(bid, Decimal)
-        assert isinstance(ask, Decimal)
+        assert isinstance(bid, NUMERIC_TYPES)
+        assert isinstance(ask, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -123,6 +525,30 @@ cdef class Ticker:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'bid': numeric_type(self.bid), 'ask': numeric_type(self.ask), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_number('bid', self.bid)
+            encoder.json_number('ask', self.ask)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_number('bid', self.bid)
+            encoder.line_number('ask', self.ask)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} bid: {self.bid} ask: {self.ask} timestamp: {self.timestamp}"
 
@@ -145,8 +571,8 @@ cdef class Liquidation:
     cdef readonly dict raw
 
     def __init__(self, exchange, symbol, side, quantity, price, id, status, timestamp, raw=None):
-        assert isinstance(quantity, Decimal)
-        assert isinstance(price, Decimal)
+        assert isinstance(quantity, NUMERIC_TYPES)
+        assert isinstance(price, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -179,6 +605,36 @@ cdef class Liquidation:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'side': self.side, 'quantity': numeric_type(self.quantity), 'price': numeric_type(self.price), 'id': self.id, 'status': self.status, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_string('side', self.side)
+            encoder.json_number('quantity', self.quantity)
+            encoder.json_number('price', self.price)
+            encoder.json_string('id', self.id)
+            encoder.json_string('status', self.status)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_string('side', self.side)
+            encoder.line_number('quantity', self.quantity)
+            encoder.line_number('price', self.price)
+            encoder.line_string('id', self.id)
+            encoder.line_string('status', self.status)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} side: {self.side} quantity: {self.quantity} price: {self.price} id: {self.id} status: {self.status} timestamp: {self.timestamp}"
 
@@ -200,10 +656,10 @@ cdef class Funding:
     cdef readonly object raw
 
     def __init__(self, exchange, symbol, mark_price, rate, next_funding_time, timestamp, predicted_rate=None, raw=None):
-        assert mark_price is None or isinstance(mark_price, Decimal)
-        assert rate is None or isinstance(rate, Decimal)
+        assert mark_price is None or isinstance(mark_price, NUMERIC_TYPES)
+        assert rate is None or isinstance(rate, NUMERIC_TYPES)
         assert next_funding_time is None or isinstance(next_funding_time, float)
-        assert predicted_rate is None or isinstance(predicted_rate, Decimal)
+        assert predicted_rate is None or isinstance(predicted_rate, NUMERIC_TYPES)
 
         self.exchange = exchange
         self.symbol = symbol
@@ -233,6 +689,34 @@ cdef class Funding:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'mark_price': numeric_type(self.mark_price) if self.mark_price else None, 'rate': numeric_type(self.rate), 'next_funding_time': self.next_funding_time, 'predicted_rate': numeric_type(self.predicted_rate) if self.predicted_rate is not None else None, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_number('mark_price', self.mark_price if self.mark_price or numeric_type is None else None)
+            encoder.json_number('rate', self.rate)
+            encoder.json_value('next_funding_time', self.next_funding_time)
+            encoder.json_number('predicted_rate', self.predicted_rate)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_number('mark_price', self.mark_price if self.mark_price else None)
+            encoder.line_number('rate', self.rate)
+            encoder.line_value('next_funding_time', self.next_funding_time)
+            encoder.line_number('predicted_rate', self.predicted_rate)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} mark_price: {self.mark_price} rate: {self.rate} next_funding_time: {self.next_funding_time} predicted_rate: {self.predicted_rate} timestamp: {self.timestamp}"
 
@@ -261,11 +745,11 @@ cdef class Candle:
 
     def __init__(self, exchange, symbol, start, stop, interval, trades, open, close, high, low, volume, closed, timestamp, raw=None):
         assert trades is None or isinstance(trades, int)
-        assert isinstance(open, Decimal)
-        assert isinstance(close, Decimal)
-        assert isinstance(high, Decimal)
-        assert isinstance(low, Decimal)
-        assert isinstance(volume, Decimal)
+        assert isinstance(open, NUMERIC_TYPES)
+        assert isinstance(close, NUMERIC_TYPES)
+        assert isinstance(high, NUMERIC_TYPES)
+        assert isinstance(low, NUMERIC_TYPES)
+        assert isinstance(volume, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -308,6 +792,46 @@ cdef class Candle:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'start': self.start, 'stop': self.stop, 'interval': self.interval, 'trades': self.trades, 'open': numeric_type(self.open), 'close': numeric_type(self.close), 'high': numeric_type(self.high), 'low': numeric_type(self.low), 'volume': numeric_type(self.volume), 'closed': self.closed, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_value('start', self.start)
+            encoder.json_value('stop', self.stop)
+            encoder.json_string('interval', self.interval)
+            encoder.json_value('trades', self.trades)
+            encoder.json_number('open', self.open)
+            encoder.json_number('close', self.close)
+            encoder.json_number('high', self.high)
+            encoder.json_number('low', self.low)
+            encoder.json_number('volume', self.volume)
+            encoder.json_value('closed', self.closed)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.tag('interval', self.interval)
+            encoder.line_value('start', self.start)
+            encoder.line_value('stop', self.stop)
+            if self.trades:
+                encoder.line_value('trades', self.trades)
+            encoder.line_number('open', self.open)
+            encoder.line_number('close', self.close)
+            encoder.line_number('high', self.high)
+            encoder.line_number('low', self.low)
+            encoder.line_number('volume', self.volume)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} start: {self.start} stop: {self.stop} interval: {self.interval} trades: {self.trades} open: {self.open} close: {self.close} high: {self.high} low: {self.low} volume: {self.volume} closed: {self.closed} timestamp: {self.timestamp}"
 
@@ -326,7 +850,7 @@ cdef class Index:
     cdef readonly dict raw
 
     def __init__(self, exchange, symbol, price, timestamp, raw=None):
-        assert isinstance(price, Decimal)
+        assert isinstance(price, NUMERIC_TYPES)
 
         self.exchange = exchange
         self.symbol = symbol
@@ -341,6 +865,28 @@ cdef class Index:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'price': numeric_type(self.price), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_number('price', self.price)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_number('price', self.price)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} price: {self.price} timestamp: {self.timestamp}"
 
@@ -359,7 +905,7 @@ cdef class OpenInterest:
     cdef readonly dict raw
 
     def __init__(self, exchange, symbol, open_interest, timestamp, raw=None):
-        assert isinstance(open_interest, Decimal)
+        assert isinstance(open_interest, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -375,6 +921,28 @@ cdef class OpenInterest:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'open_interest': numeric_type(self.open_interest), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_number('open_interest', self.open_interest)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_number('open_interest', self.open_interest)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} open_interest: {self.open_interest} timestamp: {self.timestamp}"
 
@@ -385,20 +953,649 @@ cdef class OpenInterest:
         return hash(self.__repr__())
 
 
+@cython.final
+cdef class ArrayBookSide:
+    """
+    One side of an ArrayBook. The levels' prices (integers, e.g. a number of ticks) and sizes are held in
+    two contiguous arrays ordered worst to best, so the best level is the last element. Finding a level is a
+    binary search, inserting or removing one moves only the levels between it and the top of the book, which
+    for the near touch updates that make up most of a feed is a handful of elements.
+
+    Implements the parts of the order_book.SortedDict interface used by the exchanges and data types:
+    side[price], side[price] = size, del side[price], in, len, iteration (best first), keys, index,
+    to_list, to_dict and truncate. Sizes are stored as floats.
+    """
+    cdef long long *prices  # price * direction, so both sides are ascending
+    cdef double *sizes
+    cdef Py_ssize_t length
+    cdef Py_ssize_t capacity
+    cdef long long direction  # 1 for bids, -1 for asks
+    cdef readonly Py_ssize_t max_depth
+    cdef readonly bint strict
+
+    def __cinit__(self, bint bids=True, Py_ssize_t max_depth=0, bint strict=False, Py_ssize_t capacity=64):
+        self.direction = 1 if bids else -1
+        self.max_depth = max_depth
+        self.strict = strict and max_depth > 0
+        self.capacity = capacity if capacity > 0 else 64
+        self.length = 0
+        self.prices = <long long *>malloc(self.capacity * sizeof(long long))
+        self.sizes = <double *>malloc(self.capacity * sizeof(double))
+        if self.prices == NULL or self.sizes == NULL:
+            raise MemoryError()
+
+    def __dealloc__(self):
+        free(self.prices)
+        free(self.sizes)
+
+    cdef inline Py_ssize_t _find(self, long long key):
+        # position of the first level >= key
+        cdef Py_ssize_t lo = 0
+        cdef Py_ssize_t hi = self.length
+        cdef Py_ssize_t mid
+        if hi and key > self.prices[hi - 1]:
+            return hi
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if self.prices[mid] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    cdef int _grow(self) except -1:
+        cdef Py_ssize_t capacity = self.capacity * 2
+        cdef long long *prices = <long long *>realloc(self.prices, capacity * sizeof(long long))
+        if prices == NULL:
+            raise MemoryError()
+        self.prices = prices
+        cdef double *sizes = <double *>realloc(self.sizes, capacity * sizeof(double))
+        if sizes == NULL:
+            raise MemoryError()
+        self.sizes = sizes
+        self.capacity = capacity
+        return 0
+
+    cdef inline void _remove(self, Py_ssize_t i):
+        memmove(&self.prices[i], &self.prices[i + 1], (self.length - i - 1) * sizeof(long long))
+        memmove(&self.sizes[i], &self.sizes[i + 1], (self.length - i - 1) * sizeof(double))
+        self.length -= 1
+
+    cpdef set(self, long long price, double size):
+        """
+        add or update the level at price
+        """
+        cdef long long key = price * self.direction
+        cdef Py_ssize_t i = self._find(key)
+        if i < self.length and self.prices[i] == key:
+            self.sizes[i] = size
+            return
+        if self.strict and self.length >= self.max_depth:
+            if i == 0:
+                # worse than every level kept
+                return
+            self._remove(0)
+            i -= 1
+        if self.length == self.capacity:
+            self._grow()
+        if i < self.length:
+            memmove(&self.prices[i + 1], &self.prices[i], (self.length - i) * sizeof(long long))
+            memmove(&self.sizes[i + 1], &self.sizes[i], (self.length - i) * sizeof(double))
+        self.prices[i] = key
+        self.sizes[i] = size
+        self.length += 1
+
+    cpdef bint remove(self, long long price):
+        """
+        remove the level at price, returns False if there is no such level
+        """
+        cdef long long key = price * self.direction
+        cdef Py_ssize_t i = self._find(key)
+        if i == self.length or self.prices[i] != key:
+            return False
+        self._remove(i)
+        return True
+
+    def __setitem__(self, long long price, double size):
+        self.set(price, size)
+
+    def __getitem__(self, long long price):
+        cdef long long key = price * self.direction
+        cdef Py_ssize_t i = self._find(key)
+        if i == self.length or self.prices[i] != key:
+            raise KeyError(price)
+        return self.sizes[i]
+
+    def __delitem__(self, long long price):
+        if not self.remove(price):
+            raise KeyError(price)
+
+    def __contains__(self, long long price):
+        cdef long long key = price * self.direction
+        cdef Py_ssize_t i = self._find(key)
+        return i < self.length and self.prices[i] == key
+
+    def __len__(self):
+        # as with order_book, a (non strict) max_depth limits the reported length
+        if self.max_depth and self.length > self.max_depth:
+            return self.max_depth
+        return self.length
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self) -> tuple:
+        cdef Py_ssize_t i
+        return tuple([self.prices[i] * self.direction for i in range(self.length - 1, -1, -1)])
+
+    def index(self, Py_ssize_t i) -> tuple:
+        """
+        (price, size) of the i-th best level
+        """
+        if i < 0 or i >= self.length:
+            raise IndexError('index out of range')
+        i = self.length - 1 - i
+        return self.prices[i] * self.direction, self.sizes[i]
+
+    def to_list(self, n=None) -> list:
+        """
+        (price, size) of up to n levels (default all), best first
+        """
+        cdef Py_ssize_t count = self.length if n is None else min(<Py_ssize_t>n, self.length)
+        cdef Py_ssize_t i
+        return [(self.prices[i] * self.direction, self.sizes[i]) for i in range(self.length - 1, self.length - 1 - count, -1)]
+
+    def to_dict(self, to_type=None) -> dict:
+        cdef Py_ssize_t count = len(self)
+        cdef Py_ssize_t i
+        if to_type is None:
+            return {self.prices[i] * self.direction: self.sizes[i] for i in range(self.length - 1, self.length - 1 - count, -1)}
+        return {to_type(self.prices[i] * self.direction): to_type(self.sizes[i]) for i in range(self.length - 1, self.length - 1 - count, -1)}
+
+    def truncate(self):
+        """
+        remove the levels beyond max_depth
+        """
+        cdef Py_ssize_t drop
+        if self.max_depth and self.length > self.max_depth:
+            drop = self.length - self.max_depth
+            memmove(self.prices, &self.prices[drop], self.max_depth * sizeof(long long))
+            memmove(self.sizes, &self.sizes[drop], self.max_depth * sizeof(double))
+            self.length = self.max_depth
+
+    def clear(self):
+        self.length = 0
+
+    def update(self, levels: dict):
+        """
+        add or update the levels in a dict of price: size
+        """
+        # adding the levels worst to best appends each one
+        for price in sorted(levels, reverse=self.direction < 0):
+            self.set(price, levels[price])
+
+
+@cython.final
+cdef class ArrayBook:
+    """
+    Order book with integer prices (e.g. prices in ticks, see the SCALED_INT numeric mode), a drop in
+    replacement for order_book.OrderBook: the sides are available as bids/asks, bid/ask or book[side] and
+    the book as a dict with to_dict. See ArrayBookSide. Checksums are not supported.
+    """
+    cdef ArrayBookSide _bids
+    cdef ArrayBookSide _asks
+    cdef readonly Py_ssize_t max_depth
+
+    def __init__(self, max_depth=0, max_depth_strict=False):
+        self.max_depth = max_depth
+        self._bids = ArrayBookSide(True, max_depth, max_depth_strict)
+        self._asks = ArrayBookSide(False, max_depth, max_depth_strict)
+
+    @property
+    def bids(self):
+        return self._bids
+
+    @bids.setter
+    def bids(self, levels):
+        self._bids.clear()
+        self._bids.update(levels)
+
+    @property
+    def asks(self):
+        return self._asks
+
+    @asks.setter
+    def asks(self, levels):
+        self._asks.clear()
+        self._asks.update(levels)
+
+    @property
+    def bid(self):
+        return self._bids
+
+    @property
+    def ask(self):
+        return self._asks
+
+    def __getitem__(self, str side):
+        side = side.lower()
+        if side == 'bid' or side == 'bids':
+            return self._bids
+        if side == 'ask' or side == 'asks':
+            return self._asks
+        raise KeyError(side)
+
+    def to_dict(self, to_type=None) -> dict:
+        return {BID: self._bids.to_dict(to_type), ASK: self._asks.to_dict(to_type)}
+
+    def __repr__(self):
+        return f"ArrayBook({self.to_dict()})"
+
+
+cdef int *_resize(int *array, Py_ssize_t length) except NULL:
+    cdef int *ret = <int *>realloc(array, length * sizeof(int))
+    if ret == NULL:
+        raise MemoryError()
+    return ret
+
+
+@cython.final
+cdef class L3BookSide:
+    """
+    One side of an L3Book, as a mapping of price: {order id: size} (the order_book.SortedDict interface
+    used for L3 books). The {order id: size} dicts are built, in queue order, when a level is read.
+    """
+    cdef L3Book _book
+    cdef bint _bids
+    cdef object _levels  # the side of the aggregated L2 book, keeps the prices sorted
+
+    def __cinit__(self, L3Book book, bint bids, levels):
+        self._book = book
+        self._bids = bids
+        self._levels = levels
+
+    def __getitem__(self, price):
+        return self._book._level_dict(self._bids, price)
+
+    def __contains__(self, price):
+        return price in (self._book._bid_levels if self._bids else self._book._ask_levels)
+
+    def __len__(self):
+        return len(self._levels)
+
+    def __iter__(self):
+        return iter(self._levels)
+
+    def keys(self):
+        return self._levels.keys()
+
+    def index(self, Py_ssize_t i) -> tuple:
+        """
+        (price, {order id: size}) of the i-th best level
+        """
+        price = self._levels.index(i)[0]
+        return price, self._book._level_dict(self._bids, price)
+
+    def to_list(self, n=None) -> list:
+        """
+        (price, {order id: size}) of up to n levels (default all), best first
+        """
+        levels = self._levels.to_list() if n is None else self._levels.to_list(n)
+        return [(price, self._book._level_dict(self._bids, price)) for price, _ in levels]
+
+    def to_dict(self, to_type=None) -> dict:
+        if to_type is None:
+            return {price: self._book._level_dict(self._bids, price) for price in self._levels.to_dict()}
+        return {to_type(price): to_type(self._book._level_dict(self._bids, price)) for price in self._levels.to_dict()}
+
+
+@cython.final
+cdef class L3Book:
+    """
+    Order by order (L3) book. Each resting order has a slot in a set of arrays: the links of the intrusive
+    FIFO queue of its price level, the level, and its id and size. The order id index maps an id to its
+    slot, so adding, cancelling or resizing an order is O(1) and keeps the queue position of every other
+    order. The aggregated book (size per price, an order_book.OrderBook) is updated with each change and
+    available as l2.
+
+    Exposes the sides like order_book.OrderBook does for L3 data (bids/asks, bid/ask and book[side], as
+    mappings of price: {order id: size}) so it can be used as the book of an OrderBook. Checksums are
+    not supported.
+    """
+    # per order slot
+    cdef int *_prev
+    cdef int *_next
+    cdef int *_level  # the order's level, the next free slot for free slots
+    cdef list _ids
+    cdef list _sizes
+    cdef Py_ssize_t _capacity
+    cdef int _free
+    cdef dict _index  # order id: slot
+    # per level
+    cdef int *_head
+    cdef int *_tail
+    cdef int *_count
+    cdef char *_side  # 1 for bids, 0 for asks
+    cdef list _prices
+    cdef Py_ssize_t _level_capacity
+    cdef int _free_level
+    cdef dict _bid_levels  # price: level
+    cdef dict _ask_levels
+
+    cdef readonly object l2
+    cdef readonly Py_ssize_t max_depth
+    cdef L3BookSide _bids
+    cdef L3BookSide _asks
+
+    def __cinit__(self, *args, **kwargs):
+        self._capacity = 0
+        self._level_capacity = 0
+        self._prev = self._next = self._level = NULL
+        self._head = self._tail = self._count = NULL
+        self._side = NULL
+
+    def __init__(self, max_depth=0):
+        self.max_depth = max_depth
+        self.l2 = _OrderBook(max_depth=max_depth)
+        self._bids = L3BookSide(self, True, self.l2.bids)
+        self._asks = L3BookSide(self, False, self.l2.asks)
+        self.clear()
+
+    def __dealloc__(self):
+        free(self._prev)
+        free(self._next)
+        free(self._level)
+        free(self._head)
+        free(self._tail)
+        free(self._count)
+        free(self._side)
+
+    cdef int _grow_orders(self) except -1:
+        cdef Py_ssize_t capacity = self._capacity * 2 if self._capacity else 256
+        cdef Py_ssize_t i
+        self._prev = _resize(self._prev, capacity)
+        self._next = _resize(self._next, capacity)
+        self._level = _resize(self._level, capacity)
+        self._ids.extend([None] * (capacity - self._capacity))
+        self._sizes.extend([None] * (capacity - self._capacity))
+        # chain the new slots onto the free list
+        for i in range(self._capacity, capacity - 1):
+            self._level[i] = i + 1
+        self._level[capacity - 1] = self._free
+        self._free = self._capacity
+        self._capacity = capacity
+        return 0
+
+    cdef int _grow_levels(self) except -1:
+        cdef Py_ssize_t capacity = self._level_capacity * 2 if self._level_capacity else 64
+        cdef Py_ssize_t i
+        self._head = _resize(self._head, capacity)
+        self._tail = _resize(self._tail, capacity)
+        self._count = _resize(self._count, capacity)
+        cdef char *side = <char *>realloc(self._side, capacity * sizeof(char))
+        if side == NULL:
+            raise MemoryError()
+        self._side = side
+        self._prices.extend([None] * (capacity - self._level_capacity))
+        # free levels are chained through head
+        for i in range(self._level_capacity, capacity - 1):
+            self._head[i] = i + 1
+        self._head[capacity - 1] = self._free_level
+        self._free_level = self._level_capacity
+        self._level_capacity = capacity
+        return 0
+
+    cdef inline bint _is_bid(self, str side) except -1:
+        if side == BID:
+            return True
+        if side == ASK:
+            return False
+        raise ValueError(f'invalid side {side}')
+
+    def add(self, str side, order_id, price, size):
+        """
+        add an order to the back of the queue at price. Raises ValueError if the order id is already in the book
+        """
+        if order_id in self._index:
+            raise ValueError(f'order {order_id} is already in the book')
+        cdef bint bids = self._is_bid(side)
+        cdef dict levels = self._bid_levels if bids else self._ask_levels
+        cdef int level
+        cdef int slot
+
+        l2 = self.l2.bids if bids else self.l2.asks
+        level_id = levels.get(price)
+        if level_id is None:
+            if self._free_level == -1:
+                self._grow_levels()
+            level = self._free_level
+            self._free_level = self._head[level]
+            self._head[level] = self._tail[level] = -1
+            self._count[level] = 0
+            self._side[level] = bids
+            self._prices[level] = price
+            levels[price] = level
+            l2[price] = size
+        else:
+            level = level_id
+            l2[price] = l2[price] + size
+
+        if self._free == -1:
+            self._grow_orders()
+        slot = self._free
+        self._free = self._level[slot]
+        self._level[slot] = level
+        self._next[slot] = -1
+        self._prev[slot] = self._tail[level]
+        if self._tail[level] == -1:
+            self._head[level] = slot
+        else:
+            self._next[self._tail[level]] = slot
+        self._tail[level] = slot
+        self._count[level] += 1
+        self._ids[slot] = order_id
+        self._sizes[slot] = size
+        self._index[order_id] = slot
+
+    def remove(self, order_id) -> tuple:
+        """
+        remove an order, returns its (side, price, size). Raises KeyError if the order is not in the book
+        """
+        cdef int slot = self._index.pop(order_id)
+        cdef int level = self._level[slot]
+        cdef bint bids = self._side[level]
+        price = self._prices[level]
+        size = self._sizes[slot]
+
+        if self._prev[slot] == -1:
+            self._head[level] = self._next[slot]
+        else:
+            self._next[self._prev[slot]] = self._next[slot]
+        if self._next[slot] == -1:
+            self._tail[level] = self._prev[slot]
+        else:
+            self._prev[self._next[slot]] = self._prev[slot]
+        self._count[level] -= 1
+
+        l2 = self.l2.bids if bids else self.l2.asks
+        if self._count[level] == 0:
+            del (self._bid_levels if bids else self._ask_levels)[price]
+            del l2[price]
+            self._prices[level] = None
+            self._head[level] = self._free_level
+            self._free_level = level
+        else:
+            l2[price] = l2[price] - size
+
+        self._ids[slot] = None
+        self._sizes[slot] = None
+        self._level[slot] = self._free
+        self._free = slot
+        return BID if bids else ASK, price, size
+
+    def update(self, order_id, size):
+        """
+        change the size of an order, keeping its place in the queue. Raises KeyError if the order is not in the book
+        """
+        cdef int slot = self._index[order_id]
+        cdef int level = self._level[slot]
+        price = self._prices[level]
+        l2 = self.l2.bids if self._side[level] else self.l2.asks
+        l2[price] = l2[price] + size - self._sizes[slot]
+        self._sizes[slot] = size
+
+    def get(self, order_id, default=None):
+        """
+        (side, price, size) of an order
+        """
+        slot_id = self._index.get(order_id)
+        if slot_id is None:
+            return default
+        cdef int slot = slot_id
+        cdef int level = self._level[slot]
+        return BID if self._side[level] else ASK, self._prices[level], self._sizes[slot]
+
+    def position(self, order_id) -> tuple:
+        """
+        (number of orders, total size) ahead of an order in its level's queue
+        """
+        cdef int slot = self._index[order_id]
+        cdef int count = 0
+        size = 0
+        slot = self._prev[slot]
+        while slot != -1:
+            count += 1
+            size += self._sizes[slot]
+            slot = self._prev[slot]
+        return count, size
+
+    def level(self, str side, price) -> dict:
+        """
+        {order id: size} of the orders at price, in queue order
+        """
+        return self._level_dict(self._is_bid(side), price)
+
+    cdef dict _level_dict(self, bint bids, price):
+        cdef int slot = (self._bid_levels if bids else self._ask_levels)[price]
+        cdef dict ret = {}
+        slot = self._head[slot]
+        while slot != -1:
+            ret[self._ids[slot]] = self._sizes[slot]
+            slot = self._next[slot]
+        return ret
+
+    def __contains__(self, order_id):
+        return order_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def clear(self):
+        self._free = -1
+        self._free_level = -1
+        self._capacity = 0
+        self._level_capacity = 0
+        self._ids = []
+        self._sizes = []
+        self._prices = []
+        self._index = {}
+        self._bid_levels = {}
+        self._ask_levels = {}
+        self.l2.bids = {}
+        self.l2.asks = {}
+
+    def _set_side(self, str side, levels):
+        cdef bint bids = self._is_bid(side)
+        for order_id in [order_id for order_id, slot in self._index.items() if self._side[self._level[<int>slot]] == bids]:
+            self.remove(order_id)
+        for price, orders in levels.items():
+            for order_id, size in orders.items():
+                self.add(side, order_id, price, size)
+
+    @property
+    def bids(self):
+        return self._bids
+
+    @bids.setter
+    def bids(self, levels):
+        self._set_side(BID, levels)
+
+    @property
+    def asks(self):
+        return self._asks
+
+    @asks.setter
+    def asks(self, levels):
+        self._set_side(ASK, levels)
+
+    @property
+    def bid(self):
+        return self._bids
+
+    @property
+    def ask(self):
+        return self._asks
+
+    def __getitem__(self, str side):
+        side = side.lower()
+        if side == 'bid' or side == 'bids':
+            return self._bids
+        if side == 'ask' or side == 'asks':
+            return self._asks
+        raise KeyError(side)
+
+    def to_dict(self, to_type=None) -> dict:
+        return {BID: self._bids.to_dict(to_type), ASK: self._asks.to_dict(to_type)}
+
+    def memory(self) -> dict:
+        """
+        Bytes used by the book's own structures: the slot and level arrays and lists, the order id index
+        and the price to level maps. The order ids, prices and sizes themselves and the aggregated book
+        are not included.
+        """
+        cdef Py_ssize_t orders = len(self._index)
+        cdef Py_ssize_t levels = len(self._bid_levels) + len(self._ask_levels)
+        total = (self._capacity * 3 * sizeof(int) + self._level_capacity * (3 * sizeof(int) + sizeof(char))
+                 + sys.getsizeof(self._ids) + sys.getsizeof(self._sizes) + sys.getsizeof(self._prices)
+                 + sys.getsizeof(self._index) + sys.getsizeof(self._bid_levels) + sys.getsizeof(self._ask_levels)
+                 # slots and levels beyond the small int cache are int objects
+                 + sum([sys.getsizeof(slot) for slot in self._index.values() if slot > 256])
+                 + sum([sys.getsizeof(level) for levels_map in (self._bid_levels, self._ask_levels) for level in levels_map.values() if level > 256]))
+        return {'orders': orders, 'levels': levels, 'bytes': total, 'bytes_per_order': total / orders if orders else 0}
+
+    def __repr__(self):
+        return f"L3Book({self.to_dict()})"
+
+
 cdef class OrderBook:
     cdef readonly str exchange
     cdef readonly str symbol
     cdef readonly object book
-    cdef public dict delta
+    cdef dict _delta_updates
+    cdef dict _snapshot_cache  # serialized snapshots, keyed by (numeric_type, depth). Reset whenever delta is set
     cdef public object sequence_number
     cdef public object checksum
     cdef public object timestamp
     cdef public object raw  # Can be dict or list
-
-    def __init__(self, exchange, symbol, bids=None, asks=None, max_depth=0, truncate=False, checksum_format=None):
+    cdef readonly object tick_size  # set when prices are scaled integers (number of ticks)
+    cdef readonly int top_depth  # number of levels per side tracked by the top view, see track_top
+    cdef tuple _top
+    cdef readonly bint top_changed
+
+    def __init__(self, exchange, symbol, bids=None, asks=None, max_depth=0, truncate=False, checksum_format=None, tick_size=None, array_book=False, l3_book=False):
+        if checksum_format and (array_book or l3_book):
+            raise ValueError('checksum_format is not supported with array_book or l3_book')
         self.exchange = exchange
         self.symbol = symbol
-        self.book = _OrderBook(max_depth=max_depth, checksum_format=checksum_format, max_depth_strict=truncate)
+        self.tick_size = tick_size
+        if l3_book:
+            # order by order book, levels are dicts of order id: size
+            self.book = L3Book(max_depth=max_depth)
+        elif array_book:
+            # integer prices (e.g. ticks, with tick_size set) only
+            self.book = ArrayBook(max_depth=max_depth, max_depth_strict=truncate)
+        else:
+            self.book = _OrderBook(max_depth=max_depth, checksum_format=checksum_format, max_depth_strict=truncate)
         if bids:
             self.book.bids = bids
         if asks:
@@ -409,6 +1606,75 @@ cdef class OrderBook:
         self.checksum = None
         self.raw = None
 
+    @property
+    def delta(self):
+        return self._delta_updates
+
+    @delta.setter
+    def delta(self, value):
+        # the book is updated before the delta is set (see Feed.book_callback)
+        # so any cached serialization of the book is now stale
+        self._delta_updates = value
+        self._snapshot_cache = None
+        if self.top_depth:
+            self._update_top(value)
+
+    def track_top(self, int depth):
+        """
+        Maintain a view of the top depth levels of each side (top), and whether the last update changed
+        them (top_changed). The view is only rebuilt when a delta changes a price at or above the last
+        level in the view, updates without a delta (snapshots) always rebuild it.
+        """
+        self.top_depth = depth
+        self._top = None
+        if depth:
+            self._update_top(None)
+
+    @property
+    def top(self):
+        """
+        (bids, asks): lists of the top top_depth (price, size) levels of each side, best first. None unless tracked
+        """
+        return self._top
+
+    cdef bint _touches_top(self, list levels, list top, bint bids):
+        if len(top) < self.top_depth:
+            # any new level is in the view
+            return len(levels) > 0
+        last = top[-1][0]
+        for level in levels:
+            if (bids and level[0] >= last) or (not bids and level[0] <= last):
+                return True
+        return False
+
+    cdef _update_top(self, delta):
+        if self._top is not None and delta is not None:
+            if not (self._touches_top(delta[BID], self._top[0], True) or self._touches_top(delta[ASK], self._top[1], False)):
+                self.top_changed = False
+                return
+        top = (self.book.bids.to_list(self.top_depth), self.book.asks.to_list(self.top_depth))
+        self.top_changed = top != self._top
+        self._top = top
+
+    def with_delta(self, delta) -> OrderBook:
+        """
+        A copy of the update with a different delta. The copy shares the book (the levels are not copied)
+        """
+        cdef OrderBook ob = OrderBook.__new__(OrderBook)
+        ob.exchange = self.exchange
+        ob.symbol = self.symbol
+        ob.tick_size = self.tick_size
+        ob.book = self.book
+        ob.delta = delta
+        ob.timestamp = self.timestamp
+        ob.sequence_number = self.sequence_number
+        ob.checksum = self.checksum
+        ob.raw = self.raw
+        ob.top_depth = self.top_depth
+        ob._top = self._top
+        ob.top_changed = self.top_changed
+        return ob
+
     @staticmethod
     def from_dict(data: dict) -> OrderBook:
         ob = OrderBook(data['exchange'], data['symbol'], bids=data['book'][BID], asks=data['book'][ASK])
@@ -419,14 +1685,16 @@ cdef class OrderBook:
 
     def _delta(self, numeric_type) -> dict:
         return {
-            BID: [tuple([numeric_type(v) if isinstance(v, Decimal) else v for v in value]) for value in self.delta[BID]],
-            ASK: [tuple([numeric_type(v) if isinstance(v, Decimal) else v for v in value]) for value in self.delta[ASK]]
+            BID: [tuple([numeric_type(v) if isinstance(v, NUMERIC_TYPES) else v for v in value]) for value in self.delta[BID]],
+            ASK: [tuple([numeric_type(v) if isinstance(v, NUMERIC_TYPES) else v for v in value]) for value in self.delta[ASK]]
         }
 
-    def to_dict(self, delta=False, numeric_type=None, none_to=False) -> dict:
-        assert self.sequence_number is None or isinstance(self.sequence_number, int)
-        assert self.checksum is None or isinstance(self.checksum, (str, int))
-        assert self.timestamp is None or isinstance(self.timestamp, float)
+    def _snapshot(self, numeric_type, depth) -> dict:
+        key = (numeric_type, depth)
+        if self._snapshot_cache is None:
+            self._snapshot_cache = {}
+        elif key in self._snapshot_cache:
+            return self._snapshot_cache[key]
 
         def helper(x):
             if isinstance(x, dict):
@@ -434,6 +1702,37 @@ cdef class OrderBook:
             else:
                 return numeric_type(x)
 
+        if depth:
+            if numeric_type is None:
+                book_dict = {BID: dict(self.book.bids.to_list(depth)), ASK: dict(self.book.asks.to_list(depth))}
+            else:
+                book_dict = {BID: {helper(k): helper(v) for k, v in self.book.bids.to_list(depth)}, ASK: {helper(k): helper(v) for k, v in self.book.asks.to_list(depth)}}
+        elif numeric_type is None:
+            book_dict = self.book.to_dict()
+        else:
+            book_dict = self.book.to_dict(to_type=helper)
+        self._snapshot_cache[key] = book_dict
+        return book_dict
+
+    def to_dict(self, delta=False, numeric_type=None, none_to=False, depth=0) -> dict:
+        """
+        delta: bool
+            only serialize the delta (the changes in the last update) rather than the book
+        numeric_type: callable
+            conversion applied to prices and sizes
+        none_to: object
+            value None fields are replaced with
+        depth: int
+            maximum number of levels per side of the book to serialize. 0 (the default) serializes all levels
+
+        The serialized book is cached until the next update (i.e. until delta is set again), so the book
+        is only serialized once per update, no matter how many callbacks request it. The cached book must
+        not be modified.
+        """
+        assert self.sequence_number is None or isinstance(self.sequence_number, int)
+        assert self.checksum is None or isinstance(self.checksum, (str, int))
+        assert self.timestamp is None or isinstance(self.timestamp, float)
+
         if delta:
             if numeric_type is None:
                 data = {'exchange': self.exchange, 'symbol': self.symbol, 'delta': self.delta, 'timestamp': self.timestamp}
@@ -441,15 +1740,80 @@ cdef class OrderBook:
                 data = {'exchange': self.exchange, 'symbol': self.symbol, 'delta': self._delta(numeric_type) if self.delta else None, 'timestamp': self.timestamp}
             return data if not none_to else convert_none_values(data, none_to)
 
+        book_dict = self._snapshot(numeric_type, depth)
         if numeric_type is None:
-            book_dict = self.book.to_dict()
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'book': book_dict, 'delta': self.delta, 'timestamp': self.timestamp}
-            return data if not none_to else convert_none_values(data, none_to)
-
-        book_dict = self.book.to_dict(to_type=helper)
-        data = {'exchange': self.exchange, 'symbol': self.symbol, 'book': book_dict, 'delta': self._delta(numeric_type) if self.delta else None, 'timestamp': self.timestamp}
+        else:
+            data = {'exchange': self.exchange, 'symbol': self.symbol, 'book': book_dict, 'delta': self._delta(numeric_type) if self.delta else None, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    cdef list _levels(self, object side, int depth):
+        return side.to_list(depth) if depth else side.to_list()
+
+    def to_json_bytes(self, delta=False, numeric_type=float, none_to=None, depth=0, receipt_timestamp=None, numeric_format=None) -> bytes:
+        """
+        The update as the backends write it: the delta (delta=True), or the book without the delta. See to_dict
+        for the arguments
+        """
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            if delta:
+                encoder.key('delta')
+                if self.delta:
+                    encoder.write(b'{', 1)
+                    encoder.first = True
+                    encoder.key(BID)
+                    encoder.delta_levels(self.delta[BID])
+                    encoder.key(ASK)
+                    encoder.delta_levels(self.delta[ASK])
+                    encoder.write(b'}', 1)
+                    encoder.first = False
+                else:
+                    encoder.none()
+            else:
+                encoder.key('book')
+                encoder.write(b'{', 1)
+                encoder.first = True
+                encoder.key(BID)
+                encoder.book_levels(self._levels(self.book.bids, depth))
+                encoder.key(ASK)
+                encoder.book_levels(self._levels(self.book.asks, depth))
+                encoder.write(b'}', 1)
+                encoder.first = False
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, delta=False, numeric_type=float, depth=0, receipt_timestamp=None, numeric_format=None) -> bytes:
+        """
+        delta and the bid and ask levels (JSON, as in to_json_bytes) as fields
+        """
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        cdef Py_ssize_t start
+        try:
+            delta = delta and self.delta is not None
+            encoder.measurement(measurement, self.symbol)
+            encoder.field('delta')
+            encoder.text('True' if delta else 'False')
+            for side in (BID, ASK):
+                encoder.field(side)
+                encoder.write(b'"', 1)
+                start = encoder.size
+                if delta:
+                    encoder.delta_levels(self.delta[side])
+                else:
+                    encoder.book_levels(self._levels(self.book.bids if side == BID else self.book.asks, depth))
+                encoder.escape_from(start)
+                encoder.write(b'"', 1)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} book: {self.book} timestamp: {self.timestamp}"
 
@@ -471,8 +1835,8 @@ cdef class Order:
     cdef readonly object timestamp
 
     def __init__(self, symbol, client_order_id, side, type, price, amount, timestamp, account=None, exchange=None):
-        assert isinstance(price, Decimal)
-        assert isinstance(amount, Decimal)
+        assert isinstance(price, NUMERIC_TYPES)
+        assert isinstance(amount, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.symbol = symbol
@@ -506,6 +1870,38 @@ cdef class Order:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'client_order_id': self.client_order_id, 'side': self.side, 'type': self.type, 'price': numeric_type(self.price), 'amount': numeric_type(self.amount), 'account': self.account, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_string('client_order_id', self.client_order_id)
+            encoder.json_string('side', self.side)
+            encoder.json_string('type', self.type)
+            encoder.json_number('price', self.price)
+            encoder.json_number('amount', self.amount)
+            encoder.json_string('account', self.account)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_string('client_order_id', self.client_order_id)
+            encoder.line_string('side', self.side)
+            encoder.line_string('type', self.type)
+            encoder.line_number('price', self.price)
+            encoder.line_number('amount', self.amount)
+            encoder.line_string('account', self.account)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f'exchange: {self.exchange} symbol: {self.symbol} client_order_id: {self.client_order_id} side: {self.side} type: {self.type} price: {self.price} amount: {self.amount} account: {self.account} timestamp: {self.timestamp}'
 
@@ -534,9 +1930,9 @@ cdef class OrderInfo:
     cdef readonly object raw  # Can be dict or list
 
     def __init__(self, exchange, symbol, id, side, status, type, price, amount, remaining, timestamp, client_order_id=None, account=None, raw=None):
-        assert isinstance(price, Decimal)
-        assert isinstance(amount, Decimal)
-        assert remaining is None or isinstance(remaining, Decimal)
+        assert isinstance(price, NUMERIC_TYPES)
+        assert isinstance(amount, NUMERIC_TYPES)
+        assert remaining is None or isinstance(remaining, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -580,6 +1976,44 @@ cdef class OrderInfo:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'id': self.id, 'client_order_id': self.client_order_id, 'side': self.side, 'status': self.status, 'type': self.type, 'price': numeric_type(self.price), 'amount': numeric_type(self.amount), 'remaining': numeric_type(self.remaining), 'account': self.account, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_string('id', self.id)
+            encoder.json_string('client_order_id', self.client_order_id)
+            encoder.json_string('side', self.side)
+            encoder.json_string('status', self.status)
+            encoder.json_string('type', self.type)
+            encoder.json_number('price', self.price)
+            encoder.json_number('amount', self.amount)
+            encoder.json_number('remaining', self.remaining)
+            encoder.json_string('account', self.account)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_string('id', self.id)
+            encoder.line_string('client_order_id', self.client_order_id)
+            encoder.line_string('side', self.side)
+            encoder.line_string('status', self.status)
+            encoder.line_string('type', self.type)
+            encoder.line_number('price', self.price)
+            encoder.line_number('amount', self.amount)
+            encoder.line_number('remaining', self.remaining)
+            encoder.line_string('account', self.account)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f'exchange: {self.exchange} symbol: {self.symbol} id: {self.id} client_order_id: {self.client_order_id} side: {self.side} status: {self.status} type: {self.type} price: {self.price} amount: {self.amount} remaining: {self.remaining} account: {self.account} timestamp: {self.timestamp}'
 
@@ -598,8 +2032,8 @@ cdef class Balance:
     cdef readonly dict raw
 
     def __init__(self, exchange, currency, balance, reserved, raw=None):
-        assert isinstance(balance, Decimal)
-        assert reserved is None or isinstance(reserved, Decimal)
+        assert isinstance(balance, NUMERIC_TYPES)
+        assert reserved is None or isinstance(reserved, NUMERIC_TYPES)
 
         self.exchange = exchange
         self.currency = currency
@@ -614,6 +2048,34 @@ cdef class Balance:
             data = {'exchange': self.exchange, 'currency': self.currency, 'balance': numeric_type(self.balance), 'reserved': numeric_type(self.reserved)}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('currency', self.currency)
+            encoder.json_number('balance', self.balance)
+            encoder.json_number('reserved', self.reserved)
+            if receipt_timestamp is None:
+                encoder.write(b'}', 1)
+            else:
+                encoder.end(None, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, None)
+            encoder.tag('currency', self.currency)
+            encoder.line_number('balance', self.balance)
+            encoder.line_number('reserved', self.reserved)
+            encoder.end_line(None, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f'exchange: {self.exchange} currency: {self.currency} balance: {self.balance} reserved: {self.reserved}'
 
@@ -635,10 +2097,10 @@ cdef class L1Book:
     cdef readonly dict raw
 
     def __init__(self, exchange, symbol, bid_price, bid_size, ask_price, ask_size, timestamp, raw=None):
-        assert isinstance(bid_price, Decimal)
-        assert isinstance(bid_size, Decimal)
-        assert isinstance(ask_price, Decimal)
-        assert isinstance(ask_size, Decimal)
+        assert isinstance(bid_price, NUMERIC_TYPES)
+        assert isinstance(bid_size, NUMERIC_TYPES)
+        assert isinstance(ask_price, NUMERIC_TYPES)
+        assert isinstance(ask_size, NUMERIC_TYPES)
 
         self.exchange = exchange
         self.symbol = symbol
@@ -656,6 +2118,34 @@ cdef class L1Book:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'bid_price': numeric_type(self.bid_price), 'bid_size': numeric_type(self.bid_size), 'ask_price': numeric_type(self.ask_price), 'ask_size': numeric_type(self.ask_size), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_number('bid_price', self.bid_price)
+            encoder.json_number('bid_size', self.bid_size)
+            encoder.json_number('ask_price', self.ask_price)
+            encoder.json_number('ask_size', self.ask_size)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_number('bid_price', self.bid_price)
+            encoder.line_number('bid_size', self.bid_size)
+            encoder.line_number('ask_price', self.ask_price)
+            encoder.line_number('ask_size', self.ask_size)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f'exchange: {self.exchange} symbol: {self.symbol} bid_price: {self.bid_price} bid_size: {self.bid_size}, ask_price: {self.ask_price} ask_size: {self.ask_size} timestamp: {self.timestamp}'
 
@@ -676,7 +2166,7 @@ cdef class Transaction:
     cdef readonly dict raw
 
     def __init__(self, exchange, currency, type, status, amount, timestamp, raw=None):
-        assert isinstance(amount, Decimal)
+        assert isinstance(amount, NUMERIC_TYPES)
 
         self.exchange = exchange
         self.currency = currency
@@ -693,6 +2183,33 @@ cdef class Transaction:
             data = {'exchange': self.exchange, 'currency': self.currency, 'type': self.type, 'status': self.status, 'amount': numeric_type(self.amount), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('currency', self.currency)
+            encoder.json_string('type', self.type)
+            encoder.json_string('status', self.status)
+            encoder.json_number('amount', self.amount)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, None)
+            encoder.tag('currency', self.currency)
+            encoder.line_string('type', self.type)
+            encoder.line_string('status', self.status)
+            encoder.line_number('amount', self.amount)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f'exchange: {self.exchange} currency: {self.currency} type: {self.type} status: {self.status} amount: {self.amount} timestamp {self.timestamp}'
 
@@ -719,9 +2236,9 @@ cdef class Fill:
     cdef readonly object raw  # can be dict or list
 
     def __init__(self, exchange, symbol, side, amount, price, fee, id, order_id, type, liquidity, timestamp, account=None, raw=None):
-        assert isinstance(price, Decimal)
-        assert isinstance(amount, Decimal)
-        assert fee is None or isinstance(fee, Decimal)
+        assert isinstance(price, NUMERIC_TYPES)
+        assert isinstance(amount, NUMERIC_TYPES)
+        assert fee is None or isinstance(fee, NUMERIC_TYPES)
 
         self.exchange = exchange
         self.symbol = symbol
@@ -744,6 +2261,44 @@ cdef class Fill:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'side': self.side, 'amount': numeric_type(self.amount), 'price': numeric_type(self.price), 'fee': numeric_type(self.fee), 'liquidity': self.liquidity, 'id': self.id, 'order_id': self.order_id, 'type': self.type, 'account': self.account, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_string('side', self.side)
+            encoder.json_number('amount', self.amount)
+            encoder.json_number('price', self.price)
+            encoder.json_number('fee', self.fee)
+            encoder.json_string('liquidity', self.liquidity)
+            encoder.json_string('id', self.id)
+            encoder.json_string('order_id', self.order_id)
+            encoder.json_string('type', self.type)
+            encoder.json_string('account', self.account)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_string('side', self.side)
+            encoder.line_number('amount', self.amount)
+            encoder.line_number('price', self.price)
+            encoder.line_number('fee', self.fee)
+            encoder.line_string('liquidity', self.liquidity)
+            encoder.line_string('id', self.id)
+            encoder.line_string('order_id', self.order_id)
+            encoder.line_string('type', self.type)
+            encoder.line_string('account', self.account)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f'exchange: {self.exchange} symbol: {self.symbol} side: {self.side} amount: {self.amount} price: {self.price} fee: {self.fee} liquidity: {self.liquidity} id: {self.id} order_id: {self.order_id} type: {self.type} account: {self.account} timestamp: {self.timestamp}'
 
@@ -765,9 +2320,9 @@ cdef class Position:
     cdef readonly object raw  # Can be dict or list
 
     def __init__(self, exchange, symbol, position, entry_price, side, unrealised_pnl, timestamp, raw=None):
-        assert isinstance(position, Decimal)
-        assert isinstance(entry_price, Decimal)
-        assert unrealised_pnl is None or isinstance(unrealised_pnl, Decimal)
+        assert isinstance(position, NUMERIC_TYPES)
+        assert isinstance(entry_price, NUMERIC_TYPES)
+        assert unrealised_pnl is None or isinstance(unrealised_pnl, NUMERIC_TYPES)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -786,6 +2341,34 @@ cdef class Position:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'position': numeric_type(self.position), 'entry_price': numeric_type(self.entry_price),  'side': self.side, 'unrealised_pnl': numeric_type(self.unrealised_pnl), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def to_json_bytes(self, numeric_type=float, none_to=None, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, none_to)
+        try:
+            encoder.begin()
+            encoder.json_string('exchange', self.exchange)
+            encoder.json_string('symbol', self.symbol)
+            encoder.json_number('position', self.position)
+            encoder.json_number('entry_price', self.entry_price)
+            encoder.json_value('side', self.side)
+            encoder.json_number('unrealised_pnl', self.unrealised_pnl)
+            encoder.end(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
+    def to_line_protocol(self, str measurement, numeric_type=float, receipt_timestamp=None, numeric_format=None) -> bytes:
+        cdef _Encoder encoder = _acquire(numeric_type, numeric_format, None)
+        try:
+            encoder.measurement(measurement, self.symbol)
+            encoder.line_number('position', self.position)
+            encoder.line_number('entry_price', self.entry_price)
+            encoder.line_value('side', self.side)
+            encoder.line_number('unrealised_pnl', self.unrealised_pnl)
+            encoder.end_line(self.timestamp, receipt_timestamp)
+            return encoder.finish()
+        finally:
+            _release(encoder)
+
     def __repr__(self):
         return f'exchange: {self.exchange} symbol: {self.symbol} position: {self.position} entry_price: {self.entry_price} side: {self.side} unrealised_pnl: {self.unrealised_pnl} timestamp: {self.timestamp}'
 
@@ -0,0 +1,96 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+from typing import Dict
+
+from cryptofeed.defines import ASK, BID
+
+
+class _State:
+    __slots__ = ('book', 'checksum', 'bid_edge', 'ask_edge', 'count')
+
+    def __init__(self, book):
+        self.book = book
+        # checksum of the book as of the last computation, None once an update has changed the checksummed levels
+        self.checksum = None
+        # worst price in the checksummed levels of each side, None while the side has fewer levels
+        self.bid_edge = None
+        self.ask_edge = None
+        self.count = 0
+
+
+class BookChecksum:
+    """
+    Validates exchange provided order book checksums (computed by the order book, see the checksum_format
+    of OrderBook) for the top depth levels of each side. The checksum is only computed again once a delta
+    changes a level within the top depth levels, updates further down the book reuse the previous value.
+    With an interval, only every interval-th update of a symbol is validated.
+    """
+    def __init__(self, depth: int, interval: int = 1):
+        """
+        depth: int
+            number of levels per side covered by the checksum
+        interval: int
+            validate every interval-th update (and every snapshot) of each symbol
+        """
+        self.depth = depth
+        self.interval = interval
+        self.state: Dict[str, _State] = {}
+        self.computed = 0
+        self.reused = 0
+
+    def _changed(self, state: _State, delta: dict) -> bool:
+        for price, *_ in delta[BID]:
+            if state.bid_edge is None or price >= state.bid_edge:
+                return True
+        for price, *_ in delta[ASK]:
+            if state.ask_edge is None or price <= state.ask_edge:
+                return True
+        return False
+
+    def invalidate(self, book, delta: dict):
+        """
+        Account for an update that carries no checksum, so the next validation does not reuse a checksum
+        computed before it
+
+        book: OrderBook
+            the book, after delta has been applied
+        delta: dict
+            the update's changes ({BID: [(price, size), ...], ASK: [...]})
+        """
+        state = self.state.get(book.symbol)
+        if state is not None and state.book is book and state.checksum is not None and self._changed(state, delta):
+            state.checksum = None
+
+    def valid(self, book, checksum: int, delta: dict = None) -> bool:
+        """
+        book: OrderBook
+            the book, after delta has been applied
+        checksum: int
+            checksum provided by the exchange
+        delta: dict
+            the update's changes ({BID: [(price, size), ...], ASK: [...]}), None for snapshots
+        """
+        state = self.state.get(book.symbol)
+        if state is None or state.book is not book or delta is None:
+            state = self.state[book.symbol] = _State(book)
+        else:
+            self.invalidate(book, delta)
+
+        state.count += 1
+        if delta is not None and state.count < self.interval:
+            return True
+        state.count = 0
+
+        if state.checksum is None:
+            self.computed += 1
+            levels = book.book
+            state.checksum = levels.checksum()
+            state.bid_edge = levels.bids.index(self.depth - 1)[0] if len(levels.bids) >= self.depth else None
+            state.ask_edge = levels.asks.index(self.depth - 1)[0] if len(levels.asks) >= self.depth else None
+        else:
+            self.reused += 1
+        return state.checksum == checksum
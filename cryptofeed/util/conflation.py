@@ -0,0 +1,135 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+from cryptofeed.defines import ASK, BID
+
+
+LOG = logging.getLogger('feedhandler')
+
+
+class _Pending:
+    __slots__ = ('book', 'receipt_timestamp', 'delta', 'emitted', 'timer')
+
+    def __init__(self):
+        self.book = None
+        self.receipt_timestamp = None
+        # price -> size of the levels changed since the last emitted update, per side
+        self.delta = None
+        self.emitted = 0.0
+        self.timer = None
+
+
+class BookConflator:
+    """
+    Conflates L2 book updates: a symbol's book is passed to the callbacks at most once every interval
+    seconds, with the deltas received since the previous update merged into one (the last size for each
+    price wins). Updates that change the top depth levels of either side (see OrderBook.track_top) are
+    passed on immediately, as are snapshots (updates without a delta). Merged updates are sent when the
+    interval expires, so the callbacks always catch up with the book.
+
+    Without an interval only updates that change the top depth levels are passed on, carrying the deltas
+    of the updates before them.
+    """
+    def __init__(self, feed_id: str, emit: Callable[..., Awaitable], interval: float = None, depth: int = 0):
+        """
+        emit: coroutine function
+            called with the book and receipt timestamp of each conflated update
+        interval: float
+            minimum number of seconds between updates of a symbol. None to only pass on updates that change
+            the top depth levels
+        depth: int
+            number of levels per side that are checked for changes, 0 only uses the interval
+        """
+        self.id = feed_id
+        self.emit = emit
+        self.interval = interval
+        self.depth = depth
+        self.pending: Dict[str, _Pending] = {}
+        self._tasks = set()
+        if not interval and not depth:
+            raise ValueError('BookConflator needs an interval, a depth or both')
+
+    async def update(self, book, receipt_timestamp: float):
+        state = self.pending.get(book.symbol)
+        if state is None:
+            state = self.pending[book.symbol] = _Pending()
+        state.book = book
+        state.receipt_timestamp = receipt_timestamp
+        if book.top_depth != self.depth:
+            book.track_top(self.depth)
+
+        if book.delta is None:
+            # a snapshot replaces whatever was pending
+            state.delta = None
+            await self._emit(state, book)
+            return
+
+        loop = asyncio.get_running_loop()
+        due = (self.depth and book.top_changed) or (self.interval is not None and loop.time() - state.emitted >= self.interval)
+        if state.delta is None:
+            if due:
+                # nothing to merge with
+                await self._emit(state, book)
+                return
+            state.delta = {BID: dict(book.delta[BID]), ASK: dict(book.delta[ASK])}
+        else:
+            for side in (BID, ASK):
+                state.delta[side].update(book.delta[side])
+            if due:
+                await self._emit(state, book.with_delta(self._merged(state)))
+                return
+
+        if state.timer is None and self.interval is not None:
+            state.timer = loop.call_at(state.emitted + self.interval, self._expire, book.symbol)
+
+    @staticmethod
+    def _merged(state: _Pending) -> dict:
+        return {side: list(levels.items()) for side, levels in state.delta.items()}
+
+    async def _emit(self, state: _Pending, book):
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        state.delta = None
+        state.emitted = asyncio.get_running_loop().time()
+        await self.emit(book, state.receipt_timestamp)
+
+    def _expire(self, symbol: str):
+        state = self.pending[symbol]
+        state.timer = None
+        if state.delta is not None:
+            task = asyncio.get_running_loop().create_task(self._flush(state))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, state: _Pending):
+        if state.delta is None:
+            return
+        book = state.book.with_delta(self._merged(state))
+        try:
+            await self._emit(state, book)
+        except Exception:
+            LOG.error('%s: error in conflated book callback for %s', self.id, book.symbol, exc_info=True)
+
+    async def flush(self):
+        """
+        Send the pending updates of all symbols
+        """
+        for state in list(self.pending.values()):
+            await self._flush(state)
+
+    def stop(self):
+        for state in self.pending.values():
+            if state.timer is not None:
+                state.timer.cancel()
+                state.timer = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
@@ -5,35 +5,158 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 
 
-This file contains helper functions for performance instrumentation
+Latency instrumentation. When enabled (latency.enable(), or the latency_instrumentation config
+setting) the following are recorded, in histograms per feed, channel and connection:
+
+    exchange_to_receipt: exchange timestamp of an update to the time it was received
+    receipt_to_callback: time an update was received to the completion of its callbacks
+    backend_queue_dwell: time an update waited in a backend's queue before its writer read it
+                         (not recorded for multiprocess backends). The connection label is the
+                         backend's class name, the channel the data channel the backend writes
+
+Recording is a single attribute check when disabled. Results are available from latency.stats()
+or, in the Prometheus text exposition format, from latency.prometheus().
 '''
-import time
 from collections import defaultdict
+from contextvars import ContextVar
+import time
+
+
+EXCHANGE_TO_RECEIPT = 'exchange_to_receipt'
+RECEIPT_TO_CALLBACK = 'receipt_to_callback'
+BACKEND_QUEUE_DWELL = 'backend_queue_dwell'
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# id of the connection whose messages are being handled in the current task, set by the connection handler
+CONNECTION = ContextVar('connection', default='')
+
+
+class Histogram:
+    """
+    Log-linear (HDR style) histogram of non-negative values, recorded in microseconds. Each power of
+    two range is split into 2^(precision - 1) buckets, so recorded values are within 1 / 2^(precision - 1)
+    of the true value (under 1% with the default precision of 8), in constant memory per range.
+    """
+    def __init__(self, precision=8):
+        self.precision = precision
+        self.linear = 1 << precision
+        self.half = 1 << (precision - 1)
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value: int) -> int:
+        if value < self.linear:
+            return value
+        shift = value.bit_length() - self.precision
+        return (shift + 1) * self.half + (value >> shift) - self.half
+
+    def _value(self, index: int) -> int:
+        """
+        lowest value that falls in the bucket
+        """
+        if index < self.linear:
+            return index
+        shift = index // self.half - 1
+        return (index % self.half + self.half) << shift
+
+    def record(self, seconds: float):
+        value = int(seconds * 1_000_000) if seconds > 0 else 0
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """
+        value (in seconds) at quantile q (0 - 1)
+        """
+        if not self.count:
+            return 0.0
+        target = max(1, q * self.count)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                # highest value in the bucket, bounded by the values actually recorded
+                return max(min(self._value(index + 1) - 1, self.max), self.min) / 1_000_000
+        return self.max / 1_000_000
+
+    def summary(self) -> dict:
+        ret = {
+            'count': self.count,
+            'min': (self.min or 0) / 1_000_000,
+            'max': (self.max or 0) / 1_000_000,
+            'mean': self.total / self.count / 1_000_000 if self.count else 0.0,
+        }
+        for q in QUANTILES:
+            ret[f'p{q * 100:g}'] = self.quantile(q)
+        return ret
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
 
+    def reset(self):
+        self.histograms = {}
 
-_perf_data = defaultdict(lambda: defaultdict(dict))
-_perf_stats = defaultdict(list)
+    def record(self, metric: str, feed: str, channel: str, connection: str, seconds: float):
+        key = (metric, feed, channel, connection)
+        try:
+            self.histograms[key].record(seconds)
+        except KeyError:
+            self.histograms[key] = Histogram()
+            self.histograms[key].record(seconds)
 
+    def record_callback(self, feed: str, channel: str, obj, receipt_timestamp: float):
+        connection = CONNECTION.get()
+        timestamp = getattr(obj, 'timestamp', None)
+        if timestamp:
+            self.record(EXCHANGE_TO_RECEIPT, feed, channel, connection, receipt_timestamp - timestamp)
+        self.record(RECEIPT_TO_CALLBACK, feed, channel, connection, time.time() - receipt_timestamp)
 
-def perf_start(exchange: str, key: str):
-    _perf_data[exchange][key]['start'] = time.time()
+    def stats(self) -> dict:
+        """
+        {metric: {feed: {channel: {connection: {count, min, max, mean, p50, p90, p99, p99.9}}}}}, latencies in seconds
+        """
+        ret = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+        for (metric, feed, channel, connection), histogram in self.histograms.items():
+            ret[metric][feed][channel][connection] = histogram.summary()
+        return {metric: {feed: {channel: dict(conns) for channel, conns in channels.items()} for feed, channels in feeds.items()} for metric, feeds in ret.items()}
 
+    def prometheus(self, prefix='cryptofeed') -> str:
+        """
+        Histograms as Prometheus summaries, in the text exposition format
+        """
+        lines = []
+        metrics = defaultdict(list)
+        for key, histogram in self.histograms.items():
+            metrics[key[0]].append((key, histogram))
 
-def perf_end(exchange: str, key: str):
-    _perf_data[exchange][key]['end'] = time.time()
-    _perf_stats[f"{exchange}-{key}"].append(_perf_data[exchange][key]['end'] - _perf_data[exchange][key]['start'])
+        for metric in sorted(metrics):
+            name = f'{prefix}_{metric}_seconds'
+            lines.append(f'# TYPE {name} summary')
+            for (_, feed, channel, connection), histogram in metrics[metric]:
+                labels = f'feed="{feed}",channel="{channel}",connection="{connection}"'
+                for q in QUANTILES:
+                    lines.append(f'{name}{{{labels},quantile="{q}"}} {histogram.quantile(q)}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram.total / 1_000_000}')
+                lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n' if lines else ''
 
 
-def perf_log(exchange: str, key: str, stats=1000, stats_only=True):
-    if not stats_only:
-        print("{}: {} - {:.2f} ms".format(exchange, key, 1000 * (_perf_data[exchange][key]['end'] - _perf_data[exchange][key]['start'])))
-    if stats and len(_perf_stats[f"{exchange}-{key}"]) > stats:
-        stats_key = f"{exchange}-{key}"
-        print(f"For last {stats} executions:")
-        _min = min(_perf_stats[stats_key]) * 1000
-        _max = max(_perf_stats[stats_key]) * 1000
-        _avg = sum(_perf_stats[stats_key]) / len(_perf_stats[stats_key]) * 1000
-        print(f"   Min: {_min} ms")
-        print(f"   Max: {_max} ms")
-        print(f"   Average: {_avg} ms")
-        _perf_stats[stats_key] = []
+latency = LatencyRecorder()
@@ -0,0 +1,205 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+from collections import deque
+import logging
+import time
+from typing import Awaitable, Callable, Dict
+
+
+LOG = logging.getLogger('feedhandler')
+
+
+# states of a symbol's snapshot request
+QUEUED = 0
+FETCHING = 1
+REPLAYING = 2
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        rate: float
+            tokens (requests, or request weight) added per second
+        capacity: float
+            maximum number of tokens that can accumulate (the burst size). Defaults to one second of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, cost: float = 1):
+        """
+        Wait until cost tokens are available and take them
+        """
+        # a request costing more than the bucket holds would never run
+        cost = min(cost, self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return
+            await asyncio.sleep((cost - self.tokens) / self.rate)
+
+
+class _Snapshot:
+    __slots__ = ('fetch', 'apply', 'buffer', 'state', 'requested')
+
+    def __init__(self, fetch, apply):
+        self.fetch = fetch
+        self.apply = apply
+        self.buffer = deque()
+        self.state = QUEUED
+        self.requested = time.monotonic()
+
+
+class SnapshotScheduler:
+    """
+    Fetches order book snapshots for a feed concurrently (up to concurrency at a time) while keeping
+    to the exchange's request rate. Updates received for a symbol while its snapshot is outstanding are
+    buffered, and are applied in order once the snapshot has been processed. When a request slot opens,
+    the symbol with the most buffered updates is fetched first.
+
+    The time from a symbol's snapshot being requested until its buffered updates are applied (the book
+    is valid again) is logged and kept in time_to_book.
+    """
+    def __init__(self, feed_id: str, rate: float, concurrency: int = 8, cost: float = 1):
+        """
+        rate: float
+            requests per second, or request weight per second for exchanges that limit requests by weight
+        cost: float
+            weight of a snapshot request, 1 when rate is in requests
+        """
+        self.id = feed_id
+        self.bucket = TokenBucket(rate)
+        self.cost = cost
+        self.concurrency = concurrency
+        self.active = 0
+        self.snapshots: Dict[str, _Snapshot] = {}
+        self.time_to_book: Dict[str, float] = {}
+        self._dispatcher = None
+        self._wakeup = None
+        self._idle = None
+        self._tasks = set()
+
+    def pending(self, symbol: str) -> bool:
+        return symbol in self.snapshots
+
+    def request(self, symbol: str, fetch: Callable[[], Awaitable], apply: Callable[..., Awaitable], *update, replayed=False):
+        """
+        Request a snapshot for symbol (if one is not already outstanding) and buffer the update.
+
+        fetch: coroutine function
+            fetches and processes the snapshot
+        apply: coroutine function
+            called with each buffered update once the snapshot has been processed. Should call request again, with
+            replayed=True, if the update cannot be applied because the book needs another snapshot
+        update:
+            arguments for apply
+        """
+        snapshot = self.snapshots.get(symbol)
+        if snapshot is None:
+            snapshot = self.snapshots[symbol] = _Snapshot(fetch, apply)
+            self._start()
+            self._idle.clear()
+            self._wakeup.set()
+        elif replayed and snapshot.state == REPLAYING:
+            # book was reset while applying buffered updates, fetch it again and keep the update at the front
+            snapshot.state = QUEUED
+            snapshot.buffer.appendleft(update)
+            self._wakeup.set()
+            return
+        snapshot.buffer.append(update)
+
+    async def throttle(self, fetch: Callable[[], Awaitable]):
+        """
+        Run a (snapshot) request under the scheduler's rate limit
+        """
+        await self.bucket.acquire(self.cost)
+        return await fetch()
+
+    async def drain(self):
+        """
+        Wait until all outstanding snapshots have been processed and their buffered updates applied
+        """
+        while self.snapshots:
+            await self._idle.wait()
+
+    def stop(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        self.snapshots.clear()
+        self.active = 0
+
+    def _start(self):
+        if self._dispatcher is None:
+            self._wakeup = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def _next(self):
+        queued = [symbol for symbol, snapshot in self.snapshots.items() if snapshot.state == QUEUED]
+        if not queued:
+            return None
+        # max returns the first of equals, so symbols with no buffered updates are fetched in request order
+        return max(queued, key=lambda symbol: len(self.snapshots[symbol].buffer))
+
+    async def _dispatch(self):
+        while True:
+            if self.active >= self.concurrency or self._next() is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            await self.bucket.acquire(self.cost)
+            symbol = self._next()
+            if symbol is None:
+                continue
+            snapshot = self.snapshots[symbol]
+            snapshot.state = FETCHING
+            self.active += 1
+            task = asyncio.get_running_loop().create_task(self._fetch(symbol, snapshot))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _remove(self, symbol: str, snapshot: _Snapshot):
+        if self.snapshots.get(symbol) is snapshot:
+            del self.snapshots[symbol]
+        if not self.snapshots:
+            self._idle.set()
+
+    async def _fetch(self, symbol: str, snapshot: _Snapshot):
+        try:
+            await snapshot.fetch()
+        except Exception:
+            LOG.error("%s: snapshot request for %s failed, dropping %d buffered updates", self.id, symbol, len(snapshot.buffer), exc_info=True)
+            self._remove(symbol, snapshot)
+            return
+        finally:
+            self.active -= 1
+            self._wakeup.set()
+
+        snapshot.state = REPLAYING
+        updates = len(snapshot.buffer)
+        while snapshot.buffer and snapshot.state == REPLAYING:
+            update = snapshot.buffer.popleft()
+            try:
+                await snapshot.apply(*update)
+            except Exception:
+                LOG.error("%s: failed to apply buffered update for %s", self.id, symbol, exc_info=True)
+
+        if snapshot.state == REPLAYING:
+            self.time_to_book[symbol] = time.monotonic() - snapshot.requested
+            LOG.info("%s: %s book valid %.3f seconds after snapshot request (%d buffered updates)", self.id, symbol, self.time_to_book[symbol], updates)
+            self._remove(symbol, snapshot)
@@ -20,3 +20,22 @@ def list_by_max_items(large_list: list, max_items: int) -> List[list]:
     """
     number_of_lists = max(1, len(large_list) // max_items)
     return in_x_smaller_lists(large_list, number_of_lists)
+
+
+def by_weight(items: list, weights: List[float], number_of_lists: int) -> List[list]:
+    """
+    Split items into number_of_lists lists with roughly equal total weight.
+
+    Items are assigned heaviest first to the currently lightest list, and keep their
+    original relative order within each list.
+    """
+    if not items:
+        return []
+    number_of_lists = min(number_of_lists, len(items))
+    totals = [0.0] * number_of_lists
+    assignment = [[] for _ in range(number_of_lists)]
+    for index in sorted(range(len(items)), key=lambda i: weights[i], reverse=True):
+        lightest = totals.index(min(totals))
+        totals[lightest] += weights[index]
+        assignment[lightest].append(index)
+    return [[items[i] for i in sorted(indices)] for indices in assignment]
@@ -89,6 +89,7 @@ setup(
         "gcp_pubsub": ["google_cloud_pubsub>=2.4.1", "gcloud_aio_pubsub"],
         "kafka": ["aiokafka>=0.7.0"],
         "mongo": ["motor"],
+        "parquet": ["pyarrow"],
         "postgres": ["asyncpg"],
         "rabbit": ["aio_pika", "pika"],
         "redis": ["hiredis", "redis>=4.5.1"],
@@ -99,6 +100,7 @@ setup(
             "gcloud_aio_pubsub",
             "aiokafka>=0.7.0",
             "motor",
+            "pyarrow",
             "asyncpg",
             "aio_pika",
             "pika",
@@ -0,0 +1,83 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import random
+
+import pytest
+from order_book import OrderBook as _OrderBook
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import ArrayBook, OrderBook
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_array_book_matches_order_book(strict):
+    random.seed(strict)
+    book = ArrayBook(max_depth=20, max_depth_strict=strict)
+    expected = _OrderBook(max_depth=20, max_depth_strict=strict)
+
+    for _ in range(5000):
+        side = random.choice([BID, ASK])
+        price = random.randint(900, 1100) if side == BID else random.randint(1000, 1200)
+        if random.random() < 0.3:
+            assert (price in book[side]) == (price in expected[side])
+            if price in expected[side]:
+                del expected[side][price]
+                del book[side][price]
+        else:
+            size = float(random.randint(1, 9))
+            book[side][price] = size
+            expected[side][price] = size
+
+        assert book.to_dict() == expected.to_dict()
+        assert len(book.bids) == len(expected.bids)
+        assert book.asks.to_list(5) == expected.asks.to_list(5)
+
+    assert book.bids.to_list() == expected.bids.to_list()
+    assert list(book.asks) == list(expected.asks)
+    assert book.bids.index(0) == expected.bids.index(0)
+    assert book.to_dict(to_type=str) == expected.to_dict(to_type=str)
+
+    book.bids.truncate()
+    expected.bids.truncate()
+    assert book.bids.to_list() == expected.bids.to_list()
+
+
+def test_array_book():
+    book = ArrayBook()
+    book.bids = {100: 1.0, 102: 2.0, 101: 3.0}
+    book.asks = {105: 1.0, 103: 2.0}
+
+    assert book.bids.index(0) == (102, 2.0)
+    assert book.asks.index(0) == (103, 2.0)
+    assert book['BIDS'] is book.bid is book.bids
+    assert book.bids[101] == 3.0
+    assert book.bids.keys() == (102, 101, 100)
+
+    with pytest.raises(KeyError):
+        book.bids[99]
+    with pytest.raises(KeyError):
+        del book.asks[104]
+    with pytest.raises(IndexError):
+        book.asks.index(2)
+    with pytest.raises(TypeError):
+        book.bids[100.5] = 1.0
+
+    # grows past its initial capacity
+    for price in range(1000):
+        book.bids[price] = 1.0
+    assert len(book.bids) == 1000
+    assert book.bids.index(999) == (0, 1.0)
+
+
+def test_order_book_array_book():
+    ob = OrderBook('BINANCE', 'BTC-USDT', bids={100: 1.0}, asks={101: 2.0}, array_book=True)
+    assert isinstance(ob.book, ArrayBook)
+    assert ob.to_dict()['book'] == {BID: {100: 1.0}, ASK: {101: 2.0}}
+    assert ob.to_json_bytes(numeric_type=str) == b'{"exchange":"BINANCE","symbol":"BTC-USDT","book":{"bid":{"100":"1.0"},"ask":{"101":"2.0"}},"timestamp":null}'
+
+    with pytest.raises(ValueError):
+        OrderBook('BINANCE', 'BTC-USDT', checksum_format='KRAKEN', array_book=True)
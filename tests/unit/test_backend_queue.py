@@ -0,0 +1,487 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+from decimal import Decimal
+import multiprocessing
+import time
+
+import pytest
+from yapic import json
+
+from cryptofeed.backends.backend import BLOCK, CONFLATE, DROP_NEWEST, DROP_OLDEST, BackendCallback, BackendQueue, dumpb, dumps
+from cryptofeed.backends.spill import SpillLog
+from cryptofeed.types import Trade
+from cryptofeed.util.perf import BACKEND_QUEUE_DWELL, latency
+
+
+class StalledBackend(BackendQueue):
+    """
+    Writer does not read from the queue until released, like a sink that is down
+    """
+    def __init__(self):
+        self.running = True
+        self.release = asyncio.Event()
+        self.written = []
+
+    async def writer(self):
+        await self.release.wait()
+        while self.running:
+            async with self.read_queue() as updates:
+                self.written.extend(updates)
+
+
+class ProcessBackend(BackendQueue):
+    """
+    Reports the size and contents of every batch the writer process receives
+    """
+    def __init__(self):
+        self.running = True
+        self.batches = multiprocessing.Queue()
+
+    async def writer(self):
+        while self.running:
+            async with self.read_queue() as updates:
+                if updates:
+                    self.batches.put([u['value'] for u in updates])
+        self.batches.put(None)
+
+
+class BatchingProcessBackend(BackendQueue):
+    """
+    Reports each batch from read_batches along with the time it was yielded
+    """
+    def __init__(self):
+        self.running = True
+        self.batches = multiprocessing.Queue()
+
+    async def writer(self):
+        async for updates in self.read_batches(100, 0.05):
+            self.batches.put(([u['value'] for u in updates], time.time()))
+        self.batches.put(None)
+
+
+def update(symbol, value):
+    return {'exchange': 'TEST', 'symbol': symbol, 'value': value}
+
+
+@pytest.mark.parametrize("overflow,expected", [
+    (DROP_OLDEST, [2, 3, 4]),
+    (DROP_NEWEST, [0, 1, 2]),
+])
+def test_queue_drop_policies(overflow, expected):
+    async def run():
+        backend = StalledBackend()
+        backend.start(asyncio.get_running_loop(), max_size=3, overflow=overflow)
+        for i in range(5):
+            await backend.write(update('BTC-USD', i))
+        assert backend.queue_depth == 3
+        assert backend.queue_stats()['dropped'] == 2
+
+        backend.release.set()
+        await backend.stop()
+        await backend.worker
+        return [u['value'] for u in backend.written]
+
+    assert asyncio.run(run()) == expected
+
+
+def test_queue_conflate():
+    async def run():
+        backend = StalledBackend()
+        backend.start(asyncio.get_running_loop(), max_size=2, overflow=CONFLATE)
+        for i in range(3):
+            await backend.write(update('BTC-USD', i))
+            await backend.write(update('ETH-USD', i * 10))
+        assert backend.queue_depth == 2
+        assert backend.queue_stats()['conflated'] == 4
+
+        backend.release.set()
+        await backend.stop()
+        await backend.worker
+        return [(u['symbol'], u['value']) for u in backend.written]
+
+    assert asyncio.run(run()) == [('BTC-USD', 2), ('ETH-USD', 20)]
+
+
+def test_queue_conflate_blocked_writers():
+    async def run():
+        backend = StalledBackend()
+        backend.start(asyncio.get_running_loop(), max_size=2, overflow=CONFLATE)
+        await backend.write(update('BTC-USD', 0))
+        await backend.write(update('ETH-USD', 0))
+        # both wait for room for the same new symbol
+        blocked = [asyncio.ensure_future(backend.write(update('SOL-USD', i))) for i in (1, 2)]
+        await asyncio.sleep(0.01)
+        assert not any(b.done() for b in blocked)
+
+        backend.release.set()
+        await asyncio.gather(*blocked)
+        await backend.stop()
+        await backend.worker
+        assert backend.queue_stats()['conflated'] == 1
+        return [(u['symbol'], u['value']) for u in backend.written]
+
+    assert asyncio.run(run()) == [('BTC-USD', 0), ('ETH-USD', 0), ('SOL-USD', 2)]
+
+
+def test_queue_block():
+    async def run():
+        backend = StalledBackend()
+        backend.start(asyncio.get_running_loop(), max_size=1, overflow=BLOCK)
+        await backend.write(update('BTC-USD', 0))
+        blocked = asyncio.ensure_future(backend.write(update('BTC-USD', 1)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        backend.release.set()
+        await blocked
+        await backend.stop()
+        await backend.worker
+        return [u['value'] for u in backend.written]
+
+    assert asyncio.run(run()) == [0, 1]
+
+
+def test_queue_invalid_policy():
+    async def run():
+        StalledBackend().start(asyncio.get_running_loop(), overflow='invalid')
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_queue_multiprocess_batching():
+    async def run():
+        backend = ProcessBackend()
+        backend.queue_batch_size = 100
+        backend.start(asyncio.get_running_loop(), multiprocess=True)
+        for i in range(250):
+            await backend.write(update('BTC-USD', i))
+        await asyncio.sleep(0)
+        for i in range(250, 260):
+            await backend.write(update('BTC-USD', i))
+        await backend.stop()
+
+        batches = []
+        while (batch := backend.batches.get(timeout=10)) is not None:
+            batches.append(batch)
+        return batches
+
+    batches = asyncio.run(run())
+    assert [v for batch in batches for v in batch] == list(range(260))
+    assert all(len(batch) <= 110 for batch in batches)
+    assert len(batches) < 10
+
+
+def test_queue_multiprocess_read_batches():
+    async def run():
+        backend = BatchingProcessBackend()
+        backend.start(asyncio.get_running_loop(), multiprocess=True)
+        await backend.write(update('BTC-USD', 0))
+        # let the write be sent to the writer process
+        await asyncio.sleep(0)
+        written = time.time()
+        # the partial batch is yielded once the interval expires, without waiting for another update
+        batch, yielded = backend.batches.get(timeout=10)
+        await backend.stop()
+        assert backend.batches.get(timeout=10) is None
+        return batch, yielded - written
+
+    batch, delay = asyncio.run(run())
+    assert batch == [0]
+    assert delay < 1
+
+
+def test_queue_stop_drains():
+    async def run():
+        backend = StalledBackend()
+        backend.release.set()
+        backend.start(asyncio.get_running_loop())
+        # the writer has not run yet when stop is called
+        for i in range(5):
+            await backend.write(update('BTC-USD', i))
+        await backend.stop()
+        await backend.worker
+        return [u['value'] for u in backend.written]
+
+    assert asyncio.run(run()) == list(range(5))
+
+
+def test_queue_dwell_time():
+    async def run():
+        backend = StalledBackend()
+        backend.default_key = 'trades'
+        backend.start(asyncio.get_running_loop(), max_size=2, overflow=DROP_OLDEST)
+        for i in range(4):
+            await backend.write(update('BTC-USD', i))
+        await asyncio.sleep(0.05)
+        backend.release.set()
+        await backend.stop()
+        await backend.worker
+
+    latency.reset()
+    latency.enable()
+    try:
+        asyncio.run(run())
+        stats = latency.stats()[BACKEND_QUEUE_DWELL]['TEST']['trades']['StalledBackend']
+    finally:
+        latency.disable()
+        latency.reset()
+    assert stats['count'] == 2
+    assert stats['min'] >= 0.05
+
+
+def test_queue_read_batch():
+    class TimedBackend(BackendQueue):
+        def __init__(self):
+            self.running = True
+            self.reads = []
+
+        async def writer(self):
+            while self.running:
+                self.reads.append([u['value'] for u in await self.read_batch(0.05)])
+
+    async def run():
+        backend = TimedBackend()
+        backend.start(asyncio.get_running_loop())
+        await asyncio.sleep(0.12)
+        await backend.write(update('BTC-USD', 0))
+        await backend.write(update('BTC-USD', 1))
+        await backend.stop()
+        await backend.worker
+        return backend.reads
+
+    reads = asyncio.run(run())
+    # the writer wakes up without updates while the queue is empty
+    assert reads[:2] == [[], []]
+    assert [v for read in reads for v in read] == [0, 1]
+
+
+def test_queue_read_batches():
+    class BatchingBackend(BackendQueue):
+        def __init__(self):
+            self.running = True
+            self.batches = []
+
+        async def writer(self):
+            async for updates in self.read_batches(3, 0.05):
+                self.batches.append([u['value'] for u in updates])
+
+    async def run():
+        backend = BatchingBackend()
+        backend.start(asyncio.get_running_loop())
+        # a full batch is written immediately, the remainder once the interval expires
+        for i in range(4):
+            await backend.write(update('BTC-USD', i))
+        await asyncio.sleep(0.01)
+        full = list(backend.batches)
+        await asyncio.sleep(0.1)
+        partial = list(backend.batches)
+        await backend.write(update('BTC-USD', 4))
+        await backend.stop()
+        await backend.worker
+        return full, partial, backend.batches
+
+    full, partial, batches = asyncio.run(run())
+    assert full == [[0, 1, 2]]
+    assert partial == [[0, 1, 2], [3]]
+    assert batches == [[0, 1, 2], [3], [4]]
+
+
+def test_serialization_shared():
+    class Collector(BackendCallback):
+        def __init__(self, numeric_type=float, none_to=None):
+            self.numeric_type = numeric_type
+            self.none_to = none_to
+            self.written = []
+
+        async def write(self, data):
+            self.written.append(data)
+
+    async def run():
+        backends = [Collector(), Collector(), Collector(numeric_type=str)]
+        trades = [Trade('BINANCE', 'BTC-USDT', 'buy', Decimal('0.5'), Decimal(40000 + i), 1699999999.0, id=str(i)) for i in range(2)]
+        for trade in trades:
+            for backend in backends:
+                await backend(trade, 1700000000.0)
+        return backends
+
+    first, second, other = asyncio.run(run())
+    # the same dict for backends with the same settings, per data object
+    assert all(a is b for a, b in zip(first.written, second.written))
+    assert first.written[0] is not first.written[1]
+    assert all(a is not b for a, b in zip(first.written, other.written))
+    assert first.written[1]['price'] == 40001.0 and other.written[1]['price'] == '40001'
+    assert first.written[0]['timestamp'] == 1699999999.0 and first.written[0]['receipt_timestamp'] == 1700000000.0
+
+    # the JSON encoding of a shared dict is only computed once
+    data = first.written[1]
+    assert dumps(data) is dumps(data)
+    assert dumpb(data) is dumpb(data)
+    assert dumps(data) == json.dumps(data)
+    assert dumpb(other.written[1]) == json.dumpb(other.written[1])
+
+
+def test_queue_spill(tmp_path):
+    async def run():
+        backend = StalledBackend()
+        backend.start(asyncio.get_running_loop(), spill={'path': str(tmp_path), 'depth': 3})
+        for i in range(10):
+            await backend.write(update('BTC-USD', i))
+        await asyncio.sleep(0)
+        assert backend.queue_depth == 3
+        assert backend.queue_stats()['spilled'] == 7
+        assert backend.queue_stats()['spill_bytes'] > 0
+
+        backend.release.set()
+        await asyncio.sleep(0.01)
+        # spilled updates are written in order, and new updates queue again once the log is empty
+        for i in range(10, 12):
+            await backend.write(update('BTC-USD', i))
+        await backend.stop()
+        await backend.worker
+        assert backend.queue_stats()['spilled'] == 0
+        assert list((tmp_path / 'StalledBackend').iterdir()) == []
+        return [u['value'] for u in backend.written]
+
+    assert asyncio.run(run()) == list(range(12))
+
+
+def test_queue_spill_recovery(tmp_path):
+    async def run():
+        backend = StalledBackend()
+        backend.start(asyncio.get_running_loop(), spill={'path': str(tmp_path), 'depth': 2})
+        for i in range(6):
+            await backend.write(update('BTC-USD', i))
+        await asyncio.sleep(0)
+        # the process exits while the sink is down, losing only the updates queued in memory
+        backend.worker.cancel()
+        backend.spill.close()
+
+        backend = StalledBackend()
+        backend.start(asyncio.get_running_loop(), spill={'path': str(tmp_path), 'depth': 2})
+        assert backend.queue_stats()['spilled'] == 4
+        await backend.write(update('BTC-USD', 6))
+        backend.release.set()
+        await backend.stop()
+        await backend.worker
+        return [u['value'] for u in backend.written]
+
+    assert asyncio.run(run()) == [2, 3, 4, 5, 6]
+
+
+def test_spill_log(tmp_path):
+    async def run():
+        log = SpillLog(str(tmp_path), segment_bytes=1)
+        for i in range(3):
+            log.append(i)
+            log.flush()
+        assert len(log) == 3
+        assert len(list(tmp_path.iterdir())) == 3
+        assert log.read(2) == [0, 1]
+        # the first segment has been read and is deleted
+        assert len(list(tmp_path.iterdir())) == 2
+        log.close()
+
+        # a frame cut short when the process exits is discarded
+        with open(sorted(tmp_path.iterdir())[-1], 'ab') as fp:
+            fp.write(b'\x10\x00')
+        log = SpillLog(str(tmp_path))
+        assert len(log) == 2
+        log.append(3)
+        assert log.read(10) == [1, 2, 3]
+        assert len(log) == 0
+
+        log = SpillLog(str(tmp_path), max_bytes=100)
+        log.append(list(range(100)))
+        log.flush()
+        assert log.dropped == 1
+        assert len(log) == 0
+        log.close()
+
+    asyncio.run(run())
+
+
+def test_influx_write_retries():
+    import aiohttp
+    from yarl import URL
+
+    from cryptofeed.backends.influxdb import TradeInflux
+
+    async def run(errors):
+        backend = TradeInflux('http://127.0.0.1:8086', 'org', 'bucket', 'token', retries=2, retry_wait=0.001)
+        backend.start(asyncio.get_running_loop())
+        # write_batch is called directly
+        backend.worker.cancel()
+        attempts = []
+
+        async def http_write(body, headers=None):
+            attempts.append(body)
+            if len(attempts) <= len(errors):
+                raise errors[len(attempts) - 1]
+
+        backend.http_write = http_write
+        await backend.write_batch([b'a', b'b'])
+        return len(attempts), backend.queue_stats()['dropped']
+
+    request = aiohttp.RequestInfo(URL('http://127.0.0.1:8086'), 'POST', {}, URL('http://127.0.0.1:8086'))
+    unavailable = aiohttp.ClientResponseError(request, (), status=503)
+    rejected = aiohttp.ClientResponseError(request, (), status=400)
+    assert asyncio.run(run([aiohttp.ClientConnectionError(), unavailable])) == (3, 0)
+    assert asyncio.run(run([asyncio.TimeoutError()] * 3)) == (3, 2)
+    assert asyncio.run(run([rejected])) == (1, 2)
+
+
+def test_postgres_copy_errors():
+    import asyncpg
+
+    from cryptofeed.backends.postgres import TradePostgres
+
+    class Connection:
+        def __init__(self, errors, calls):
+            self.errors = errors
+            self.calls = calls
+
+        async def copy_records_to_table(self, table, records=None, columns=None):
+            self.calls.append('copy')
+            if self.errors:
+                raise self.errors.pop(0)
+
+        async def executemany(self, statement, rows):
+            self.calls.append(statement)
+
+    class Pool:
+        def __init__(self, errors):
+            self.errors = list(errors)
+            self.calls = []
+
+        def acquire(self):
+            pool = self
+
+            class Acquire:
+                async def __aenter__(self):
+                    return Connection(pool.errors, pool.calls)
+
+                async def __aexit__(self, *args):
+                    return False
+            return Acquire()
+
+    async def run(errors):
+        backend = TradePostgres(copy=True, retries=1, retry_wait=0.001)
+        backend.start(asyncio.get_running_loop())
+        # copy_batch is called directly
+        backend.worker.cancel()
+        backend.pool = Pool(errors)
+        backend.copy_columns = ['timestamp', 'price']
+        await backend.copy_batch([(1, 2.0), (2, 3.0)])
+        return backend.pool.calls, backend.queue_stats()['dropped']
+
+    assert asyncio.run(run([OSError()])) == (['copy', 'copy'], 0)
+    assert asyncio.run(run([OSError(), OSError()])) == (['copy', 'copy'], 2)
+    assert asyncio.run(run([asyncpg.DataError('bad row')])) == (['copy'], 2)
+    calls, dropped = asyncio.run(run([asyncpg.UniqueViolationError('duplicate')]))
+    assert calls == ['copy', 'INSERT INTO trades (timestamp,price) VALUES ($1,$2) ON CONFLICT DO NOTHING'] and dropped == 0
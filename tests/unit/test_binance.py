@@ -4,11 +4,16 @@ Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+import asyncio
+from decimal import Decimal
 import random
 
 import pytest
+from yapic import json
 
+from cryptofeed.defines import ASK, BID, BINANCE, L2_BOOK
 from cryptofeed.exchanges import Binance
+from cryptofeed.symbols import Symbols
 
 
 @pytest.mark.xfail(reason="Binance blocks build machine IP ranges. If outside the USA this should pass")
@@ -43,3 +48,54 @@ def test_binance_address_generation():
         assert len(chans) == len(channels) * length == len(syms)
         assert len(set(chans)) == len(channels)
         assert (len(set(syms))) == length
+
+
+def test_binance_gap_resyncs_only_affected_symbol():
+    Symbols.clear()
+    Symbols.set(BINANCE, {'BTC-USDT': 'BTCUSDT', 'ETH-USDT': 'ETHUSDT'}, {'instrument_type': {'BTC-USDT': 'spot', 'ETH-USDT': 'spot'}, 'tick_size': {'BTC-USDT': '0.01', 'ETH-USDT': '0.01'}})
+    snapshots = {
+        'BTCUSDT': [{'lastUpdateId': 100, 'bids': [['10', '1']], 'asks': [['11', '1']]}, {'lastUpdateId': 110, 'bids': [['10', '2']], 'asks': [['11', '2']]}],
+        'ETHUSDT': [{'lastUpdateId': 200, 'bids': [['1', '1']], 'asks': [['2', '1']]}],
+    }
+    requests = []
+    updates = []
+
+    async def read(address, **kwargs):
+        symbol = address.split('symbol=')[1].split('&')[0]
+        requests.append(symbol)
+        return json.dumps(snapshots[symbol].pop(0))
+
+    async def book(book, receipt_timestamp):
+        updates.append((book.symbol, book.delta, book.sequence_number))
+
+    def depth(symbol, first, last, price):
+        return json.dumps({'stream': f'{symbol.lower()}@depth@100ms', 'data': {'e': 'depthUpdate', 'E': 1, 's': symbol, 'U': first, 'u': last, 'b': [[price, '5']], 'a': []}})
+
+    async def run():
+        feed = Binance(symbols=['BTC-USDT', 'ETH-USDT'], channels=[L2_BOOK], callbacks={L2_BOOK: book})
+        feed._reset()
+        feed.http_conn.read = read
+
+        await feed.message_handler(depth('BTCUSDT', 99, 101, '9'), None, 1.0)
+        await feed.message_handler(depth('ETHUSDT', 200, 201, '0.5'), None, 1.0)
+        await feed.snapshot_scheduler.drain()
+        assert len(updates) == 4
+
+        # gap on BTC-USDT, ETH-USDT keeps updating while BTC-USDT resynchronizes
+        await feed.message_handler(depth('BTCUSDT', 110, 111, '8'), None, 1.0)
+        await feed.message_handler(depth('ETHUSDT', 202, 202, '0.4'), None, 1.0)
+        assert updates[-1][0] == 'ETH-USDT'
+        await feed.message_handler(depth('BTCUSDT', 112, 112, '7'), None, 1.0)
+        await feed.snapshot_scheduler.drain()
+
+        assert requests == ['BTCUSDT', 'ETHUSDT', 'BTCUSDT']
+        assert feed.last_update_id == {'BTC-USDT': 112, 'ETH-USDT': 202}
+        assert updates[5:] == [
+            ('BTC-USDT', None, 110),
+            ('BTC-USDT', {BID: [(Decimal('8'), Decimal('5'))], ASK: []}, 111),
+            ('BTC-USDT', {BID: [(Decimal('7'), Decimal('5'))], ASK: []}, 112)
+        ]
+        feed.snapshot_scheduler.stop()
+
+    asyncio.run(run())
+    Symbols.clear()
@@ -0,0 +1,111 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+from decimal import Decimal
+import random
+
+import pytest
+
+from cryptofeed.defines import ASK, BID, KRAKEN, L2_BOOK
+from cryptofeed.exchanges import Kraken
+from cryptofeed.symbols import Symbols
+from cryptofeed.types import OrderBook
+from cryptofeed.util.checksum import BookChecksum
+
+
+@pytest.mark.parametrize("checksum_format,depth", [('KRAKEN', 10), ('OKX', 25)])
+def test_book_checksum(checksum_format, depth):
+    random.seed(depth)
+    checksum = BookChecksum(depth)
+    book = OrderBook('TEST', 'BTC-USD', bids={Decimal(p): Decimal(1) for p in range(900, 1000)}, asks={Decimal(p): Decimal(1) for p in range(1001, 1100)}, checksum_format=checksum_format)
+    assert checksum.valid(book, book.book.checksum())
+
+    for _ in range(3000):
+        delta = {BID: [], ASK: []}
+        side = random.choice([BID, ASK])
+        price = Decimal(random.randint(850, 1000) if side == BID else random.randint(1001, 1150))
+        size = Decimal(random.choice([0, 1, 2]))
+        if size == 0:
+            if price in book.book[side]:
+                del book.book[side][price]
+                delta[side].append((price, size))
+        else:
+            book.book[side][price] = size
+            delta[side].append((price, size))
+
+        expected = book.book.checksum()
+        assert checksum.valid(book, expected, delta)
+        assert not checksum.valid(book, expected + 1, delta)
+
+    # most of the updates are below the checksummed levels
+    assert checksum.reused > checksum.computed
+
+
+def test_book_checksum_interval():
+    checksum = BookChecksum(10, interval=5)
+    book = OrderBook('TEST', 'BTC-USD', bids={Decimal(1): Decimal(1)}, asks={Decimal(2): Decimal(1)}, checksum_format='KRAKEN')
+    # snapshots are always validated
+    assert not checksum.valid(book, 0)
+
+    delta = {BID: [(Decimal(1), Decimal(2))], ASK: []}
+    book.book.bids[Decimal(1)] = Decimal(2)
+    results = [checksum.valid(book, 0, delta) for _ in range(10)]
+    assert results == [True, True, True, True, False] * 2
+
+
+def test_book_checksum_invalidate():
+    checksum = BookChecksum(10)
+    book = OrderBook('TEST', 'BTC-USD', bids={Decimal(p): Decimal(1) for p in range(900, 1000)}, asks={Decimal(p): Decimal(1) for p in range(1001, 1100)}, checksum_format='KRAKEN')
+    assert checksum.valid(book, book.book.checksum())
+
+    # an update without a checksum changes the top of the book
+    book.book.bids[Decimal(999)] = Decimal(5)
+    checksum.invalidate(book, {BID: [(Decimal(999), Decimal(5))], ASK: []})
+
+    # so the next (deep) update can't reuse the checksum from before it
+    book.book.bids[Decimal(900)] = Decimal(5)
+    assert checksum.valid(book, book.book.checksum(), {BID: [(Decimal(900), Decimal(5))], ASK: []})
+
+
+def test_kraken_split_update_checksum():
+    Symbols.clear()
+    Symbols.set(KRAKEN, {'BTC-USD': 'XBT/USD'}, {'instrument_type': {'BTC-USD': 'spot'}})
+    updates = []
+
+    async def book(update, receipt_timestamp):
+        updates.append(update.delta)
+
+    feed = Kraken(symbols=['BTC-USD'], channels=[L2_BOOK], callbacks={L2_BOOK: book}, checksum_validation=True)
+    mirror = OrderBook('TEST', 'BTC-USD', checksum_format='KRAKEN')
+    mirror.book.bids = {Decimal(p): Decimal(1) for p in range(900, 920)}
+    mirror.book.asks = {Decimal(p): Decimal(1) for p in range(1001, 1021)}
+
+    def levels(side):
+        return [[str(price), str(size), '1618678145.920708'] for price, size in mirror.book[side].to_dict().items()]
+
+    def message(*updates):
+        return [1920, *updates, 'book-1000', 'XBT/USD']
+
+    async def run():
+        await feed._book(message({'as': levels(ASK), 'bs': levels(BID)}), 'BTC-USD', 1.0)
+        mirror.book.asks[Decimal(1020)] = Decimal(2)
+        await feed._book(message({'a': [['1020', '2', '1.0']], 'c': str(mirror.book.checksum())}), 'BTC-USD', 1.5)
+
+        # ask and bid updates in separate dicts, the checksum in the second one
+        mirror.book.asks[Decimal(1001)] = Decimal(2)
+        mirror.book.bids[Decimal(919)] = Decimal(2)
+        await feed._book(message({'a': [['1001', '2', '1.0']]}, {'b': [['919', '2', '1.0']], 'c': str(mirror.book.checksum())}), 'BTC-USD', 2.0)
+
+        # a top of book change without a checksum, then a deep update
+        mirror.book.bids[Decimal(918)] = Decimal(3)
+        await feed._book(message({'b': [['918', '3', '1.0']]}), 'BTC-USD', 3.0)
+        mirror.book.bids[Decimal(900)] = Decimal(3)
+        await feed._book(message({'b': [['900', '3', '1.0']], 'c': str(mirror.book.checksum())}), 'BTC-USD', 4.0)
+
+    asyncio.run(run())
+    assert len(updates) == 5
+    Symbols.clear()
@@ -0,0 +1,162 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+import random
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import OrderBook
+from cryptofeed.util.conflation import BookConflator
+
+
+def update(book, delta):
+    for side in (BID, ASK):
+        for price, size in delta[side]:
+            if size == 0:
+                if price in book.book[side]:
+                    del book.book[side][price]
+            else:
+                book.book[side][price] = size
+    book.delta = delta
+
+
+def test_conflation():
+    async def run():
+        emitted = []
+
+        async def emit(book, receipt_timestamp):
+            emitted.append((book.delta, receipt_timestamp))
+
+        conflator = BookConflator('TEST', emit, 0.05)
+        book = OrderBook('TEST', 'BTC-USD', bids={100: 1, 99: 1}, asks={101: 1, 102: 1})
+        await conflator.update(book, 1.0)
+        assert emitted == [(None, 1.0)]
+
+        # the first update after the interval goes straight through, the next ones are merged
+        await asyncio.sleep(0.06)
+        update(book, {BID: [(100, 2)], ASK: []})
+        await conflator.update(book, 2.0)
+        update(book, {BID: [(100, 3), (98, 1)], ASK: []})
+        await conflator.update(book, 3.0)
+        update(book, {BID: [(98, 0)], ASK: [(101, 0)]})
+        await conflator.update(book, 4.0)
+        assert len(emitted) == 2
+
+        await asyncio.sleep(0.06)
+        assert emitted[2] == ({BID: [(100, 3), (98, 0)], ASK: [(101, 0)]}, 4.0)
+        # the book passed to the feed keeps its own delta
+        assert book.delta == {BID: [(98, 0)], ASK: [(101, 0)]}
+
+        # pending updates are sent by flush
+        update(book, {BID: [(97, 1)], ASK: []})
+        await conflator.update(book, 5.0)
+        update(book, {BID: [(96, 1)], ASK: []})
+        await conflator.update(book, 6.0)
+        await conflator.flush()
+        conflator.stop()
+        assert emitted[-1] == ({BID: [(97, 1), (96, 1)], ASK: []}, 6.0)
+
+    asyncio.run(run())
+
+
+def test_conflation_depth():
+    async def run():
+        emitted = []
+
+        async def emit(book, receipt_timestamp):
+            emitted.append(book.delta)
+
+        conflator = BookConflator('TEST', emit, 60, depth=1)
+        book = OrderBook('TEST', 'BTC-USD', bids={100: 1, 99: 1}, asks={101: 1, 102: 1})
+        await conflator.update(book, 1.0)
+
+        update(book, {BID: [(99, 2)], ASK: []})
+        await conflator.update(book, 2.0)
+        assert len(emitted) == 1
+
+        # the best ask changed
+        update(book, {BID: [], ASK: [(101, 5)]})
+        await conflator.update(book, 3.0)
+        assert emitted[-1] == {BID: [(99, 2)], ASK: [(101, 5)]}
+        conflator.stop()
+
+    asyncio.run(run())
+
+
+def test_conflation_book_state():
+    async def run():
+        random.seed(0)
+        mirror = {}
+
+        async def emit(book, receipt_timestamp):
+            # applying the conflated deltas to the previous state reproduces the book
+            if book.delta is None:
+                mirror.update({side: dict(book.book[side].to_dict()) for side in (BID, ASK)})
+            else:
+                for side in (BID, ASK):
+                    for price, size in book.delta[side]:
+                        if size == 0:
+                            mirror[side].pop(price, None)
+                        else:
+                            mirror[side][price] = size
+            assert mirror == book.book.to_dict()
+
+        conflator = BookConflator('TEST', emit, 0.01, depth=3)
+        book = OrderBook('TEST', 'BTC-USD', bids={p: 1 for p in range(90, 100)}, asks={p: 1 for p in range(101, 111)})
+        await conflator.update(book, 0.0)
+        for i in range(2000):
+            side = random.choice([BID, ASK])
+            price = random.randint(80, 100) if side == BID else random.randint(101, 120)
+            size = random.choice([0, 1, 2, 3])
+            update(book, {BID: [(price, size)] if side == BID else [], ASK: [(price, size)] if side == ASK else []})
+            await conflator.update(book, float(i))
+            if i % 100 == 0:
+                await asyncio.sleep(0.015)
+        await conflator.flush()
+        conflator.stop()
+        assert mirror == book.book.to_dict()
+
+    asyncio.run(run())
+
+
+def test_track_top():
+    random.seed(1)
+    book = OrderBook('TEST', 'BTC-USD', bids={p: 1 for p in range(90, 100)}, asks={p: 1 for p in range(101, 111)})
+    book.track_top(3)
+    assert book.top == ([(99, 1), (98, 1), (97, 1)], [(101, 1), (102, 1), (103, 1)])
+
+    for _ in range(2000):
+        side = random.choice([BID, ASK])
+        price = random.randint(80, 100) if side == BID else random.randint(101, 120)
+        previous = book.top
+        update(book, {BID: [(price, random.choice([0, 1, 2]))] if side == BID else [], ASK: [(price, random.choice([0, 1, 2]))] if side == ASK else []})
+        expected = (book.book.bids.to_list(3), book.book.asks.to_list(3))
+        assert book.top == expected
+        assert book.top_changed == (expected != previous)
+
+
+def test_conflation_top_only():
+    async def run():
+        emitted = []
+
+        async def emit(book, receipt_timestamp):
+            emitted.append(book.delta)
+
+        conflator = BookConflator('TEST', emit, depth=1)
+        book = OrderBook('TEST', 'BTC-USD', bids={100: 1, 99: 1}, asks={101: 1, 102: 1})
+        await conflator.update(book, 1.0)
+        update(book, {BID: [(99, 2)], ASK: [(103, 1)]})
+        await conflator.update(book, 2.0)
+        await asyncio.sleep(0.01)
+        assert len(emitted) == 1
+
+        update(book, {BID: [(100, 0)], ASK: []})
+        await conflator.update(book, 3.0)
+        assert emitted[-1] == {BID: [(99, 2), (100, 0)], ASK: [(103, 1)]}
+        assert book.top == ([(99, 2)], [(101, 1)])
+        conflator.stop()
+
+    asyncio.run(run())
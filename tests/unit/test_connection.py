@@ -0,0 +1,58 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from cryptofeed.connection import HTTPAsyncConn, http_pool
+
+
+def test_http_pool_shared():
+    async def run():
+        peers = set()
+
+        async def handler(request):
+            peers.add(request.transport.get_extra_info('peername'))
+            return web.Response(text='ok')
+
+        app = web.Application()
+        app.router.add_get('/', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        address = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/'
+
+        a = HTTPAsyncConn('A')
+        b = HTTPAsyncConn('B')
+        for _ in range(3):
+            assert await a.read(address) == 'ok'
+            assert await b.read(address) == 'ok'
+        assert a.conn is b.conn
+        # requests from both connections reuse one kept alive connection
+        assert len(peers) == 1
+
+        session = a.conn
+        await a.close()
+        assert not session.closed
+        assert await b.read(address) == 'ok'
+
+        await http_pool.close()
+        assert session.closed
+        assert not b.is_open
+        await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_http_sync_session():
+    # one session (and connection pool) per thread
+    session = http_pool.sync_session()
+    assert http_pool.sync_session() is session
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(http_pool.sync_session).result() is not session
@@ -4,15 +4,17 @@ Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
+from decimal import Decimal
 import os
 import glob
 
 import pytest
 
-from cryptofeed.defines import ASCENDEX, ASCENDEX_FUTURES, BEQUANT, BITDOTCOM, BITGET, BITHUMB, CANDLES, BINANCE, BINANCE_DELIVERY, CRYPTODOTCOM, DELTA, FMFW, BITFINEX, DYDX, EXX, BINANCE_FUTURES, BINANCE_US, BITFLYER, BITMEX, BITSTAMP, BLOCKCHAIN, COINBASE, DERIBIT, GATEIO, GEMINI, HITBTC, HUOBI, HUOBI_DM, HUOBI_SWAP, INDEPENDENT_RESERVE, KRAKEN, KRAKEN_FUTURES, KUCOIN, L3_BOOK, OKCOIN, OKX, PHEMEX, POLONIEX, PROBIT, TICKER, TRADES, L2_BOOK, BYBIT, UPBIT, BINANCE_TR, GATEIO_FUTURES
+from cryptofeed.defines import ASK, BID, FLOAT, SCALED_INT, ASCENDEX, ASCENDEX_FUTURES, BEQUANT, BITDOTCOM, BITGET, BITHUMB, CANDLES, BINANCE, BINANCE_DELIVERY, CRYPTODOTCOM, DELTA, FMFW, BITFINEX, DYDX, EXX, BINANCE_FUTURES, BINANCE_US, BITFLYER, BITMEX, BITSTAMP, BLOCKCHAIN, COINBASE, DERIBIT, GATEIO, GEMINI, HITBTC, HUOBI, HUOBI_DM, HUOBI_SWAP, INDEPENDENT_RESERVE, KRAKEN, KRAKEN_FUTURES, KUCOIN, L3_BOOK, OKCOIN, OKX, PHEMEX, POLONIEX, PROBIT, TICKER, TRADES, L2_BOOK, BYBIT, UPBIT, BINANCE_TR, GATEIO_FUTURES
 from cryptofeed.exchanges import EXCHANGE_MAP
 from cryptofeed.raw_data_collection import playback
 from cryptofeed.symbols import Symbols
+from cryptofeed.types import ArrayBook
 
 
 # Some exchanges discard messages so we cant use a normal in == out comparison for testing purposes
@@ -99,3 +101,36 @@ def test_exchange_playback(exchange):
     else:
         assert lookup_table[exchange] == results['callbacks']
     Symbols.clear()
+
+
+@pytest.mark.parametrize("exchange", [BINANCE, BINANCE_FUTURES, BINANCE_DELIVERY])
+@pytest.mark.parametrize("numeric_mode", [FLOAT, SCALED_INT])
+def test_exchange_playback_numeric_mode(exchange, numeric_mode):
+    Symbols.clear()
+    dir = os.path.dirname(os.path.realpath(__file__))
+    pcap = glob.glob(f"{dir}/../../sample_data/{exchange}.*")
+    expected_type = float if numeric_mode == FLOAT else int
+    books = []
+    trades = []
+
+    async def book(update, receipt_timestamp):
+        books.append(update)
+
+    async def trade(update, receipt_timestamp):
+        trades.append(update)
+
+    results = playback(exchange, pcap, callbacks={L2_BOOK: book, TRADES: trade}, config="tests/config_test.yaml", numeric_mode=numeric_mode)
+    assert results['callbacks'][L2_BOOK] == lookup_table[exchange][L2_BOOK]
+    assert trades
+    # only book prices are scaled to ticks, the other data types carry no tick size
+    assert all(isinstance(t.price, float) for t in trades)
+
+    for update in books:
+        for side in (BID, ASK):
+            for price, size in update.book[side].to_dict().items():
+                assert isinstance(price, expected_type)
+                assert isinstance(size, float)
+        if numeric_mode == SCALED_INT:
+            assert isinstance(update.tick_size, Decimal)
+            assert isinstance(update.book, ArrayBook)
+    Symbols.clear()
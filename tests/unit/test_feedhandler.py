@@ -0,0 +1,86 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import signal
+
+import pytest
+
+from cryptofeed import FeedHandler
+import cryptofeed.feedhandler
+from cryptofeed.defines import BINANCE, KRAKEN, L2_BOOK, TICKER, TRADES
+from cryptofeed.exchanges import Binance, Kraken
+from cryptofeed.symbols import Symbols
+
+
+@pytest.fixture
+def feedhandler():
+    symbols = [f'C{i}-USD' for i in range(30)]
+    Symbols.set(KRAKEN, {s: s.replace('-', '/') for s in symbols}, {'instrument_type': {s: 'spot' for s in symbols}})
+    Symbols.set(BINANCE, {'BTC-USDT': 'BTCUSDT'}, {'instrument_type': {'BTC-USDT': 'spot'}, 'tick_size': {'BTC-USDT': '0.01'}})
+    fh = FeedHandler(config={'log': {'disabled': True}})
+    # 60 channel/symbol pairs, split into connections of 20 (Kraken's limit)
+    fh.add_feed(Kraken(symbols=symbols, channels=[TRADES, TICKER]))
+    fh.add_feed(Binance(symbols=['BTC-USDT'], channels=[L2_BOOK]))
+    yield fh
+    Symbols.clear()
+
+
+def test_shards(feedhandler):
+    shards = feedhandler.shards(2)
+    assert len(shards) == 2
+
+    assigned = [(feed, conn) for shard in shards for feed, conns in shard.items() for conn in conns]
+    assert sorted(assigned) == [(0, 0), (0, 1), (0, 2), (1, 0)]
+    # balanced by the number of channel/symbol pairs: 20 per Kraken connection, 1 for Binance
+    assert shards == [{0: [0, 2]}, {0: [1], 1: [0]}]
+
+    # the connections are built once, and reused by the first start of each feed
+    assert [len(feed._connections) for feed in feedhandler.feeds] == [3, 1]
+
+
+def test_run_shard(feedhandler):
+    started = []
+    feedhandler.feeds[0].start = lambda loop, connections=None: started.append((KRAKEN, connections))
+    feedhandler.feeds[1].start = lambda loop, connections=None: started.append((BINANCE, connections))
+    run = feedhandler.run
+    feedhandler.run = lambda exception_handler=None: run(start_loop=False, install_signal_handlers=False, exception_handler=exception_handler)
+
+    feedhandler._run_shard({1: [0], 0: [0, 2]})
+    assert [feed.id for feed in feedhandler.feeds] == [BINANCE, KRAKEN]
+    assert feedhandler._shard == {0: [0], 1: [0, 2]}
+    assert started == [(BINANCE, [0]), (KRAKEN, [0, 2])]
+
+
+@pytest.mark.parametrize("max_restarts,exit_codes,expected", [
+    (1, [1, 1, 1], 2),
+    (-1, [1, 1, 0], 3),
+    (0, [1], 1),
+])
+def test_run_sharded_restarts(feedhandler, monkeypatch, max_restarts, exit_codes, expected):
+    feedhandler.feeds = feedhandler.feeds[:1]
+    started = []
+
+    class Process:
+        def __init__(self, target=None, args=None, name=None, daemon=None):
+            self.pid = len(started)
+            self.exitcode = None
+
+        def start(self):
+            started.append(self)
+            self.exitcode = exit_codes[len(started) - 1]
+
+        def is_alive(self):
+            return False
+
+        def join(self):
+            pass
+
+    monkeypatch.setattr(cryptofeed.feedhandler, 'Process', Process)
+    monkeypatch.setattr(signal, 'signal', lambda *args: None)
+    feedhandler.run_sharded(workers=1, restart_delay=0, max_restarts=max_restarts, poll_interval=0)
+    assert len(started) == expected
+    # restarted shards build their own connections
+    assert feedhandler.feeds[0]._connections is None
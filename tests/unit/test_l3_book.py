@@ -0,0 +1,99 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+from decimal import Decimal
+import random
+
+import pytest
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import L3Book, OrderBook
+
+
+def test_queue_position():
+    book = L3Book()
+    book.add(BID, 'a', Decimal('100'), Decimal('1'))
+    book.add(BID, 'b', Decimal('100'), Decimal('2'))
+    book.add(BID, 'c', Decimal('100'), Decimal('3'))
+    book.add(BID, 'd', Decimal('99'), Decimal('4'))
+    book.add(ASK, 'e', Decimal('101'), Decimal('5'))
+
+    assert list(book.level(BID, Decimal('100'))) == ['a', 'b', 'c']
+    assert book.position('c') == (2, Decimal('3'))
+    assert len(book) == 5
+
+    # a size change keeps the order's place, a cancel moves the orders behind it up
+    book.update('a', Decimal('0.5'))
+    assert list(book.bids[Decimal('100')].items()) == [('a', Decimal('0.5')), ('b', Decimal('2')), ('c', Decimal('3'))]
+    assert book.remove('b') == (BID, Decimal('100'), Decimal('2'))
+    assert book.position('c') == (1, Decimal('0.5'))
+    book.add(BID, 'b', Decimal('100'), Decimal('2'))
+    assert list(book.level(BID, Decimal('100'))) == ['a', 'c', 'b']
+
+    assert book.l2.to_dict() == {BID: {Decimal('100'): Decimal('5.5'), Decimal('99'): Decimal('4')}, ASK: {Decimal('101'): Decimal('5')}}
+    assert book.bids.index(0) == (Decimal('100'), {'a': Decimal('0.5'), 'c': Decimal('3'), 'b': Decimal('2')})
+    assert book.get('e') == (ASK, Decimal('101'), Decimal('5'))
+
+    book.remove('e')
+    assert Decimal('101') not in book.asks
+    assert book.l2.asks.to_dict() == {}
+    with pytest.raises(KeyError):
+        book.remove('e')
+    with pytest.raises(ValueError):
+        book.add(BID, 'a', Decimal('98'), Decimal('1'))
+
+
+def test_random_updates():
+    random.seed(0)
+    book = L3Book()
+    orders = {}
+    next_id = 0
+    for _ in range(20000):
+        if orders and random.random() < 0.45:
+            order_id = random.choice(list(orders))
+            if random.random() < 0.5:
+                side, price, size = orders.pop(order_id)
+                assert book.remove(order_id) == (side, price, size)
+            else:
+                side, price, _ = orders[order_id]
+                orders[order_id] = (side, price, random.randint(1, 10))
+                book.update(order_id, orders[order_id][2])
+        else:
+            side = random.choice([BID, ASK])
+            price = random.randint(80, 100) if side == BID else random.randint(101, 120)
+            orders[next_id] = (side, price, random.randint(1, 10))
+            book.add(side, next_id, price, orders[next_id][2])
+            next_id += 1
+
+    expected = {BID: {}, ASK: {}}
+    # orders added later are further back in the queue
+    for order_id in sorted(orders):
+        side, price, size = orders[order_id]
+        expected[side].setdefault(price, {})[order_id] = size
+    assert book.to_dict() == expected
+    assert [list(book.asks[price]) for price in book.asks] == [list(expected[ASK][price]) for price in book.asks]
+    assert book.l2.to_dict() == {side: {price: sum(level.values()) for price, level in levels.items()} for side, levels in expected.items()}
+    assert list(book.bids) == sorted(expected[BID], reverse=True)
+    assert len(book) == len(orders)
+
+    memory = book.memory()
+    assert memory['orders'] == len(orders)
+    assert memory['levels'] == len(expected[BID]) + len(expected[ASK])
+    assert 0 < memory['bytes_per_order'] < 200
+
+
+def test_order_book():
+    ob = OrderBook('TEST', 'BTC-USD', bids={Decimal('100'): {'a': Decimal('1'), 'b': Decimal('2')}}, asks={Decimal('101'): {'c': Decimal('1')}}, l3_book=True)
+    assert isinstance(ob.book, L3Book)
+    assert ob.book.bids.to_list() == [(Decimal('100'), {'a': Decimal('1'), 'b': Decimal('2')})]
+    assert ob.to_dict(numeric_type=float)['book'] == {BID: {100.0: {'a': 1.0, 'b': 2.0}}, ASK: {101.0: {'c': 1.0}}}
+
+    ob.book.bids = {Decimal('99'): {'d': Decimal('1')}}
+    assert ob.book.to_dict() == {BID: {Decimal('99'): {'d': Decimal('1')}}, ASK: {Decimal('101'): {'c': Decimal('1')}}}
+    assert 'a' not in ob.book
+
+    with pytest.raises(ValueError):
+        OrderBook('TEST', 'BTC-USD', checksum_format='KRAKEN', l3_book=True)
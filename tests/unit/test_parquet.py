@@ -0,0 +1,76 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+from decimal import Decimal
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from cryptofeed.backends.parquet import BookParquet, TradeParquet, read_parquet  # noqa: E402
+from cryptofeed.types import OrderBook, Trade  # noqa: E402
+
+
+DAY = 86400
+START = 1700006400.0  # 2023-11-15 00:00:00 UTC
+
+
+def test_parquet_trades(tmp_path):
+    async def run():
+        backend = TradeParquet(path=str(tmp_path), batch_size=10, batch_interval=0.01, rows_per_file=20)
+        backend.start(asyncio.get_running_loop())
+        for i in range(60):
+            symbol = 'BTC-USDT' if i % 2 else 'ETH-USDT'
+            # the first 40 trades on the 15th, the rest on the 16th
+            timestamp = START + (i if i < 40 else DAY + i)
+            await backend(Trade('BINANCE', symbol, 'buy', Decimal('0.5'), Decimal(40000 + i), timestamp, id=str(i)), timestamp + 0.1)
+        await backend.stop()
+        await backend.worker
+
+    asyncio.run(run())
+
+    files = [f for _, _, names in os.walk(tmp_path) for f in names]
+    # 20 trades per symbol on the 15th are rolled at rows_per_file, 10 per symbol on the 16th
+    assert len(files) == 4
+    assert not any(f.startswith('.') for f in files)
+
+    table = read_parquet(str(tmp_path), 'trades')
+    assert table.num_rows == 60
+    assert sorted(table.column('price').to_pylist()) == [40000.0 + i for i in range(60)]
+
+    table = read_parquet(str(tmp_path), 'trades', exchange='BINANCE', symbols=['BTC-USDT'], start='2023-11-16', columns=['id', 'price'])
+    assert table.column_names == ['id', 'price']
+    assert sorted(table.column('id').to_pylist(), key=int) == [str(i) for i in range(41, 60, 2)]
+
+
+def test_parquet_book(tmp_path):
+    async def run():
+        backend = BookParquet(path=str(tmp_path), batch_interval=0.01, snapshot_interval=2)
+        backend.start(asyncio.get_running_loop())
+        book = OrderBook('BINANCE', 'BTC-USDT', bids={Decimal(100): Decimal(1)}, asks={Decimal(101): Decimal(2)})
+        book.timestamp = START
+        await backend(book, START)
+        for size in (3, 4):
+            book.book.bids[Decimal(100)] = Decimal(size)
+            book.delta = {'bid': [(Decimal(100), Decimal(size))], 'ask': []}
+            await backend(book, START)
+        await backend.stop()
+        await backend.worker
+
+    asyncio.run(run())
+
+    rows = read_parquet(str(tmp_path), 'book', columns=['delta', 'side', 'price', 'size']).to_pylist()
+    assert rows == [
+        {'delta': False, 'side': 'bid', 'price': 100.0, 'size': 1.0},
+        {'delta': False, 'side': 'ask', 'price': 101.0, 'size': 2.0},
+        {'delta': True, 'side': 'bid', 'price': 100.0, 'size': 3.0},
+        {'delta': True, 'side': 'bid', 'price': 100.0, 'size': 4.0},
+        # snapshot written every snapshot_interval deltas
+        {'delta': False, 'side': 'bid', 'price': 100.0, 'size': 4.0},
+        {'delta': False, 'side': 'ask', 'price': 101.0, 'size': 2.0},
+    ]
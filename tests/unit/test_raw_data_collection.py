@@ -0,0 +1,61 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import asyncio
+import glob
+import os
+
+import pytest
+
+from cryptofeed.defines import BINANCE, BITFINEX, HUOBI, KRAKEN, OKX
+from cryptofeed.raw_data_collection import RECORD_CONFIG, RECORD_HTTP, RECORD_RECV, RECORD_SEND, BinaryFileCallback, binary_playback, convert_capture, playback, read_binary_capture
+from cryptofeed.symbols import Symbols
+
+
+def test_binary_file_callback_roundtrip(tmp_path):
+    cb = BinaryFileCallback(str(tmp_path), length=2)
+    cb.write_header('TEST', '{"trades": ["BTC-USD"]}')
+
+    async def capture():
+        await cb('{"a": 1}', 1.5, 'TEST.ws.1')
+        await cb(b'\x00\x01binary: data\n', 2.5, 'TEST.ws.1')
+        await cb('{"sub": 1}', 3.5, 'TEST.ws.1', send='wss://test')
+    asyncio.run(capture())
+    cb.stop()
+
+    records = list(read_binary_capture(str(tmp_path / 'TEST.ws.1.0.bin')))
+    assert records == [
+        (RECORD_RECV, 1.5, 'TEST.ws.1', None, '{"a": 1}'),
+        (RECORD_RECV, 2.5, 'TEST.ws.1', None, b'\x00\x01binary: data\n'),
+        (RECORD_SEND, 3.5, 'TEST.ws.1', 'wss://test', '{"sub": 1}'),
+    ]
+    kind, _, uuid, _, data = next(read_binary_capture(str(tmp_path / 'TEST.0.bin')))
+    assert (kind, uuid, data) == (RECORD_CONFIG, 'TEST', '{"trades": ["BTC-USD"]}')
+
+
+def test_binary_file_callback_http_header(tmp_path):
+    cb = BinaryFileCallback(str(tmp_path))
+    cb.sync_callback('{"x": 1}', 1.0, 'TEST', endpoint='https://test', header={'a': 'b'})
+    records = list(read_binary_capture(str(tmp_path / 'TEST.0.bin')))
+    assert records == [(RECORD_HTTP, 1.0, 'TEST', 'https://test', '{"x": 1} header: {"a":"b"}')]
+
+
+@pytest.mark.parametrize("exchange", [BINANCE, BITFINEX, HUOBI, KRAKEN, OKX])
+def test_binary_playback_matches_text_playback(exchange, tmp_path):
+    dir = os.path.dirname(os.path.realpath(__file__))
+    pcap = sorted(glob.glob(f"{dir}/../../sample_data/{exchange}.*"))
+
+    Symbols.clear()
+    expected = playback(exchange, pcap, config="tests/config_test.yaml")
+
+    convert_capture(pcap, str(tmp_path))
+    Symbols.clear()
+    results = binary_playback(exchange, sorted(glob.glob(f"{tmp_path}/{exchange}.*.bin")), config="tests/config_test.yaml")
+    Symbols.clear()
+
+    assert results['callbacks'] == expected['callbacks']
+    assert results['messages_processed'] > 0
+    assert results['messages_per_second'] > 0
@@ -134,3 +134,72 @@ def test_candle():
     d = json.loads(d)
     t2 = Candle.from_dict(d)
     assert t == t2
+
+
+def test_order_book_snapshot_depth_and_cache():
+    ob = OrderBook(
+        'COINBASE',
+        'BTC-USD',
+        bids={Decimal(100): Decimal(1), Decimal(200): Decimal(2), Decimal(300): Decimal(3)},
+        asks={Decimal(600): Decimal(6), Decimal(700): Decimal(7)}
+    )
+    d = ob.to_dict(numeric_type=float, depth=2)
+    assert d['book'] == {'bid': {300.0: 3.0, 200.0: 2.0}, 'ask': {600.0: 6.0, 700.0: 7.0}}
+    assert ob.to_dict(numeric_type=float, depth=2)['book'] is d['book']
+
+    ob.book.bids[Decimal(400)] = Decimal(4)
+    ob.delta = {'bid': [(Decimal(400), Decimal(4))], 'ask': []}
+    assert ob.to_dict(numeric_type=float, depth=2)['book']['bid'] == {400.0: 4.0, 300.0: 3.0}
+    assert ob.to_dict(delta=True, numeric_type=float)['delta'] == {'bid': [(400.0, 4.0)], 'ask': []}
+    assert ob.to_dict()['book'] == ob.book.to_dict()
+
+
+def test_json_bytes():
+    t = Trade('COINBASE', 'BTC-USD', BUY, Decimal('0.5'), Decimal('40000.25'), 1.5, id='"1"\n', type=None)
+    assert json.loads(t.to_json_bytes(numeric_type=float)) == t.to_dict(numeric_type=float)
+    assert json.loads(t.to_json_bytes(numeric_type=str, none_to='')) == t.to_dict(numeric_type=str)
+    assert json.loads(t.to_json_bytes(numeric_type=str, numeric_format='.3f'))['price'] == '40000.250'
+
+    d = t.to_dict(numeric_type=float)
+    d['receipt_timestamp'] = 2.0
+    assert json.loads(t.to_json_bytes(receipt_timestamp=2.0)) == d
+
+    f = Funding('BINANCE', 'BTC-USDT-PERP', None, Decimal('0.01'), 5.0, 0.0)
+    d = f.to_dict(numeric_type=float)
+    d['timestamp'] = 3.0
+    d['receipt_timestamp'] = 3.0
+    assert json.loads(f.to_json_bytes(receipt_timestamp=3.0)) == d
+
+    c = Candle('BINANCE', 'BTC-USDT', 1.0, 61.0, '1m', 10, Decimal(1), Decimal(2), Decimal(3), Decimal(0.5), Decimal(100), True, 61.0)
+    assert json.loads(c.to_json_bytes()) == c.to_dict(numeric_type=float)
+
+
+def test_order_book_json_bytes():
+    ob = OrderBook('COINBASE', 'BTC-USD', bids={Decimal(100): Decimal(1), Decimal(99): Decimal(2)}, asks={Decimal(101): Decimal(3)})
+    ob.timestamp = 1.0
+    d = json.loads(ob.to_json_bytes(depth=1))
+    assert d['book'] == {'bid': {'100.0': 1.0}, 'ask': {'101.0': 3.0}}
+    assert 'delta' not in d
+
+    ob.delta = {'bid': [(Decimal(99), Decimal(0))], 'ask': []}
+    d = ob.to_dict(delta=True, numeric_type=float)
+    d['delta'] = {side: [list(level) for level in levels] for side, levels in d['delta'].items()}
+    assert json.loads(ob.to_json_bytes(delta=True)) == d
+
+
+def test_line_protocol():
+    from cryptofeed.backends.influxdb import CandlesInflux, FundingInflux, TradeInflux
+
+    updates = [
+        (TradeInflux, Trade('COINBASE', 'BTC-USD', BUY, Decimal('0.5'), Decimal('40000.25'), 1.5, id='1')),
+        (FundingInflux, Funding('BINANCE', 'BTC-USDT-PERP', None, Decimal('0.01'), 5.0, 6.0)),
+        (CandlesInflux, Candle('BINANCE', 'BTC-USDT', 1.0, 61.0, '1m', None, Decimal(1), Decimal(2), Decimal(3), Decimal(0.5), Decimal(100), True, 61.0)),
+    ]
+    for cls, update in updates:
+        backend = cls('http://127.0.0.1:8086', 'org', 'bucket', 'token')
+        d = update.to_dict(numeric_type=float)
+        d['receipt_timestamp'] = 70.0
+        assert backend.encode(update, 70.0) == backend.line(d).encode()
+
+    ob = OrderBook('COINBASE', 'BTC-USD', bids={Decimal(100): Decimal(1)}, asks={Decimal(101): Decimal(3)})
+    assert ob.to_line_protocol('book-COINBASE', receipt_timestamp=1.0) == b'book-COINBASE,symbol=BTC-USD delta=False,bid="{\\"100.0\\":1.0}",ask="{\\"101.0\\":3.0}",timestamp=1.0,receipt_timestamp=1.0 1000000'
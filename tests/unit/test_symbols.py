@@ -0,0 +1,141 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+'''
+import json
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+from cryptofeed.defines import PHEMEX, TRADES
+from cryptofeed.exchange import Exchange
+from cryptofeed.exchanges import Phemex
+from cryptofeed.symbols import Symbols
+
+
+class FakeExchange(Exchange):
+    id = 'FAKE'
+    delay = 0
+    reads = 0
+
+    @classmethod
+    def _symbol_data(cls):
+        cls.reads += 1
+        time.sleep(cls.delay)
+        return [{'base': 'BTC', 'quote': 'USD'}]
+
+    @classmethod
+    def _parse_symbol_data(cls, data):
+        return {f"{d['base']}-{d['quote']}": f"{d['base']}{d['quote']}" for d in data}, {'instrument_type': {}}
+
+
+class SlowExchange(FakeExchange):
+    id = 'SLOW'
+    delay = 1
+
+
+class FailingExchange(FakeExchange):
+    id = 'FAILING'
+
+    @classmethod
+    def _symbol_data(cls):
+        raise ValueError('unavailable')
+
+
+@pytest.fixture
+def symbols(tmp_path):
+    Symbols.configure_cache(path=str(tmp_path), ttl=60)
+    FakeExchange.reads = 0
+    yield Symbols
+    Symbols.configure_cache()
+    for exchange in (FakeExchange, SlowExchange, FailingExchange):
+        Symbols.data.pop(exchange.id, None)
+
+
+def test_symbol_cache(symbols, tmp_path):
+    assert FakeExchange.symbol_mapping() == {'BTC-USD': 'BTCUSD'}
+    assert FakeExchange.reads == 1
+    assert os.path.exists(tmp_path / 'FAKE.symbols')
+
+    # a new process (empty in memory mapping) reads the cache instead of the exchange
+    Symbols.data.pop('FAKE')
+    assert FakeExchange.symbol_mapping() == {'BTC-USD': 'BTCUSD'}
+    assert FakeExchange.reads == 1
+    assert not Symbols.stale('FAKE')
+
+    # entries written by another version are ignored
+    with open(tmp_path / 'FAKE.symbols', 'rb') as fp:
+        entry = pickle.load(fp)
+    entry['version'] = (0, 'other')
+    with open(tmp_path / 'FAKE.symbols', 'wb') as fp:
+        pickle.dump(entry, fp)
+    Symbols.data.pop('FAKE')
+    FakeExchange.symbol_mapping()
+    assert FakeExchange.reads == 2
+
+
+def test_symbol_cache_stale(symbols):
+    FakeExchange.symbol_mapping()
+    Symbols.data.pop('FAKE')
+    Symbols.cache.ttl = -1
+
+    assert not Symbols.load_cached('FAKE')
+    assert Symbols.load_cached('FAKE', stale=True)
+    assert Symbols.stale('FAKE')
+
+    FakeExchange.symbol_mapping(refresh=True)
+    Symbols.cache.ttl = 60
+    assert not Symbols.stale('FAKE')
+
+
+def test_bootstrap(symbols):
+    start = time.monotonic()
+    failed = Symbols.load_all([FakeExchange, SlowExchange, FailingExchange], timeout=0.5)
+    assert time.monotonic() - start < 1
+
+    assert sorted(failed) == ['FAILING', 'SLOW']
+    assert Symbols.populated('FAKE')
+    assert not Symbols.populated('FAILING')
+
+
+def test_symbol_data_concurrent():
+    barrier = threading.Barrier(3, timeout=5)
+
+    class MultiEndpoint(Exchange):
+        id = 'MULTI'
+        rest_endpoints = [None]
+
+        @classmethod
+        def _symbol_endpoint_prepare(cls, ep):
+            return ['a', 'b', 'c']
+
+    class Reader:
+        def read(self, addr, **kwargs):
+            # only returns once all three reads are in flight
+            barrier.wait()
+            return addr
+
+    MultiEndpoint.http_sync = Reader()
+    assert MultiEndpoint._symbol_data() == ['a', 'b', 'c']
+
+
+def test_symbol_cache_parser_state(symbols, monkeypatch):
+    # state derived from the symbol data (Phemex's price scales) has to come back with a cached entry
+    with open(os.path.join(os.path.dirname(__file__), '..', '..', 'sample_data', 'PHEMEX.0')) as fp:
+        data = json.loads(fp.readline().split(': ', 1)[1])
+    monkeypatch.setattr(Phemex, '_symbol_data', classmethod(lambda cls: data))
+    Phemex.symbol_mapping()
+    Symbols.data.pop(PHEMEX)
+
+    def unavailable(cls):
+        raise ValueError('unavailable')
+
+    monkeypatch.setattr(Phemex, '_symbol_data', classmethod(unavailable))
+    feed = Phemex(symbols=['BTC-USD-PERP'], channels=[TRADES])
+    assert feed.price_scale['BTC-USD-PERP'] == 10 ** 4
+    Symbols.data.pop(PHEMEX)
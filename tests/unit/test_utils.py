@@ -4,8 +4,16 @@ Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
 Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
-from cryptofeed.defines import BID, ASK
+import asyncio
+import time
+
+from cryptofeed.defines import BID, ASK, BINANCE, L2_BOOK
+from cryptofeed.exchanges import Binance
+from cryptofeed.symbols import Symbols
 from cryptofeed.util.book import book_delta
+from cryptofeed.util.perf import EXCHANGE_TO_RECEIPT, RECEIPT_TO_CALLBACK, Histogram, LatencyRecorder
+from cryptofeed.util.snapshot import SnapshotScheduler, TokenBucket
+from cryptofeed.util.split import by_weight
 
 
 def test_book_delta_simple():
@@ -55,3 +63,106 @@ def test_book_delta_empty():
 
     assert book_delta(a, b) == {'bid': [(0.9, 0), (1.0, 0), (0.8, 0)], 'ask': [(1.2, 0), (1.1, 0), (1.3, 0)]}
     assert book_delta(b, a) == {'ask': [(1.2, 0.6), (1.1, 1.1), (1.3, 2.1)], 'bid': [(0.9, 0.5), (1.0, 1), (0.8, 2)]}
+
+
+def test_split_by_weight():
+    assert by_weight([], [], 4) == []
+    assert by_weight(['a', 'b'], [1, 1], 4) == [['a'], ['b']]
+
+    lists = by_weight(['a', 'b', 'c', 'd', 'e'], [10, 1, 1, 8, 2], 2)
+    assert sorted(lists) == [['a', 'b'], ['c', 'd', 'e']]
+
+
+def test_snapshot_scheduler():
+    async def run():
+        scheduler = SnapshotScheduler('TEST', rate=1000, concurrency=1)
+        books = {}
+        fetched = []
+        applied = []
+
+        async def fetch(symbol):
+            fetched.append(symbol)
+            await asyncio.sleep(0.01)
+            books[symbol] = True
+
+        async def apply(symbol, update, replayed=False):
+            if symbol not in books or (not replayed and scheduler.pending(symbol)):
+                scheduler.request(symbol, lambda: fetch(symbol), lambda *u: apply(*u, replayed=True), symbol, update, replayed=replayed)
+                return
+            applied.append((symbol, update))
+
+        await apply('A', 1)
+        await apply('B', 1)
+        await apply('C', 1)
+        # A is being fetched, C has more buffered updates than B so is fetched next
+        await apply('C', 2)
+        await apply('A', 2)
+        await scheduler.drain()
+        assert fetched == ['A', 'C', 'B']
+        assert applied == [('A', 1), ('A', 2), ('C', 1), ('C', 2), ('B', 1)]
+        assert set(scheduler.time_to_book) == {'A', 'B', 'C'}
+
+        # updates received while a symbol is resynchronizing are applied after the buffered ones
+        applied.clear()
+        books.pop('A')
+        await apply('A', 3)
+        await apply('A', 4)
+        await scheduler.drain()
+        assert applied == [('A', 3), ('A', 4)]
+        scheduler.stop()
+
+    asyncio.run(run())
+
+
+def test_token_bucket_cost():
+    async def run():
+        bucket = TokenBucket(100)
+        start = time.monotonic()
+        # a second's worth of weight is available at once, the next request waits for it to refill
+        await bucket.acquire(50)
+        await bucket.acquire(50)
+        assert time.monotonic() - start < 0.1
+        await bucket.acquire(50)
+        return time.monotonic() - start
+
+    assert 0.4 < asyncio.run(run()) < 1
+
+
+def test_snapshot_weight():
+    Symbols.clear()
+    Symbols.set(BINANCE, {'BTC-USDT': 'BTCUSDT'}, {'instrument_type': {'BTC-USDT': 'spot'}, 'tick_size': {'BTC-USDT': '0.01'}})
+    feed = Binance(symbols=['BTC-USDT'], channels=[L2_BOOK])
+    # snapshots of the default depth (1000 levels) weigh 50, against a budget of 6000 a minute
+    assert feed.snapshot_scheduler.cost == 50
+    assert feed.snapshot_scheduler.bucket.rate == 100
+    assert Binance(symbols=['BTC-USDT'], channels=[L2_BOOK], max_depth=20).snapshot_scheduler.cost == 5
+    Symbols.clear()
+
+
+def test_latency_histogram():
+    histogram = Histogram()
+    for i in range(1, 10001):
+        histogram.record(i / 1_000_000)
+    assert histogram.count == 10000
+    assert histogram.min == 1 and histogram.max == 10000
+    for q in (0.5, 0.9, 0.99):
+        # within bucket precision (under 1%) of the exact quantile
+        assert abs(histogram.quantile(q) - q / 100) <= q / 100 * 0.01
+    assert histogram.quantile(1) == 0.01
+
+
+def test_latency_recorder():
+    class Update:
+        timestamp = 100.0
+
+    recorder = LatencyRecorder()
+    recorder.record_callback('BINANCE', 'trades', Update(), 100.25)
+    stats = recorder.stats()
+    assert stats[EXCHANGE_TO_RECEIPT]['BINANCE']['trades']['']['count'] == 1
+    assert stats[EXCHANGE_TO_RECEIPT]['BINANCE']['trades']['']['p50'] == 0.25
+    assert stats[RECEIPT_TO_CALLBACK]['BINANCE']['trades']['']['count'] == 1
+
+    text = recorder.prometheus()
+    assert '# TYPE cryptofeed_exchange_to_receipt_seconds summary' in text
+    assert 'cryptofeed_exchange_to_receipt_seconds{feed="BINANCE",channel="trades",connection="",quantile="0.5"} 0.25' in text
+    assert 'cryptofeed_exchange_to_receipt_seconds_count{feed="BINANCE",channel="trades",connection=""} 1' in text
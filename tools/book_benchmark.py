@@ -0,0 +1,134 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Compares order book engines by replaying the Binance family L2 book captures in sample_data
+(REST snapshots followed by the depth updates) against:
+
+  - order_book.OrderBook with Decimal prices (the DECIMAL numeric mode)
+  - order_book.OrderBook with prices in ticks
+  - ArrayBook with prices in ticks (the SCALED_INT numeric mode)
+
+Prices and sizes are converted before the replay, so only the book updates are timed. The
+top 10 levels of each side are read after every message, as a book callback would.
+
+usage: python book_benchmark.py [repeat]
+'''
+from collections import defaultdict
+from decimal import Decimal
+import json
+import os
+import sys
+import time
+
+from order_book import OrderBook
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.exchanges import EXCHANGE_MAP
+from cryptofeed.types import ArrayBook
+
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'sample_data')
+EXCHANGES = ('BINANCE', 'BINANCE_US', 'BINANCE_TR', 'BINANCE_FUTURES', 'BINANCE_DELIVERY')
+
+
+def _payload(line: str) -> dict:
+    return json.loads(line.split(': ', 1)[1])
+
+
+def load(exchange: str) -> dict:
+    """
+    {symbol: (tick size, snapshot, [depth update, ...])} for the symbols with a snapshot
+    """
+    with open(os.path.join(SAMPLE_DATA, f'{exchange}.0')) as fp:
+        normalized, info = EXCHANGE_MAP[exchange]._parse_symbol_data(_payload(fp.readline()))
+    ticks = {symbol: Decimal(info['tick_size'][std]) for std, symbol in normalized.items() if std in info['tick_size']}
+
+    snapshots = {}
+    with open(os.path.join(SAMPLE_DATA, f'{exchange}.http.0.0')) as fp:
+        for line in fp:
+            if '/depth?' in line:
+                symbol = line.split('symbol=', 1)[1].split('&', 1)[0]
+                snapshots[symbol] = _payload(line)
+
+    updates = defaultdict(list)
+    with open(os.path.join(SAMPLE_DATA, f'{exchange}.ws.1.0')) as fp:
+        for line in fp:
+            if 'depthUpdate' in line:
+                msg = _payload(line)['data']
+                updates[msg['s']].append(msg)
+
+    return {symbol: (ticks[symbol], snapshot, updates[symbol]) for symbol, snapshot in snapshots.items() if symbol in ticks}
+
+
+def convert(books: dict, price_type, size_type) -> list:
+    """
+    [(bids, asks, [(side, price, size), ...] per message), ...] with the prices and sizes converted
+    """
+    ret = []
+    for tick, snapshot, updates in books:
+        price = price_type(tick)
+        bids = {price(p): size_type(s) for p, s in snapshot['bids']}
+        asks = {price(p): size_type(s) for p, s in snapshot['asks']}
+        messages = [[(side, price(p), size_type(s)) for key, side in (('b', BID), ('a', ASK)) for p, s in msg[key]] for msg in updates]
+        ret.append((bids, asks, messages))
+    return ret
+
+
+def replay(engine, books: list) -> int:
+    levels = 0
+    for bids, asks, messages in books:
+        book = engine()
+        book.bids = bids
+        book.asks = asks
+        for message in messages:
+            for side, price, size in message:
+                if size == 0:
+                    if price in book[side]:
+                        del book[side][price]
+                else:
+                    book[side][price] = size
+            book.bids.to_list(10)
+            book.asks.to_list(10)
+            levels += len(message)
+    return levels
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    books = []
+    for exchange in EXCHANGES:
+        books.extend(load(exchange).values())
+
+    def decimal(tick):
+        return Decimal
+
+    def ticks(tick):
+        ticks_per_unit = 1 / float(tick)
+        return lambda value: int(round(float(value) * ticks_per_unit))
+
+    runs = (
+        ('order_book (Decimal)', OrderBook, convert(books, decimal, Decimal)),
+        ('order_book (ticks)', OrderBook, convert(books, ticks, float)),
+        ('ArrayBook (ticks)', ArrayBook, convert(books, ticks, float)),
+    )
+    print(f"symbols: {len(books)}  messages: {sum(len(b[2]) for b in books)}  repeat: {repeat}")
+
+    baseline = None
+    for name, engine, data in runs:
+        start = time.perf_counter()
+        levels = 0
+        for _ in range(repeat):
+            levels += replay(engine, data)
+        elapsed = time.perf_counter() - start
+        rate = levels / elapsed
+        baseline = baseline or rate
+        print(f"{name:22s}  level updates: {levels:9d}  elapsed: {elapsed:6.2f}s  updates/sec: {rate:10.0f}  speedup: {rate / baseline:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
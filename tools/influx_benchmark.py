@@ -0,0 +1,103 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Measures InfluxDB backend throughput (points/sec) across batch sizes and numbers of
+in-flight requests, with and without gzip.
+
+By default a local HTTP server stands in for InfluxDB: it decompresses and counts the points
+in each write, and responds after a simulated round trip. Pass the address, org, bucket and token
+of an InfluxDB 2 server to benchmark against it instead.
+
+usage: python influx_benchmark.py [points] [round trip ms | addr org bucket token]
+'''
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+
+from cryptofeed.backends.influxdb import TradeInflux
+
+
+class StandIn:
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.points = 0
+        self.requests = 0
+        self.bytes = 0
+
+    async def write(self, request):
+        # aiohttp decodes gzip request bodies, content_length is the size on the wire
+        self.bytes += request.content_length
+        body = await request.read()
+        self.points += body.count(b'\n') + 1
+        self.requests += 1
+        await asyncio.sleep(self.rtt)
+        return web.Response(status=204)
+
+    async def start(self, port=8086):
+        app = web.Application(client_max_size=0)
+        app.router.add_post('/api/v2/write', self.write)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', port).start()
+        return f'http://127.0.0.1:{port}'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def trade(i: int) -> dict:
+    return {'exchange': 'BINANCE', 'symbol': 'BTC-USDT', 'side': 'buy', 'amount': 0.01, 'price': 40000.0 + i % 100, 'id': str(i), 'type': None, 'timestamp': 1700000000.0 + i / 1000, 'receipt_timestamp': 1700000000.0 + i / 1000}
+
+
+async def run(points: int, args: tuple, **kwargs):
+    backend = TradeInflux(*args, **kwargs)
+    backend.start(asyncio.get_running_loop())
+
+    start = time.perf_counter()
+    for i in range(points):
+        await backend.write(trade(i))
+        if i % 1000 == 0:
+            # let the writer run, as it would between websocket messages
+            await asyncio.sleep(0)
+    await backend.stop()
+    await backend.worker
+    return time.perf_counter() - start
+
+
+async def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    server = None
+    if len(sys.argv) > 3:
+        args = tuple(sys.argv[2:6])
+        print(f"{points} points, InfluxDB at {args[0]}")
+    else:
+        rtt = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+        server = StandIn(rtt / 1000)
+        args = (await server.start(), 'org', 'bucket', 'token')
+        print(f"{points} points, local stand-in server with {rtt} ms round trip")
+
+    for compress in (False, True):
+        for batch_size, concurrency in ((1, 1), (100, 1), (1000, 1), (5000, 1), (1000, 4), (5000, 4)):
+            if batch_size == 1 and points > 5000:
+                # one request per point, as the backend wrote before batching
+                n = 5000
+            else:
+                n = points
+            if server:
+                server.points = server.requests = server.bytes = 0
+            elapsed = await run(n, args, batch_size=batch_size, batch_interval=0.1, concurrency=concurrency, compress=compress)
+            stats = f"  received: {server.points:7d}  requests: {server.requests:6d}  MB sent: {server.bytes / 1e6:7.2f}" if server else ''
+            print(f"gzip: {str(compress):5s}  batch: {batch_size:5d}  in flight: {concurrency}  points: {n:7d}  elapsed: {elapsed:6.2f}s  points/sec: {n / elapsed:9.0f}{stats}")
+
+    if server:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Measures Kafka backend throughput (messages/sec) as the window of unacknowledged sends grows,
+sending messages individually and as batches (send_batches=True).
+
+By default a mock producer that acknowledges each request after a simulated broker round trip
+is used. Pass the address of a broker to benchmark against it instead (topics are created by
+the broker if auto creation is enabled).
+
+usage: python kafka_benchmark.py [messages] [round trip ms | bootstrap servers]
+'''
+import asyncio
+import sys
+import time
+
+from cryptofeed.backends.kafka import TradeKafka
+
+
+class MockBatch:
+    def __init__(self, max_size=16384):
+        self.max_size = max_size
+        self.size = 0
+        self.count = 0
+
+    def append(self, *, timestamp, key, value, headers=[]):
+        if self.count and self.size + len(value) > self.max_size:
+            return None
+        self.size += len(value)
+        self.count += 1
+        return True
+
+    def record_count(self):
+        return self.count
+
+
+class MockProducer:
+    """
+    Acknowledges every send (or batch) after rtt seconds
+    """
+    class client:
+        _client_id = 'mock'
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+
+    def _ack(self):
+        future = asyncio.get_running_loop().create_future()
+        asyncio.get_running_loop().call_later(self.rtt, future.set_result, None)
+        return future
+
+    async def send(self, topic, value=None, key=None, partition=None):
+        return self._ack()
+
+    def create_batch(self):
+        return MockBatch()
+
+    async def send_batch(self, batch, topic, *, partition):
+        return self._ack()
+
+    async def partitions_for(self, topic):
+        return {0}
+
+    async def stop(self):
+        pass
+
+
+class MockTradeKafka(TradeKafka):
+    def __init__(self, rtt, **kwargs):
+        self.rtt = rtt
+        super().__init__(**kwargs)
+
+    async def _connect(self):
+        self.producer = MockProducer(self.rtt)
+        self.running = True
+
+
+def trade(i: int) -> dict:
+    return {'exchange': 'BINANCE', 'symbol': 'BTC-USDT', 'side': 'buy', 'amount': 0.01, 'price': 40000.0 + i % 100, 'id': str(i), 'type': None, 'timestamp': 1700000000.0 + i / 1000, 'receipt_timestamp': 1700000000.0 + i / 1000}
+
+
+async def run(messages: int, window: int, send_batches: bool, rtt: float, servers: str):
+    if servers:
+        backend = TradeKafka(bootstrap_servers=servers, window=window, send_batches=send_batches)
+    else:
+        backend = MockTradeKafka(rtt, window=window, send_batches=send_batches)
+    backend.start(asyncio.get_running_loop())
+
+    start = time.perf_counter()
+    for i in range(messages):
+        await backend.write(trade(i))
+        if i % 1000 == 0:
+            # let the writer run, as it would between websocket messages
+            await asyncio.sleep(0)
+    await backend.stop()
+    await backend.worker
+    return backend.delivered, time.perf_counter() - start
+
+
+async def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    target = sys.argv[2] if len(sys.argv) > 2 else '1'
+    servers = None if target.replace('.', '', 1).isdigit() else target
+    rtt = float(target) / 1000 if servers is None else None
+
+    print(f"{messages} messages, {'broker ' + servers if servers else f'mock producer with {target} ms round trip'}")
+    for send_batches in (False, True):
+        for window in (1, 10, 100, 1000, 10000):
+            delivered, elapsed = await run(messages, window, send_batches, rtt, servers)
+            print(f"{'batches' if send_batches else 'messages':8s}  window: {window:6d}  delivered: {delivered:8d}  elapsed: {elapsed:7.2f}s  messages/sec: {delivered / elapsed:10.0f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Compares the rows/sec the Postgres trade and book backends sustain with INSERT statements
+(the default) and with COPY (copy=True) against a local Postgres. The benchmark creates
+(and drops) its own tables.
+
+usage: python postgres_benchmark.py [rows] [user] [password] [database] [host]
+'''
+import asyncio
+import sys
+import time
+from decimal import Decimal
+
+import asyncpg
+
+from cryptofeed.backends.postgres import BookPostgres, TradePostgres
+from cryptofeed.defines import ASK, BID, BUY, SELL
+from cryptofeed.types import OrderBook, Trade
+
+
+TABLES = {
+    'trades_benchmark': "CREATE TABLE trades_benchmark (id serial PRIMARY KEY, timestamp TIMESTAMP, receipt_timestamp TIMESTAMP, exchange VARCHAR(32), symbol VARCHAR(32), side VARCHAR(8), amount NUMERIC(64, 32), price NUMERIC(64, 32), trade_id VARCHAR(64), order_type VARCHAR(32))",
+    'book_benchmark': "CREATE TABLE book_benchmark (id serial PRIMARY KEY, timestamp TIMESTAMP, receipt_timestamp TIMESTAMP, exchange VARCHAR(32), symbol VARCHAR(32), data JSONB)",
+}
+
+
+def trades(rows):
+    for i in range(rows):
+        yield Trade('BINANCE', 'BTC-USDT', BUY if i % 2 else SELL, Decimal('0.01'), Decimal(40000 + i % 100), 1700000000.0 + i / 1000, id=str(i))
+
+
+def books(rows):
+    book = OrderBook('BINANCE', 'BTC-USDT', bids={Decimal(40000 - i): Decimal(1) for i in range(20)}, asks={Decimal(40001 + i): Decimal(1) for i in range(20)})
+    for i in range(rows):
+        price = Decimal(40000 - i % 20)
+        book.book.bids[price] = Decimal(i % 7 + 1)
+        book.delta = {BID: [(price, Decimal(i % 7 + 1))], ASK: []}
+        book.timestamp = 1700000000.0 + i / 1000
+        yield book
+
+
+async def run(cls, table, updates, rows, cfg, **kwargs):
+    conn = await asyncpg.connect(user=cfg['user'], password=cfg['pw'], database=cfg['db'], host=cfg['host'])
+    await conn.execute(f"DROP TABLE IF EXISTS {table}")
+    await conn.execute(TABLES[table])
+
+    backend = cls(table=table, **cfg, **kwargs)
+    backend.start(asyncio.get_running_loop())
+    start = time.perf_counter()
+    for count, update in enumerate(updates(rows)):
+        await backend(update, update.timestamp)
+        if count % 1000 == 0:
+            # let the writer run, as it would between websocket messages
+            await asyncio.sleep(0)
+    await backend.stop()
+    await backend.worker
+    elapsed = time.perf_counter() - start
+
+    written = await conn.fetchval(f"SELECT count(*) FROM {table}")
+    await conn.execute(f"DROP TABLE {table}")
+    await conn.close()
+    return written, elapsed
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cfg = {
+        'user': sys.argv[2] if len(sys.argv) > 2 else 'postgres',
+        'pw': sys.argv[3] if len(sys.argv) > 3 else None,
+        'db': sys.argv[4] if len(sys.argv) > 4 else 'postgres',
+        'host': sys.argv[5] if len(sys.argv) > 5 else '127.0.0.1',
+    }
+    for name, cls, table, updates, kwargs in (
+        ('trades', TradePostgres, 'trades_benchmark', trades, {}),
+        ('book', BookPostgres, 'book_benchmark', books, {'snapshot_interval': 1000}),
+    ):
+        for mode in ('insert', 'copy'):
+            written, elapsed = await run(cls, table, updates, rows, cfg, copy=mode == 'copy', **kwargs)
+            print(f"{name:8s} {mode:8s} rows: {written:8d}  elapsed: {elapsed:7.2f}s  rows/sec: {written / elapsed:10.0f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+'''
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Measures how message throughput scales with the number of worker processes by
+replaying the captures in sample_data, split across workers the same way
+FeedHandler.run_sharded splits connections (balanced by weight).
+
+usage: python shard_benchmark.py [max workers] [repeat]
+'''
+import glob
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from cryptofeed.exchanges import EXCHANGE_MAP
+from cryptofeed.raw_data_collection import playback
+from cryptofeed.symbols import Symbols
+from cryptofeed.util.split import by_weight
+
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'sample_data')
+CONFIG = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'tests', 'config_test.yaml')
+
+
+def replay(args):
+    exchanges, repeat = args
+    messages = 0
+    failed = {}
+    for _ in range(repeat):
+        for exchange in exchanges:
+            if exchange in failed:
+                continue
+            Symbols.clear()
+            try:
+                messages += playback(exchange, glob.glob(f"{SAMPLE_DATA}/{exchange}.*"), config=CONFIG)['messages_processed']
+            except Exception as e:
+                # captures that need network access (e.g. to refresh symbols) fail here. They are
+                # reported with the results, since their messages are missing from the totals
+                failed[exchange] = repr(e)
+    return messages, failed
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    exchanges = [e for e in EXCHANGE_MAP if glob.glob(f"{SAMPLE_DATA}/{e}.ws.*")]
+    weights = [sum(os.path.getsize(f) for f in glob.glob(f"{SAMPLE_DATA}/{e}.ws.*")) for e in exchanges]
+
+    workers = 1
+    baseline = None
+    while workers <= max_workers:
+        shards = by_weight(exchanges, weights, workers)
+        start = time.perf_counter()
+        with Pool(len(shards)) as pool:
+            results = pool.map(replay, [(shard, repeat) for shard in shards])
+        elapsed = time.perf_counter() - start
+        messages = sum(count for count, _ in results)
+        failed = {exchange: error for _, errors in results for exchange, error in errors.items()}
+        rate = messages / elapsed
+        baseline = baseline or rate
+        print(f"workers: {workers:3d}  messages: {messages:8d}  elapsed: {elapsed:7.2f}s  messages/sec: {rate:10.0f}  speedup: {rate / baseline:5.2f}x")
+        for exchange, error in sorted(failed.items()):
+            print(f"    {exchange} failed: {error}")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()